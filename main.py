@@ -19,6 +19,9 @@ import os
 from src.MarketData import MarketData
 from src.AccountData import AccountData
 from src.TradingModel import TradingModel
+from src.ModelThrottle import ModelThrottle
+from src.ModelCoalescer import ModelCoalescer
+from src.Message import Message
 from src.models.checklist_model import mock_model
 from src.models.checklist_model import checklist_model
 from src.endpoints.bybit_functions import format_klines, place_order, place_conditional_order
@@ -57,6 +60,34 @@ async def main():
                         type=str,
                         default=str({'param': 1}),
                         help="optional arguments for trading model")
+    parser.add_argument(
+        '--synthesize',
+        action='store_true',
+        help="build higher candle frequencies locally from the smallest one")
+    parser.add_argument('--intrabar',
+                        action='store_true',
+                        help="forward unconfirmed candle updates to the model")
+    parser.add_argument(
+        '--throttle_ms',
+        type=float,
+        default=1000,
+        help="minimum milliseconds between intra candle model triggers")
+    parser.add_argument(
+        '--price_threshold',
+        type=float,
+        default=None,
+        help="minimum relative price move for intra candle triggers")
+    parser.add_argument(
+        '--coalesce',
+        action='store_true',
+        help=
+        "trigger the model once per ticker for candles that close at the same timestamp"
+    )
+    parser.add_argument(
+        '--coalesce_timeout_ms',
+        type=float,
+        default=1000,
+        help="maximum milliseconds to wait for missing candles of a timestamp")
     args = parser.parse_args()
     args = vars(args)
 
@@ -111,20 +142,28 @@ async def main():
     print('Done!')
 
     # initialize TradingModel object
-    model = TradingModel(client=binance_client,
-                         http_session=session,
-                         symbols=symbol_list,
-                         topics=PUBLIC_TOPICS,
-                         model=checklist_model,
-                         model_args={
-                             'open': None,
-                             'reduce_only': True
-                         },
-                         model_storage={
-                             'open': None,
-                             'close': None,
-                             'entry_bar_time': pd.Timestamp.now()
-                         })
+    model = TradingModel(
+        client=binance_client,
+        http_session=session,
+        symbols=symbol_list,
+        topics=PUBLIC_TOPICS,
+        model=checklist_model,
+        model_args={
+            'open': None,
+            'reduce_only': True
+        },
+        model_storage={
+            'open': None,
+            'close': None,
+            'entry_bar_time': pd.Timestamp.now()
+        },
+        synthesize=args['synthesize'],
+        throttle=ModelThrottle(interval_ms=args['throttle_ms'],
+                               price_threshold=args['price_threshold'])
+        if args['intrabar'] else None,
+        coalescer=ModelCoalescer(topics=PUBLIC_TOPICS,
+                                 timeout_ms=args['coalesce_timeout_ms'])
+        if args['coalesce'] else None)
 
     # close potential open positions upfront
     for pos in model.account.positions.values():
@@ -160,10 +199,11 @@ async def main():
                         websockets.connect(public_url) as ws_public:
 
                 # subscribe to public and private top‚ics
+                # with --synthesize higher intervals are built locally from the smallest interval of the ticker
                 await ws_public.send(
                     json.dumps({
                         "op": "subscribe",
-                        "args": PUBLIC_TOPICS
+                        "args": model.market_data.source_topics
                     }))
                 await ws_private.send(
                     json.dumps({
@@ -185,13 +225,13 @@ async def main():
 
                 async def transmit(w, source):
                     while True:
-                        msg = await w.recv()
-                        message = json.loads(msg)
+                        # decode message once and pass it down the dispatch chain
+                        msg = Message.parse(await w.recv())
 
-                        # only include full candlesticks to avoid spamming
-                        if 'data' in message.keys():
-                            if 'confirm' in message['data'][0].keys():
-                                if message['data'][0]['confirm'] == True:
+                        # only include full candlesticks to avoid spamming, unless intra candle updates are requested
+                        if msg.data and not args['intrabar']:
+                            if 'confirm' in msg.data[0].keys():
+                                if msg.data[0]['confirm'] == True:
                                     await channel.put((source, msg))
                             else:
                                 # print(message)
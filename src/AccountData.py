@@ -7,11 +7,12 @@ warnings.simplefilter(action='ignore', category=RuntimeWarning)
 
 import pandas as pd
 import json
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Union
 from dotenv import load_dotenv
 import os
 from pybit import usdt_perpetual
 from .endpoints.bybit_functions import *
+from .Message import Message
 import time
 
 from dotenv import load_dotenv
@@ -91,13 +92,13 @@ class AccountData:
         self.stop_orders = account_data['stop_order']
         self.wallet = account_data['wallet']
 
-    def on_message(self, message: json) -> Dict[str, Any]:
+    def on_message(self, message: Union[str, Message]) -> Dict[str, Any]:
         '''
         Receive account data message and store in appropriate attributes
 
         Parameters
         ----------
-        msg: json
+        message: Union[str, Message]
             message received from api, i.e. data to store
         
         Returns
@@ -107,17 +108,17 @@ class AccountData:
         '''
 
         # extract message
-        msg = json.loads(message)
+        msg = Message.parse(message)
 
         try:
             # extract topic
-            topic = msg['topic']
+            topic = msg.topic
 
             # check if topic is a private topic
             if topic in PRIVATE_TOPICS:
 
                 # extract data of message
-                data = msg['data']
+                data = msg.data
 
                 # store data in correct attribute
                 if topic == PRIVATE_TOPICS[0]:
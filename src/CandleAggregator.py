@@ -0,0 +1,247 @@
+# !/usr/bin/env python
+# coding: utf-8
+
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+
+import pandas as pd
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple
+from src.CandleStore import CandleStore, to_ns
+from src.endpoints.bybit_decoders import Candle
+
+# nanoseconds per minute, bybit kline intervals are given in minutes
+MINUTE_NS = 60 * 1000000000
+
+
+def parse_topic(topic: str) -> Optional[Tuple[int, str]]:
+    '''
+    Split a public kline topic like "candle.5.BTCUSDT" into its interval in minutes and its ticker.
+    Topics with intervals that are not given in minutes, e.g. daily, weekly or monthly candles "candle.D.BTCUSDT", return None.
+    '''
+    _, interval, ticker = topic.split('.', 2)
+    if not interval.isdigit():
+        return None
+    return int(interval), ticker
+
+
+def plan_aggregation(topics: List[str]) -> Dict[str, List[str]]:
+    '''
+    Determine which topics can be synthesized locally from a finer topic of the same ticker.
+    For every ticker the topic with the smallest interval is the source,
+    all topics whose interval is a multiple of the source interval are built from it.
+    Topics without a minute interval, e.g. "candle.D.BTCUSDT", are never synthesized.
+
+    Parameters
+    ----------
+    topics: List[str]
+        public kline topics, e.g. ["candle.1.BTCUSDT", "candle.5.BTCUSDT", "candle.15.BTCUSDT"]
+
+    Returns
+    -------
+    plan: Dict[str, List[str]]
+        topics to synthesize, indexed by their source topic, e.g. {"candle.1.BTCUSDT": ["candle.5.BTCUSDT", "candle.15.BTCUSDT"]}
+    '''
+    # topics without a minute interval are not aligned to the epoch, they are always received
+    parsed = {
+        topic: parse_topic(topic)
+        for topic in topics
+        if parse_topic(topic) is not None
+    }
+
+    sources = {}
+    for topic, (interval, ticker) in parsed.items():
+        if ticker not in sources or interval < parse_topic(sources[ticker])[0]:
+            sources[ticker] = topic
+
+    plan = {}
+    for topic, (interval, ticker) in parsed.items():
+        source = sources[ticker]
+        source_interval = parse_topic(source)[0]
+        if topic != source and interval % source_interval == 0:
+            plan.setdefault(source, []).append(topic)
+    return plan
+
+
+def aggregate_candles(data: pd.DataFrame, interval: int) -> pd.DataFrame:
+    '''
+    Aggregate historical candles to a coarser interval. Buckets are aligned to the epoch,
+    i.e. the same way bybit aligns its klines. A trailing bucket that is not complete yet
+    is returned as unconfirmed candle.
+
+    Parameters
+    ----------
+    data: pandas.DataFrame
+        candlestick data indexed by the close timestamp, with at least start, end, open, high, low, close, volume and turnover
+    interval: int
+        interval of the aggregated candles in minutes
+
+    Returns
+    -------
+    candles: pandas.DataFrame
+        aggregated candles indexed by the close timestamp
+    '''
+    if data.empty:
+        return data.copy()
+
+    data = data.sort_index()
+    interval_ns = interval * MINUTE_NS
+    starts = data['start'].values.astype('datetime64[ns]').view(np.int64)
+    buckets = (starts // interval_ns) * interval_ns
+
+    grouped = data.groupby(buckets, sort=True)
+    candles = pd.DataFrame({
+        'start': pd.to_datetime(grouped['start'].first().index.values),
+        'open': grouped['open'].first().values,
+        'high': grouped['high'].max().values,
+        'low': grouped['low'].min().values,
+        'close': grouped['close'].last().values,
+        'volume': grouped['volume'].sum().values,
+        'turnover': grouped['turnover'].sum().values
+    })
+    candles['end'] = candles['start'] + pd.Timedelta(minutes=interval)
+
+    # a bucket is complete once the candle closing the bucket is available
+    last_end = grouped['end'].max().values.astype('datetime64[ns]')
+    candles['confirm'] = last_end == candles['end'].values
+    candles['period'] = str(interval)
+
+    return candles.set_index('end', drop=False)
+
+
+class CandleAggregator:
+    '''
+    Incrementally builds candles of a coarser interval from the candles of a finer source topic.
+    The current bucket is updated in place with every source candle, including unconfirmed ones,
+    and is confirmed with the source candle that closes the bucket.
+    '''
+
+    def __init__(self, source: str, target: str):
+        '''
+        Parameters
+        ----------
+        source: str
+            public topic the candles are built from, e.g. "candle.1.BTCUSDT"
+        target: str
+            public topic of the built candles, e.g. "candle.5.BTCUSDT"
+
+        Attributes
+        ----------
+        self.interval: int
+            interval of the target topic in minutes
+        self.bucket: int
+            epoch nanosecond start of the current bucket, None before the first candle
+        self.candle: Candle
+            current candle of the target topic, None before the first candle
+        '''
+        self.source = source
+        self.target = target
+        self.interval = parse_topic(target)[0]
+        self.interval_ns = self.interval * MINUTE_NS
+
+        self.bucket = None
+        self.candle = None
+
+        # aggregate of the confirmed source candles of the current bucket
+        self._open = np.nan
+        self._high = -np.inf
+        self._low = np.inf
+        self._volume = 0.0
+        self._turnover = 0.0
+        self._last_end = None
+
+    def _reset(self, bucket: int, store: CandleStore):
+        '''
+        Start a new bucket. Confirmed source candles of the bucket that are already in the store,
+        e.g. from historical data, are included.
+        '''
+        self.bucket = bucket
+        self._open = np.nan
+        self._high = -np.inf
+        self._low = np.inf
+        self._volume = 0.0
+        self._turnover = 0.0
+        self._last_end = None
+
+        ends = store.column('end').view(np.int64)
+        first = np.searchsorted(ends, bucket, side='right')
+        confirms = store.column('confirm')
+        for i in range(first, len(ends) - 1):
+            if confirms[i]:
+                self._add({
+                    col: store.column(col)[i]
+                    for col in ['open', 'high', 'low', 'volume', 'turnover']
+                })
+                self._last_end = int(ends[i])
+
+    def _add(self, data: Dict[str, Any]):
+        '''
+        Add a confirmed source candle to the aggregate of the current bucket.
+        '''
+        if np.isnan(self._open):
+            self._open = float(data['open'])
+        self._high = max(self._high, float(data['high']))
+        self._low = min(self._low, float(data['low']))
+        self._volume += float(data['volume'])
+        self._turnover += float(data['turnover'])
+
+    def update(self, data: Dict[str, Any], store: CandleStore) -> List[Candle]:
+        '''
+        Update the current bucket with a new source candle.
+
+        Parameters
+        ----------
+        data: Dict[str, Any]
+            new source candle, either a dictionary or a typed record (see bybit_decoders.Candle)
+        store: CandleStore
+            candle store of the source topic, already containing the new candle.
+            Used to recover the current bucket, e.g. after historical data was loaded.
+
+        Returns
+        -------
+        candles: List[Candle]
+            updated candles of the target topic. Usually only the current candle, which is confirmed if the source candle closes the bucket.
+            If the source candle closing the previous bucket was missed, the previous candle is confirmed first.
+        '''
+        start = to_ns(data['start'])
+        end = to_ns(data['end'])
+        bucket = (start // self.interval_ns) * self.interval_ns
+
+        candles = []
+        if bucket != self.bucket:
+            if self.candle is not None and not self.candle.confirm:
+                candles.append(self.candle._replace(confirm=True))
+            self._reset(bucket=bucket, store=store)
+
+        confirm = bool(data['confirm'])
+        if confirm:
+            # confirmed source candles enter the aggregate once
+            if self._last_end is None or end > self._last_end:
+                self._add(data)
+                self._last_end = end
+            open_, high, low = self._open, self._high, self._low
+            volume, turnover = self._volume, self._turnover
+        else:
+            # unconfirmed source candles are only added to the current candle
+            open_ = float(data['open']) if np.isnan(self._open) else self._open
+            high = max(self._high, float(data['high']))
+            low = min(self._low, float(data['low']))
+            volume = self._volume + float(data['volume'])
+            turnover = self._turnover + float(data['turnover'])
+
+        bucket_end = bucket + self.interval_ns
+        self.candle = Candle(start=bucket,
+                             end=bucket_end,
+                             period=str(self.interval),
+                             open=open_,
+                             close=float(data['close']),
+                             high=high,
+                             low=low,
+                             volume=volume,
+                             turnover=turnover,
+                             confirm=confirm and end == bucket_end,
+                             cross_seq=int(data.get('cross_seq', 0)),
+                             timestamp=int(data.get('timestamp', 0)))
+        candles.append(self.candle)
+        return candles
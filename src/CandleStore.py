@@ -0,0 +1,333 @@
+# !/usr/bin/env python
+# coding: utf-8
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+warnings.simplefilter(action='ignore', category=RuntimeWarning)
+
+import pandas as pd
+import numpy as np
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, List
+import yaml
+from dotenv import load_dotenv
+import os
+
+load_dotenv()
+
+CONFIG_DIR = os.getenv('CONFIG_DIR')
+
+# Load variables from the YAML file
+with open(CONFIG_DIR, 'r') as file:
+    config = yaml.safe_load(file)
+
+# Access variables from the loaded data
+PUBLIC_TOPICS_COLUMNS = config.get('public_topics_columns')
+
+# maximum number of candles kept per topic
+HISTORY_CAPACITY = 2000
+
+# numpy dtypes of candle columns, every column that is not listed is stored as float64
+CANDLE_DTYPES = {
+    'start': 'datetime64[ns]',
+    'end': 'datetime64[ns]',
+    'period': object,
+    'confirm': bool,
+    'cross_seq': np.int64,
+    'timestamp': np.int64
+}
+
+# values for columns that are missing in a candle, e.g. historical klines without websocket meta data
+CANDLE_DEFAULTS = {
+    'start': np.datetime64('NaT'),
+    'end': np.datetime64('NaT'),
+    'period': None,
+    'confirm': True,
+    'cross_seq': 0,
+    'timestamp': 0
+}
+
+
+def to_ns(value: Any) -> int:
+    '''
+    Convert a timestamp (int64 epoch nanoseconds, pandas.Timestamp or numpy.datetime64) to int64 epoch nanoseconds.
+    '''
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    return pd.Timestamp(value).value
+
+
+class CandleStore:
+    '''
+    Fixed capacity columnar store of candlesticks for a single topic.
+    Each column is kept in its own numpy array. Appending a candle or overwriting the last candle is O(1).
+    Every value is written twice (at position i and i + capacity), so that the latest candles are always
+    available as one contiguous view of the arrays without copying.
+    '''
+
+    def __init__(self,
+                 columns: List[str] = PUBLIC_TOPICS_COLUMNS,
+                 capacity: int = HISTORY_CAPACITY):
+        '''
+        Parameters
+        ----------
+        columns: List[str]
+            columns of the candlesticks to store. Must include 'end'.
+        capacity: int
+            maximum number of candles to store. Older candles are overwritten.
+
+        Attributes
+        ----------
+        self.columns: List[str]
+            columns of the stored candlesticks
+        self.capacity: int
+            maximum number of candles to store
+        self.arrays: Dict[str, numpy.ndarray]
+            double sized ring buffers, indexed by column
+        '''
+        self.columns = list(columns)
+        self.capacity = capacity
+        self.arrays = {
+            col: np.empty(2 * capacity,
+                          dtype=CANDLE_DTYPES.get(col, np.float64))
+            for col in self.columns
+        }
+
+        # int64 view of the end timestamps for cheap comparisons
+        self._ends = self.arrays['end'].view(np.int64)
+
+        # position of the next write and number of stored candles
+        self._pos = 0
+        self._size = 0
+
+        # lazily built dataframe view, reset on every write
+        self._frame = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _write(self, idx: int, data: Dict[str, Any]):
+        '''
+        Write a candle into both halves of the ring buffers at position idx.
+        '''
+        for col, arr in self.arrays.items():
+            value = data.get(col, CANDLE_DEFAULTS.get(col, np.nan))
+            arr[idx] = value
+            arr[idx + self.capacity] = value
+        self._frame = None
+
+    def append(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        '''
+        Add a new candle. If the candle has the same end timestamp as the last candle, the last candle is overwritten in place.
+
+        Parameters
+        ----------
+        data: Dict[str, Any]
+            formatted candlestick data, either a dictionary or a typed record (see bybit_decoders.Candle).
+            timestamps can be pandas.Timestamp or int64 epoch nanoseconds.
+
+        Returns
+        -------
+        data: Dict[str, Any]
+            stored candlestick data
+        '''
+        if self._size and self._ends[self._last_idx()] == to_ns(data['end']):
+            self._write(self._last_idx(), data)
+            return data
+
+        self._write(self._pos, data)
+        self._pos = (self._pos + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        return data
+
+    def extend(self, columns: Dict[str, np.ndarray]) -> int:
+        '''
+        Add a block of candles at once. All candles need to close after the last stored candle.
+        Only the last self.capacity candles of the block are written.
+
+        Parameters
+        ----------
+        columns: Dict[str, numpy.ndarray]
+            columns of equal length ordered by the end timestamp, indexed by column. Timestamps can be int64 epoch nanoseconds.
+            Missing columns are filled with their default values, scalars are written to every candle.
+
+        Returns
+        -------
+        n: int
+            number of added candles
+        '''
+        n = len(columns['end'])
+        skip = max(n - self.capacity, 0)
+        idx = (self._pos + np.arange(skip, n)) % self.capacity
+        for col, arr in self.arrays.items():
+            values = columns.get(col, CANDLE_DEFAULTS.get(col, np.nan))
+            if np.ndim(values):
+                values = np.asarray(values)[skip:]
+                if arr.dtype.kind == 'M':
+                    values = values.astype(arr.dtype)
+            arr[idx] = values
+            arr[idx + self.capacity] = values
+
+        self._pos = (self._pos + n) % self.capacity
+        self._size = min(self._size + n, self.capacity)
+        self._frame = None
+        return n
+
+    def update_last(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        '''
+        Overwrite the last candle in place.
+
+        Parameters
+        ----------
+        data: Dict[str, Any]
+            formatted candlestick data
+
+        Returns
+        -------
+        data: Dict[str, Any]
+            stored candlestick data
+        '''
+        if not self._size:
+            return self.append(data)
+        self._write(self._last_idx(), data)
+        return data
+
+    def _last_idx(self) -> int:
+        return (self._pos - 1) % self.capacity
+
+    def _window(self) -> slice:
+        '''
+        Slice of the ring buffers that holds all stored candles in chronological order.
+        '''
+        start = self._pos if self._size == self.capacity else 0
+        return slice(start, start + self._size)
+
+    def column(self, col: str) -> np.ndarray:
+        '''
+        Return a read-only chronological view of a column without copying.
+
+        Parameters
+        ----------
+        col: str
+            column to return
+
+        Returns
+        -------
+        values: numpy.ndarray
+            values of the column, oldest candle first
+        '''
+        values = self.arrays[col][self._window()]
+        values.flags.writeable = False
+        return values
+
+    def last(self) -> Dict[str, Any]:
+        '''
+        Return the last candle as dictionary.
+        '''
+        if not self._size:
+            return None
+        idx = self._last_idx()
+        return {col: arr[idx] for col, arr in self.arrays.items()}
+
+    def load(self, data: pd.DataFrame) -> pd.DataFrame:
+        '''
+        Replace the stored candles by a dataframe of candles. Only the last self.capacity candles are kept.
+
+        Parameters
+        ----------
+        data: pandas.DataFrame
+            candlestick data, ordered by the end timestamp
+
+        Returns
+        -------
+        self.to_frame(): pandas.DataFrame
+            stored candles
+        '''
+        data = data.iloc[-self.capacity:]
+        size = len(data)
+        for col, arr in self.arrays.items():
+            if col in data.columns:
+                values = data[col]
+
+                # boolean and integer columns can not hold missing values
+                if arr.dtype in (bool, np.int64):
+                    values = values.fillna(CANDLE_DEFAULTS[col])
+                values = values.to_numpy()
+            else:
+                values = CANDLE_DEFAULTS.get(col, np.nan)
+            arr[:size] = values
+            arr[self.capacity:self.capacity + size] = values
+
+        self._pos = size % self.capacity
+        self._size = size
+        self._frame = None
+        return self.to_frame()
+
+    def to_frame(self) -> pd.DataFrame:
+        '''
+        Return the stored candles as dataframe, indexed by the close timestamp.
+        The dataframe is built lazily and cached until the next write.
+
+        Returns
+        -------
+        frame: pandas.DataFrame
+            stored candles, oldest candle first
+        '''
+        if self._frame is None:
+            window = self._window()
+            self._frame = pd.DataFrame(
+                {col: arr[window] for col, arr in self.arrays.items()},
+                index=pd.DatetimeIndex(self.arrays['end'][window], copy=True),
+                columns=self.columns)
+        return self._frame
+
+
+class CandleHistory(MutableMapping):
+    '''
+    Dictionary of candle stores, indexed by topic.
+    Reading a topic returns a pandas.DataFrame view of the store. Assigning a dataframe to a topic loads it into the store.
+    '''
+
+    def __init__(self,
+                 topics: List[str],
+                 columns: List[str] = PUBLIC_TOPICS_COLUMNS,
+                 capacity: int = HISTORY_CAPACITY):
+        '''
+        Parameters
+        ----------
+        topics: List[str]
+            topics to create candle stores for
+        columns: List[str]
+            columns of the candlesticks to store
+        capacity: int
+            maximum number of candles to store per topic
+
+        Attributes
+        ----------
+        self.stores: Dict[str, CandleStore]
+            candle stores indexed by topic
+        '''
+        self.columns = columns
+        self.capacity = capacity
+        self.stores = {
+            topic: CandleStore(columns=columns, capacity=capacity)
+            for topic in topics
+        }
+
+    def __getitem__(self, topic: str) -> pd.DataFrame:
+        return self.stores[topic].to_frame()
+
+    def __setitem__(self, topic: str, data: pd.DataFrame):
+        if topic not in self.stores:
+            self.stores[topic] = CandleStore(columns=self.columns,
+                                             capacity=self.capacity)
+        self.stores[topic].load(data)
+
+    def __delitem__(self, topic: str):
+        del self.stores[topic]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.stores)
+
+    def __len__(self) -> int:
+        return len(self.stores)
@@ -7,11 +7,19 @@ warnings.simplefilter(action='ignore', category=FutureWarning)
 warnings.simplefilter(action='ignore', category=RuntimeWarning)
 
 import pandas as pd
+import numpy as np
 import json
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Union
 from binance.client import Client
 from src.endpoints.binance_functions import format_historical_klines
-from src.endpoints.bybit_functions import get_historical_klines, format_klines
+from src.endpoints.bybit_functions import get_historical_klines, fetch_kline_ranges
+from src.endpoints.kline_cache import load_klines
+from binance.helpers import date_to_milliseconds
+from src.endpoints.bybit_decoders import Candle, decode_candle
+from src.CandleStore import CandleHistory, CandleStore, HISTORY_CAPACITY
+from src.CandleAggregator import CandleAggregator, aggregate_candles, plan_aggregation
+from src.helper_functions.indicators import Indicator, create_indicator
+from src.Message import Message
 import yaml
 from dotenv import load_dotenv
 import os
@@ -39,7 +47,10 @@ class MarketData:
     '''
 
     # create new marketdata object with empty dataframe
-    def __init__(self, client: Client, topics: List[str] = PUBLIC_TOPICS):
+    def __init__(self,
+                 client: Client,
+                 topics: List[str] = PUBLIC_TOPICS,
+                 synthesize: bool = False):
         '''
         Parameters
         ----------
@@ -47,61 +58,85 @@ class MarketData:
             http session to pull historical data from
         topics: List[str]
             all topics to store
+        synthesize: bool
+            if True, topics whose interval is a multiple of the smallest interval of the same ticker
+            are built locally from the candles of the smallest interval instead of being received separately.
 
         Attributes
         ----------
 
-        self.history: Dict[str, pandas.DataFrame]
+        self.history: CandleHistory
             dictionary that stores historical data.
-            the dictionary is indexed by the topic and stores a dataframe of candlesticks, indexed by the close timestamp.
+            the dictionary is indexed by the topic and returns a dataframe of candlesticks, indexed by the close timestamp.
+            the dataframe is a lazily built view of the candle store of the topic.
+        self.candles: Dict[str, CandleStore]
+            fixed capacity columnar candle stores, indexed by topic
+        self.indicators: Dict[str, Indicator]
+            registered streaming indicators, indexed by their specification, e.g. "sma(candle.5.BTCUSDT.close, 24)"
         self.topics: List[str]
             topics to store
+        self.aggregators: Dict[str, List[CandleAggregator]]
+            aggregators of synthesized topics, indexed by their source topic
+        self.source_topics: List[str]
+            topics that need to be received, i.e. all topics that are not synthesized
         '''
 
-        # initialize history with empty dataframes and add client
-        self.history = {}
+        # initialize history with empty candle stores and add client
+        self.history = CandleHistory(topics=topics,
+                                     columns=PUBLIC_TOPICS_COLUMNS)
+        self.candles = self.history.stores
         self.client = client
         self.topics = topics
 
-        for topic in topics:
-            self.history[topic] = pd.DataFrame(columns=PUBLIC_TOPICS_COLUMNS)
-            self.history[topic]['confirm'] = self.history[topic][
-                'confirm'].astype(bool)
-
-    def on_message(self, message: json) -> Dict[str, Any]:
+        # registered indicators, indexed by specification and grouped by topic
+        self.indicators = {}
+        self.topic_indicators = {topic: [] for topic in topics}
+
+        # aggregators of locally synthesized topics, indexed by source topic
+        self.aggregators = {}
+        if synthesize:
+            for source, targets in plan_aggregation(topics).items():
+                self.aggregators[source] = [
+                    CandleAggregator(source=source, target=target)
+                    for target in targets
+                ]
+        synthesized = [
+            aggregator.target
+            for aggregators in self.aggregators.values()
+            for aggregator in aggregators
+        ]
+        self.source_topics = [
+            topic for topic in topics if topic not in synthesized
+        ]
+
+    def on_message(self, message: Union[str, Message]) -> Candle:
         '''
         Receive new market data and store the data in the appropriate history, indexed by the topic.
         The last row is the current candle and gets updated until candle is full.
 
         Parameters
         ----------
-        msg: json
+        message: Union[str, Message]
             message received from api, i.e. data to store
 
         Returns
         ----------
-        data: Dict[str, Any]
-            extracted data
+        data: Candle
+            extracted candle with int64 epoch nanosecond timestamps
         '''
         # extract message
-        msg = json.loads(message)
+        msg = Message.parse(message)
 
-        if 'topic' in msg.keys():
+        if msg.topic:
             # extract topic
-            topic = msg['topic']
+            topic = msg.topic
 
             # check if topic is in private topics
             if topic in self.topics:
 
                 # extract candlestick data
-                data = format_klines(msg=msg)
-
-                # add to history
-                self.history[topic].loc[data['end']] = data
-
-                # restrict history to last 1000 datapoints
-                self.history[topic] = self.history[topic].iloc[-2000:]
-                return data
+                return self.on_candle(topic=topic,
+                                      data=decode_candle(msg.data[0]))
             else:
                 # print('MarketData.on_message: topic: {} is not known\n{}'.format(topic,message))
                 return False
@@ -110,6 +145,32 @@ class MarketData:
             # print('MarketData.on_message: Could not process ws message:\n{}'.format(message))
             return False
 
+    def on_candle(self, topic: str, data: Candle) -> Candle:
+        '''
+        Store a decoded candle of a known topic, update its indicators and the candles synthesized from it.
+
+        Parameters
+        ----------
+        topic: str
+            public topic of the candle
+        data: Candle
+            decoded candle with int64 epoch nanosecond timestamps
+
+        Returns
+        ----------
+        data: Candle
+            stored candle
+        '''
+        # add to history, a candle with the same end timestamp overwrites the last candle
+        self.candles[topic].append(data)
+
+        # update streaming indicators with confirmed candles
+        self.update_indicators(topic=topic, data=data)
+
+        # update candles that are synthesized from this topic
+        self.update_aggregators(topic=topic, data=data)
+        return data
+
     def add_history(self, topic: str, data: pd.DataFrame) -> pd.DataFrame:
         '''
         add historical candlestick data
@@ -130,12 +191,138 @@ class MarketData:
         '''
         self.history[topic] = pd.concat([data, self.history[topic]])
 
-        # self.history[topic] = self.history[topic].sort_index()
+        # recompute indicators of topic on the extended history
+        specs = [(indicator.spec, indicator.history.capacity)
+                 for indicator in self.topic_indicators[topic]]
+        self.topic_indicators[topic] = []
+        for spec, capacity in specs:
+            del self.indicators[spec]
+            self.register_indicator(spec, capacity=capacity)
 
         return self.history[topic]
 
-    def build_history(self, symbols: Dict[str, str], start_str: str,
-                      end_str: str) -> Dict[str, pd.DataFrame]:
+    def register_indicator(self,
+                           spec: str,
+                           capacity: int = HISTORY_CAPACITY) -> Indicator:
+        '''
+        Register a streaming indicator that is updated in O(1) with every confirmed candle of its topic.
+        The indicator is warmed up with the confirmed candles that are already in the history.
+        Registering an already registered specification returns the existing indicator.
+
+        Parameters
+        ----------
+        spec: str
+            indicator specification, e.g. "sma(candle.5.BTCUSDT.close, 24)", "ema(candle.1.BTCUSDT.close, 12)",
+            "tr(candle.5.BTCUSDT)", "atr(candle.5.BTCUSDT, 14)" or "wilder_atr(candle.5.BTCUSDT, 14)"
+        capacity: int
+            number of past indicator values to keep
+
+        Returns
+        -------
+        indicator: Indicator
+            registered indicator. The latest value is available as indicator.value,
+            past values as indicator.values() or indicator.to_series()
+        '''
+        if spec in self.indicators:
+            return self.indicators[spec]
+
+        indicator = create_indicator(spec=spec,
+                                     topics=self.topics,
+                                     capacity=capacity)
+
+        # warm up indicator with confirmed candles in history
+        store = self.candles[indicator.topic]
+        columns = {
+            col: store.column(col)
+            for col in ['open', 'high', 'low', 'close', 'volume', 'turnover']
+        }
+        ends = store.column('end').view(np.int64)
+        confirms = store.column('confirm')
+        for i in np.flatnonzero(confirms):
+            candle = {col: values[i] for col, values in columns.items()}
+            candle['end'] = int(ends[i])
+            indicator.update(candle)
+
+        self.indicators[spec] = indicator
+        self.topic_indicators[indicator.topic].append(indicator)
+        return indicator
+
+    def on_candles(self, topic: str, columns: Dict[str, np.ndarray]) -> int:
+        '''
+        Store a block of confirmed candles of a known topic at once, e.g. to skip ahead in a backtest.
+        The candles are written into the candle store in one step and the indicators are updated candle by candle.
+
+        Parameters
+        ----------
+        topic: str
+            public topic of the candles
+        columns: Dict[str, numpy.ndarray]
+            columns of equal length ordered by the end timestamp, see CandleStore.extend
+
+        Returns
+        ----------
+        n: int
+            number of stored candles
+        '''
+        n = len(columns['end'])
+        names = list(columns.keys())
+        candles = (dict(zip(names, values)) for values in zip(
+            *[np.broadcast_to(columns[col], (n,)).tolist() for col in names]))
+
+        # synthesized topics recover their current bucket from the store, so the candles are stored one by one
+        if self.aggregators.get(topic):
+            for data in candles:
+                self.candles[topic].append(data)
+                self.update_indicators(topic=topic, data=data)
+                self.update_aggregators(topic=topic, data=data)
+            return n
+
+        self.candles[topic].extend(columns)
+        if self.topic_indicators[topic]:
+            for data in candles:
+                self.update_indicators(topic=topic, data=data)
+        return n
+
+    def update_indicators(self, topic: str, data: Dict[str, Any]):
+        '''
+        Update all registered indicators of a topic with a new candle. Unconfirmed candles are ignored.
+
+        Parameters
+        ----------
+        topic: str
+            public topic of the candle
+        data: Dict[str, Any]
+            new candle, either a dictionary or a typed record (see bybit_decoders.Candle)
+        '''
+        if data['confirm']:
+            for indicator in self.topic_indicators[topic]:
+                indicator.update(data)
+
+    def update_aggregators(self, topic: str, data: Dict[str, Any]):
+        '''
+        Update all topics that are synthesized from a source topic with a new source candle.
+        The current candle of each synthesized topic is updated in place until its bucket is full.
+
+        Parameters
+        ----------
+        topic: str
+            public source topic of the candle
+        data: Dict[str, Any]
+            new source candle, either a dictionary or a typed record (see bybit_decoders.Candle)
+        '''
+        for aggregator in self.aggregators.get(topic, []):
+            for candle in aggregator.update(data=data,
+                                            store=self.candles[topic]):
+                self.candles[aggregator.target].append(candle)
+                self.update_indicators(topic=aggregator.target, data=candle)
+
+    def build_history(self,
+                      symbols: Dict[str, str],
+                      start_str: str,
+                      end_str: str,
+                      concurrent: bool = True,
+                      progress: bool = True,
+                      cache: bool = True) -> Dict[str, pd.DataFrame]:
         '''
         Build market data history for trading model.
 
@@ -145,39 +332,89 @@ class MarketData:
             dictionary of relevant symbols for backtesting
             symbols for backtesting
             keys have format binance_ticker.binance_interval and values are coresponding bybit ws topics.
+            history of synthesized topics is aggregated from the history of their source topic and not downloaded.
         start_str: str
             start of simulation in format yyyy-mm-dd hh-mm-ss
         end_str: str
             end of simulation in format yyyy-mm-dd hh-mm-ss
+        concurrent: bool
+            if True, all topics and all pages of each topic are downloaded concurrently under a shared rate budget.
+            The result is identical to the sequential download.
+        progress: bool
+            show a progress bar of the concurrent download
+        cache: bool
+            if True, klines are loaded through the local kline cache and only missing ranges are downloaded.
+            Only applies to the concurrent download.
 
         Returns
         -------
         self.history: Dict[str, pandas.DataFrame]
             market data history
         '''
+        # synthesized topics are aggregated from their source topic
+        symbols = {
+            symbol: topic
+            for symbol, topic in symbols.items()
+            if topic in self.source_topics
+        }
+
+        # load history as list of lists from bybit
+        # ticker, interval = symbol.split('.')
+        start_ts = int(date_to_milliseconds(start_str))
+        end_ts = int(date_to_milliseconds(end_str))
+        ranges = {
+            symbol: tuple(symbol.split(':')) + (start_ts, end_ts)
+            for symbol in symbols
+        }
+        if concurrent and cache:
+            fetch = lambda gaps: fetch_kline_ranges(ranges=gaps,
+                                                    progress=progress)
+            msgs = load_klines(ranges=ranges, fetch=fetch, exchange='bybit')
+        elif concurrent:
+            msgs = fetch_kline_ranges(ranges=ranges, progress=progress)
+
+        history = {}
         for symbol in symbols.keys():
-            # load history as list of lists from binance
-            # ticker, interval = symbol.split('.')
-            ticker, interval = symbol.split(':')
-
-            # msg = None
-            # while msg == None:
-            #     try:
-            #         msg = self.client.get_historical_klines(symbol=ticker,
-            #                                                 start_str=start_str,
-            #                                                 end_str=end_str,
-            #                                                 interval=interval)
-            #     except:
-            #         self.client = Client(api_key=BINANCE_KEY,
-            #                              api_secret=BINANCE_SECRET)
-
-            msg = get_historical_klines(symbol=ticker,
-                                        start_str=start_str,
-                                        end_str=end_str,
-                                        interval=interval)
+            if concurrent:
+                msg = msgs[symbol]
+            else:
+                ticker, interval = symbol.split(':')
+                msg = get_historical_klines(symbol=ticker,
+                                            start_str=start_str,
+                                            end_str=end_str,
+                                            interval=interval)
 
             # format payload to dataframe
-            klines = format_historical_klines(msg).drop_duplicates()
+            history[symbols[symbol]] = format_historical_klines(
+                msg).drop_duplicates()
+
+        return self.load_history(history)
+
+    def load_history(
+            self, history: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+        '''
+        Add historical candlestick data of several topics, e.g. to warm up market data before a backtest.
+        The history of topics synthesized from a topic is aggregated from it, topics that are not stored are ignored.
+
+        Parameters
+        ----------
+        history: Dict[str, pandas.DataFrame]
+            historical candlestick data indexed by topic, see binance_functions.format_historical_klines
+
+        Returns
+        -------
+        self.history: Dict[str, pandas.DataFrame]
+            market data history
+        '''
+        for topic, klines in history.items():
+            if topic not in self.source_topics:
+                continue
+
+            self.add_history(topic=topic, data=klines)
 
-            self.add_history(topic=symbols[symbol], data=klines)
+            # aggregate history of topics synthesized from this topic
+            for aggregator in self.aggregators.get(topic, []):
+                self.add_history(topic=aggregator.target,
+                                 data=aggregate_candles(
+                                     data=klines, interval=aggregator.interval))
         return self.history
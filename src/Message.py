@@ -0,0 +1,70 @@
+# !/usr/bin/env python
+# coding: utf-8
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+
+from typing import Any, Dict, Union
+from src.endpoints.bybit_decoders import get_loads
+
+# json decoding function of the fastest installed backend
+loads = get_loads()
+
+
+class Message:
+    '''
+    Decoded websocket message that is passed down the dispatch chain,
+    so that every frame is parsed only once.
+    '''
+
+    __slots__ = ('topic', 'type', 'data', 'body')
+
+    def __init__(self, body: Dict[str, Any]):
+        '''
+        Parameters
+        ----------
+        body: Dict[str, Any]
+            decoded json payload of the websocket message
+
+        Attributes
+        ----------
+        self.topic: str
+            topic of the message, None for operational messages like subscription responses
+        self.type: str
+            type of the message, e.g. "snapshot" or "delta", None if not provided
+        self.data: Any
+            payload of the message, None if not provided
+        self.body: Dict[str, Any]
+            entire decoded message
+        '''
+        self.topic = body.get('topic')
+        self.type = body.get('type')
+        self.data = body.get('data')
+        self.body = body
+
+    @classmethod
+    def parse(
+            cls, message: Union[str, bytes, Dict[str, Any],
+                                'Message']) -> 'Message':
+        '''
+        Return message as Message object. Raw json strings are decoded, already decoded messages are returned as is.
+
+        Parameters
+        ----------
+        message: Union[str, bytes, Dict[str, Any], Message]
+            message received from api
+
+        Returns
+        -------
+        msg: Message
+            decoded message
+        '''
+        if isinstance(message, cls):
+            return message
+        if isinstance(message, (str, bytes)):
+            message = loads(message)
+        return cls(message)
+
+    def __repr__(self) -> str:
+        return 'Message(topic={}, type={}, data={})'.format(
+            self.topic, self.type, self.data)
@@ -0,0 +1,186 @@
+# !/usr/bin/env python
+# coding: utf-8
+
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+
+import time
+from typing import Any, Callable, Dict, List, Set
+from src.CandleAggregator import MINUTE_NS, parse_topic
+from src.CandleStore import to_ns
+
+
+class ModelCoalescer:
+    '''
+    Coalesces the model triggers of confirmed candles that close at the same timestamp.
+    At a boundary like a full quarter hour the 1m, 5m and 15m candles of a ticker close at once.
+    Instead of triggering the model once per candle, the candles are buffered
+    and the model is triggered once after all topics that close at the boundary have arrived.
+    A boundary with missing topics is released once a later candle of the ticker arrives or the timeout has passed.
+    '''
+
+    def __init__(self,
+                 topics: List[str],
+                 timeout_ms: float = None,
+                 clock: Callable[[], float] = None):
+        '''
+        Parameters
+        ----------
+        topics: List[str]
+            public kline topics that are received as messages, e.g. ["candle.1.BTCUSDT", "candle.5.BTCUSDT"]
+        timeout_ms: float
+            maximum time in milliseconds to wait for missing topics of a boundary. None disables the timeout.
+        clock: Callable[[], float]
+            current time in milliseconds. Default is the monotonic clock.
+            The backtest uses the simulated time, so that both paths release boundaries the same way.
+
+        Attributes
+        ----------
+        self.intervals: Dict[str, Dict[str, int]]
+            interval in nanoseconds of every topic with a minute interval, indexed by ticker and topic
+        self.pending: Dict[str, Dict[str, Any]]
+            buffered boundary of every ticker with its close timestamp, the received topics and the time of the first candle
+        self.released: Dict[str, int]
+            close timestamp of the last released boundary of every ticker in epoch nanoseconds
+        '''
+        self.timeout_ms = timeout_ms
+        self.clock = clock
+        self.intervals = {}
+        for topic in topics:
+            parsed = parse_topic(topic)
+            if parsed is None:
+                # e.g. daily candles are not aligned to the epoch, they are never waited for
+                continue
+            interval, ticker = parsed
+            self.intervals.setdefault(ticker, {})[topic] = interval * MINUTE_NS
+        self.pending = {}
+        self.released = {}
+
+    def now(self) -> float:
+        '''
+        Current time in milliseconds.
+        '''
+        if self.clock is None:
+            return time.monotonic() * 1000
+        return self.clock()
+
+    def release(self, ticker: str):
+        '''
+        Remove the buffered boundary of a ticker and remember its close timestamp, so that late candles of it are not buffered again.
+
+        Parameters
+        ----------
+        ticker: str
+            ticker of the boundary
+        '''
+        self.released[ticker] = self.pending.pop(ticker)['end']
+
+    def expected(self, ticker: str, end: int) -> Set[str]:
+        '''
+        Topics of a ticker that close at a timestamp.
+
+        Parameters
+        ----------
+        ticker: str
+            ticker of the candles
+        end: int
+            close timestamp in epoch nanoseconds
+        '''
+        return {
+            topic
+            for topic, interval_ns in self.intervals.get(ticker, {}).items()
+            if end % interval_ns == 0
+        }
+
+    def expire(self) -> List[str]:
+        '''
+        Release all boundaries that have been waiting for longer than the timeout.
+
+        Returns
+        -------
+        tickers: List[str]
+            tickers whose model needs to be triggered
+        '''
+        if self.timeout_ms is None:
+            return []
+        now = self.now()
+        tickers = [
+            ticker for ticker, boundary in self.pending.items()
+            if now - boundary['time'] >= self.timeout_ms
+        ]
+        for ticker in tickers:
+            self.release(ticker)
+        return tickers
+
+    def flush(self) -> List[str]:
+        '''
+        Release all buffered boundaries, e.g. at the end of a backtest.
+
+        Returns
+        -------
+        tickers: List[str]
+            tickers whose model needs to be triggered
+        '''
+        tickers = list(self.pending)
+        for ticker in tickers:
+            self.release(ticker)
+        return tickers
+
+    def add(self,
+            topic: str,
+            ticker: str,
+            data: Dict[str, Any],
+            trigger: bool = True) -> List[str]:
+        '''
+        Register a new candle and return the model triggers it releases.
+        Unconfirmed and late candles are not buffered, they trigger the model immediately if trigger is True.
+
+        Parameters
+        ----------
+        topic: str
+            public topic of the candle
+        ticker: str
+            ticker of the candle
+        data: Dict[str, Any]
+            new candle, either a dictionary or a typed record (see bybit_decoders.Candle)
+        trigger: bool
+            whether an unconfirmed candle triggers the model, e.g. the decision of a ModelThrottle
+
+        Returns
+        -------
+        tickers: List[str]
+            tickers whose model needs to be triggered, in the order of release
+        '''
+        end = to_ns(data['end'])
+        tickers = []
+
+        # a later candle of the ticker releases the previous boundary, even if topics are missing
+        boundary = self.pending.get(ticker)
+        if boundary is not None and end > boundary['end']:
+            self.release(ticker)
+            tickers.append(ticker)
+            boundary = None
+
+        # late candles of a released boundary are not buffered again
+        late = end <= self.released.get(
+            ticker, end - 1) or (boundary is not None and end < boundary['end'])
+        if not data['confirm'] or late:
+            if trigger:
+                tickers.append(ticker)
+            return tickers
+
+        if boundary is None:
+            boundary = {
+                'end': end,
+                'topics': set(),
+                'expected': self.expected(ticker=ticker, end=end) | {topic},
+                'time': self.now()
+            }
+            self.pending[ticker] = boundary
+        boundary['topics'].add(topic)
+
+        if boundary['expected'] <= boundary['topics']:
+            self.release(ticker)
+            tickers.append(ticker)
+        return tickers
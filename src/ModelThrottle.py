@@ -0,0 +1,80 @@
+# !/usr/bin/env python
+# coding: utf-8
+
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+
+import time
+import numpy as np
+from typing import Dict, Any
+
+
+class ModelThrottle:
+    '''
+    Decides whether an intra candle (unconfirmed) update triggers the trading model.
+    Confirmed candles always trigger the model. Unconfirmed candles only trigger the model
+    if the minimum interval since the last trigger has passed and the price moved by at least the threshold since the last trigger.
+    '''
+
+    def __init__(self,
+                 interval_ms: float = None,
+                 price_threshold: float = None):
+        '''
+        Parameters
+        ----------
+        interval_ms: float
+            minimum time in milliseconds between two triggers of the same ticker. None disables the condition.
+        price_threshold: float
+            minimum relative price move since the last trigger of the same ticker, e.g. 0.001 for 0.1%. None disables the condition.
+
+        Attributes
+        ----------
+        self.last_trigger: Dict[str, float]
+            monotonic time in milliseconds of the last trigger, indexed by ticker
+        self.last_price: Dict[str, float]
+            close price at the last trigger, indexed by ticker
+        '''
+        self.interval_ms = interval_ms
+        self.price_threshold = price_threshold
+        self.last_trigger = {}
+        self.last_price = {}
+
+    def should_trigger(self,
+                       ticker: str,
+                       data: Dict[str, Any],
+                       now: float = None) -> bool:
+        '''
+        Check whether a new candle of a ticker triggers the model and register the trigger.
+
+        Parameters
+        ----------
+        ticker: str
+            ticker of the candle
+        data: Dict[str, Any]
+            new candle, either a dictionary or a typed record (see bybit_decoders.Candle)
+        now: float
+            current time in milliseconds. Default is the monotonic clock.
+
+        Returns
+        -------
+        trigger: bool
+            True if the model should be triggered
+        '''
+        if now is None:
+            now = time.monotonic() * 1000
+        price = float(data['close'])
+
+        if not data['confirm']:
+            if self.interval_ms is not None and ticker in self.last_trigger:
+                if now - self.last_trigger[ticker] < self.interval_ms:
+                    return False
+            if self.price_threshold is not None and ticker in self.last_price:
+                last_price = self.last_price[ticker]
+                if np.abs(price - last_price
+                         ) < self.price_threshold * np.abs(last_price):
+                    return False
+
+        self.last_trigger[ticker] = now
+        self.last_price[ticker] = price
+        return True
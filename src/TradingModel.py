@@ -6,9 +6,13 @@ warnings.simplefilter(action='ignore', category=FutureWarning)
 warnings.simplefilter(action='ignore', category=RuntimeWarning)
 
 import json
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Union
 from .MarketData import MarketData
 from .AccountData import AccountData
+from .Message import Message
+from .endpoints.bybit_decoders import Candle
+from .ModelThrottle import ModelThrottle
+from .ModelCoalescer import ModelCoalescer
 from pybit import usdt_perpetual
 from binance.client import Client
 import yaml
@@ -43,7 +47,10 @@ class TradingModel:
                  topics: List[str] = PUBLIC_TOPICS,
                  model_storage: Dict[str, Any] = {},
                  model_args: Dict[str, Any] = {},
-                 model_stats: Dict[str, Any] = {}):
+                 model_stats: Dict[str, Any] = {},
+                 synthesize: bool = False,
+                 throttle: ModelThrottle = None,
+                 coalescer: ModelCoalescer = None):
         '''
         Parameters
         ----------
@@ -64,51 +71,148 @@ class TradingModel:
          model_stats: Dict[str, Any]
             optional additional statistics that can be stored during the backtest to be included into the trade report.
             each trade in each statistic must be indexed by the execution timestamp
+        synthesize: bool
+            if True, higher interval topics are built locally from the smallest interval of each ticker,
+            so that only market_data.source_topics need to be subscribed to
+        throttle: ModelThrottle
+            optional throttle for intra candle updates. If provided, unconfirmed candles only trigger the model
+            when the throttle allows it, while confirmed candles always trigger the model.
+            If None, every market data message triggers the model.
+        coalescer: ModelCoalescer
+            optional coalescer of confirmed candles. If provided, candles of several topics that close at the same timestamp
+            trigger the model once per ticker after all of them have arrived.
+            If None, every confirmed candle triggers the model.
         '''
 
         # initialize attributes and instantiate market and account data objects
-        self.market_data = MarketData(client=client, topics=topics)
+        self.market_data = MarketData(client=client,
+                                      topics=topics,
+                                      synthesize=synthesize)
         self.account = AccountData(http_session=http_session, symbols=symbols)
         self.model = model
         self.model_storage = model_storage
         self.model_args = model_args
         self.topics = topics
         self.model_stats = model_stats
+        self.throttle = throttle
+        self.coalescer = coalescer
 
-    def on_message(self, message: json) -> bool:
+        # tickers whose model waits for the exit of its open position, see wait_for_exit
+        self.waiting = set()
+
+    def wait_for_exit(self, ticker: str):
+        '''
+        Declare that the model of a ticker is idle until its open position is closed by stop loss or take profit.
+        The model is not triggered for the ticker until the position is closed, which allows backtests to skip ahead to the exit.
+
+        Parameters
+        ----------
+        ticker: str
+            ticker of the open position
+        '''
+        self.waiting.add(ticker)
+
+    def is_waiting(self, ticker: str) -> bool:
+        '''
+        Check whether the model of a ticker waits for the exit of its open position, see wait_for_exit.
+        The ticker stops waiting once the position is closed.
+
+        Parameters
+        ----------
+        ticker: str
+            ticker of the model
+        '''
+        if ticker not in self.waiting:
+            return False
+        if self.account.positions.get(ticker, {}).get('size', 0) > 0:
+            return True
+        self.waiting.discard(ticker)
+        return False
+
+    def call_model(self, ticker: str):
+        '''
+        Call the model of a ticker unless it waits for the exit of its open position.
+
+        Parameters
+        ----------
+        ticker: str
+            ticker of the model
+        '''
+        if not self.is_waiting(ticker):
+            self.model(model=self, ticker=ticker)
+
+    def release_expired(self):
+        '''
+        Trigger the model for all coalesced boundaries whose missing topics timed out.
+        '''
+        if self.coalescer is not None:
+            for ticker in self.coalescer.expire():
+                self.call_model(ticker=ticker)
+
+    def trigger_model(self, topic: str, data: Candle):
+        '''
+        Trigger the model after a new candle of a public topic has been stored in market data.
+
+        Parameters
+        ----------
+        topic: str
+            public topic of the candle
+        data: Candle
+            new candle, either a dictionary or a typed record (see bybit_decoders.Candle)
+        '''
+        ticker = ".".join(topic.split(".")[2:])
+
+        # intra candle updates only trigger the model if the throttle allows it
+        trigger = self.throttle is None or self.throttle.should_trigger(
+            ticker=ticker, data=data)
+
+        # confirmed candles that close at the same timestamp trigger the model once
+        if self.coalescer is not None:
+            tickers = self.coalescer.add(topic=topic,
+                                         ticker=ticker,
+                                         data=data,
+                                         trigger=trigger)
+        else:
+            tickers = [ticker] if trigger else []
+
+        for ticker in tickers:
+            self.call_model(ticker=ticker)
+
+    def on_message(self, message: Union[str, Message]) -> bool:
         '''
         Upon reception of new websocket data, forward to either MarketData or AccountData object
 
         Parameters
         ----------
-        msg: json
-            message received from api, i.e. data to store
+        message: Union[str, Message]
+            message received from api, i.e. data to store.
+            Raw json strings are decoded once and passed down as Message object.
         '''
         # extract message
-        msg = json.loads(message)
-        # print(msg)
+        msg = Message.parse(message)
 
-        if 'topic' in msg.keys():
+        # release coalesced boundaries whose missing topics timed out
+        self.release_expired()
+
+        if msg.topic:
             # extract topic
-            topic = msg['topic']
+            topic = msg.topic
 
             # if public topic, forward to market_data and trigger model
             if topic in self.topics:
-                response = self.market_data.on_message(message)
-                ticker = ".".join(topic.split(".")[2:])
-
-                self.model(model=self, ticker=ticker)
+                response = self.market_data.on_message(msg)
+                self.trigger_model(topic=topic, data=response)
                 return response
 
             # if private topic, forward to account
             elif topic in PRIVATE_TOPICS:
 
-                response = self.account.on_message(message)
+                response = self.account.on_message(msg)
                 return response
 
             else:
                 print('topic: {} is not known'.format(topic))
-                print(message)
+                print(msg.body)
                 return False
 
         else:
@@ -6,8 +6,13 @@ import warnings
 warnings.simplefilter(action='ignore', category=FutureWarning)
 warnings.simplefilter(action='ignore', category=RuntimeWarning)
 import pandas as pd
+import numpy as np
 from typing import Any, Dict, List
 from src.AccountData import AccountData
+from src.backtest.CandleArchive import CandleWindow, frame_windows
+from src.backtest.EquityCurve import EquityCurve
+from src.backtest.ExecutionLog import ExecutionLog
+from src.backtest.OrderBook import OrderBook
 import itertools
 import yaml
 from dotenv import load_dotenv
@@ -51,6 +56,9 @@ class BacktestAccountData(AccountData):
             The first layer is indexed by the symbol and holds all executions for that symbol
             These executions are organized in another dict, indexed by the order id
             This dictionary holds the third dictionary with the execution information
+        self.execution_log = Dict[str, ExecutionLog]
+            columnar append-only log of the executions of every symbol, indexed by symbol, see update_executions.
+            Used for the performance report, models read self.executions like in live trading
         self.orders = Dict[str, Dict[str, Dict[str, Any]]]
             Orders are organized in a 3 layer dict.
             The first layer is indexed by the symbol and holds all orders for that symbol
@@ -61,13 +69,23 @@ class BacktestAccountData(AccountData):
             The first layer is indexed by the symbol and holds all stop orders for that symbol
             These stop orders are organized in another dict, indexed by the order id
             This dictionary holds the third dictionary with the stop order information
+        self.order_books: Dict[str, OrderBook]
+            resting limit and untriggered conditional orders, indexed by symbol.
+            Entries are identified by ("order", order_id) or ("stop_order", stop_order_id)
         self.wallet = Dict[str, Dict[str, Any]]
             wallet data, indexed by symbol
             each symbol is indexed to another dict that holds balance, margin etc. for that symbol
         self.timestamp = pandas.Timestamp
             current timestamp in backtesting simulation
+        self.equity: EquityCurve
+            mark-to-market equity, exposure and running maximum drawdown with one point per candle of market data, see record_equity
+        self.marked: Dict[str, None]
+            symbols that received market data, in order. Only their positions can be marked to market
         self.simulation_data: pandas.DataFrame
-            simulation data for backtesting, used in account for trade pricing.
+            simulation data for backtesting. Attaching simulation data also sets self.windows.
+        self.windows: Dict[str, CandleWindow]
+            sorted close timestamps and prices of the simulation data, indexed by topic.
+            Used in account for trade pricing, either built from self.simulation_data or zero-copy windows of the candle archive.
         '''
 
         # build all possible tuples from symbols
@@ -86,8 +104,12 @@ class BacktestAccountData(AccountData):
             } for symbol in symbol_tuples
         }
         self.executions = {symbol: {} for symbol in symbol_tuples}
+        self.execution_log = {
+            symbol: ExecutionLog(symbol=symbol) for symbol in symbol_tuples
+        }
         self.orders = {symbol: {} for symbol in symbol_tuples}
         self.stop_orders = {symbol: {} for symbol in symbol_tuples}
+        self.order_books = {symbol: OrderBook() for symbol in symbol_tuples}
         self.wallet = {
             symbol: {
                 "coin": symbol,
@@ -96,11 +118,26 @@ class BacktestAccountData(AccountData):
             } for symbol in symbols
         }
         self.timestamp = None
+        self.equity = EquityCurve()
+        self.marked = {}
 
         # initialize empty simulation data
         # formatted dataframe of binance candles
+        self.windows = None
         self.simulation_data = None
 
+    @property
+    def simulation_data(self) -> pd.DataFrame:
+        return self._simulation_data
+
+    @simulation_data.setter
+    def simulation_data(self, data: pd.DataFrame):
+        '''
+        Attach simulation data and precompute the sorted per topic arrays that are used for trade pricing.
+        '''
+        self._simulation_data = data
+        self.windows = frame_windows(data) if data is not None else None
+
     def place_order(self,
                     symbol: str,
                     order_type: str,
@@ -122,7 +159,9 @@ class BacktestAccountData(AccountData):
                     position_idx: int = 0) -> Dict[str, Any]:
         '''
         Place a mock order for backtesting.
-        by updating account data acco.
+        Market orders and marketable limit orders are executed at the open of the next candle.
+        Other limit orders rest in the order book until a candle reaches their price (see match_orders),
+        unless time_in_force is "FillOrKill" or "ImmediateOrCancel", in which case they are cancelled.
 
         Parameters
         ----------
@@ -136,9 +175,12 @@ class BacktestAccountData(AccountData):
         qty: int
             number of contracts to trade
         order_type: str
-            Type of order. Currently only market orders are supported.
+            Type of order.
+            Options:
+                "Market"
+                "Limit"
         price: float
-            if order_type="Limit": limit price for the order -> Currently not supported.
+            if order_type="Limit": limit price for the order
         stop_loss: float
             stop loss price of order
         take_profit: float
@@ -150,26 +192,19 @@ class BacktestAccountData(AccountData):
         Returns
         -------
         response: Dict[str, Any]
-            response body for execution
+            response body for execution, or the order if order_type="Limit"
         '''
         # order time + 1 minute
         # order_time_1 = pd.Timestamp(self.timestamp.value + 60000000000)
 
-        # get next available timestamp
-        short_term_history_index = self.simulation_data.loc[
-            self.simulation_data.index.get_level_values(
-                1) == 'candle.1.{}'.format(symbol)].index
-        exec_time_index = short_term_history_index[
-            short_term_history_index.get_level_values(0) > self.timestamp][0]
+        # get next available candle via binary search on the sorted close timestamps
+        window = self.windows['candle.1.{}'.format(symbol)]
+        idx = window.index_after(self.timestamp)
 
         # get quotes from simulation data
-        # quotes = self.simulation_data.loc[(order_time_1,
-        #                                    'candle.1.{}'.format(symbol))]
-        quotes = self.simulation_data.loc[exec_time_index]
-
-        execution_time = quotes['start']
-        price_sell = quotes['open']
-        price_buy = quotes['open']
+        execution_time = pd.Timestamp(int(window['start'][idx]))
+        price_sell = float(window['open'][idx])
+        price_buy = float(window['open'][idx])
 
         if order_type.lower() == 'market':
 
@@ -198,8 +233,395 @@ class BacktestAccountData(AccountData):
                                      take_profit=take_profit,
                                      reduce_only=reduce_only)
 
+        elif order_type.lower() == 'limit':
+
+            # stop distance and limit distance are relative to the limit price
+            trade_dir = ((side.upper() == 'BUY') - 0.5) * 2
+            if stop_distance:
+                stop_loss = price - trade_dir * stop_distance
+            if limit_distance:
+                take_profit = price + trade_dir * limit_distance
+
+            order = self.new_order(symbol=symbol,
+                                   order_type='Limit',
+                                   side=side,
+                                   qty=qty,
+                                   price=price,
+                                   time_in_force=time_in_force,
+                                   order_link_id=order_link_id,
+                                   reduce_only=reduce_only,
+                                   close_on_trigger=close_on_trigger,
+                                   position_idx=position_idx,
+                                   stop_loss=stop_loss,
+                                   take_profit=take_profit)
+            self.submit_order(
+                order=order,
+                quote=price_buy if side.upper() == 'BUY' else price_sell,
+                execution_time=execution_time)
+            execution = self.orders[symbol][order['order_id']]
+
+        return execution
+
+    def place_conditional_order(
+            self,
+            symbol: str,
+            order_type: str,
+            side: str,
+            qty: int,
+            price: float = None,
+            base_price: float = None,
+            stop_px: float = None,
+            time_in_force: str = "FillOrKill",
+            trigger_by: str = "LastPrice",
+            order_link_id: str = None,
+            reduce_only: bool = False,
+            close_on_trigger: bool = False) -> Dict[str, Any]:
+        '''
+        Place a mock conditional order for backtesting, see AccountData.place_conditional_order.
+        The order rests in the order book until a candle reaches stop_px (see match_orders).
+        Once triggered, a market order is executed at stop_px, or at the open if the candle gaps through it,
+        and a limit order is submitted like a limit order of place_order.
+
+        Parameters
+        ----------
+        symbol: str
+            trading pair
+        order_type: str
+            Type of order.
+            Options:
+                "Limit"
+                "Market"
+        side: str
+            which side to trade
+            Options:
+                "Buy"
+                "Sell"
+        qty: int
+            number of contracts to trade
+        price: float
+            if order_type="Limit": limit price for the order
+        base_price: float
+            price that is compared to stop_px to determine the expected direction of the conditional order.
+            Defaults to the open of the next candle.
+            stop_px > base_price --> order is triggered by rising price
+            stop_px < base_price --> order is triggered by falling price
+        stop_px: float
+            trigger price of the order
+        time_in_force: str = "FillOrKill"
+            "Time in Force" strategy of the order after it was triggered
+        trigger_by: str = "LastPrice"
+            the type of reported price to use as market reference. Backtests always trigger by last price.
+        order_link_id: str = None
+            Optional unique order id to identify order
+        reduce_only: bool = False
+            If true, the position can only reduce in size and no stop loss or profit taking is possible.
+        close_on_trigger: bool = False
+            This flag will enforce liquidiation of other positions if trigger is met and not enough margin is available.
+
+        Returns
+        -------
+        stop_order: Dict[str, Any]
+            untriggered stop order
+        '''
+        if base_price is None:
+            window = self.windows['candle.1.{}'.format(symbol)]
+            base_price = float(window['open'][window.index_after(
+                self.timestamp)])
+
+        stop_order = {
+            "stop_order_id": len(self.stop_orders[symbol]) + 1,
+            "order_link_id": order_link_id,
+            "user_id": None,
+            "symbol": symbol,
+            "side": side.upper(),
+            "order_type": order_type.capitalize(),
+            "price": price,
+            "qty": qty,
+            "time_in_force": time_in_force,
+            "create_type": "CreateByUser",
+            "cancel_type": "UNKNOWN",
+            "order_status": "Untriggered",
+            "stop_order_type": "Stop",
+            "tp_trigger_by": trigger_by,
+            "trigger_price": stop_px,
+            "create_time": self.timestamp,
+            "update_time": self.timestamp,
+            "reduce_only": reduce_only,
+            "close_on_trigger": close_on_trigger,
+            "position_idx": 0,
+            "take_profit": 0.0,
+            "stop_loss": 0.0
+        }
+        self.update_stop_orders([stop_order])
+        self.order_books[symbol].add(order_id=("stop_order",
+                                               stop_order['stop_order_id']),
+                                     price=stop_px,
+                                     rising=stop_px > base_price)
+
+        return stop_order
+
+    def new_order(self,
+                  symbol: str,
+                  order_type: str,
+                  side: str,
+                  qty: int,
+                  price: float = None,
+                  time_in_force: str = "GoodTillCancel",
+                  order_link_id: str = None,
+                  reduce_only: bool = False,
+                  close_on_trigger: bool = False,
+                  position_idx: int = 0,
+                  stop_loss: float = None,
+                  take_profit: float = None) -> Dict[str, Any]:
+        '''
+        Create a new order in the shape of the bybit order stream and store it in self.orders.
+
+        Returns
+        -------
+        order: Dict[str, Any]
+            new order with order_status "New"
+        '''
+        order = {
+            "order_id": len(self.orders[symbol]) + 1,
+            "order_link_id": order_link_id,
+            "symbol": symbol,
+            "side": side.upper(),
+            "order_type": order_type,
+            "price": price,
+            "qty": qty,
+            "leaves_qty": qty,
+            "last_exec_price": 0.0,
+            "cum_exec_qty": 0.0,
+            "cum_exec_value": 0.0,
+            "cum_exec_fee": 0.0,
+            "time_in_force": time_in_force,
+            "create_type": "CreateByUser",
+            "cancel_type": "UNKNOWN",
+            "order_status": "New",
+            "take_profit": take_profit,
+            "stop_loss": stop_loss,
+            "trailing_stop": 0.0,
+            "create_time": self.timestamp,
+            "update_time": self.timestamp,
+            "reduce_only": reduce_only,
+            "close_on_trigger": close_on_trigger,
+            "position_idx": position_idx
+        }
+        self.update_orders([order])
+        return order
+
+    def submit_order(self, order: Dict[str, Any], quote: float,
+                     execution_time: pd.Timestamp) -> Dict[str, Any]:
+        '''
+        Execute an order against a quote if it is marketable.
+        Otherwise the order is cancelled according to its time in force or rests in the order book.
+
+        Parameters
+        ----------
+        order: Dict[str, Any]
+            new order, see new_order
+        quote: float
+            current price of the symbol
+        execution_time: pandas.Timestamp
+            timestamp of the quote
+
+        Returns
+        -------
+        execution: Dict[str, Any]
+            execution of the order, None if the order was not executed
+        '''
+        buy = order['side'] == 'BUY'
+        marketable = order['order_type'] == 'Market' or (
+            quote <= order['price'] if buy else quote >= order['price'])
+        time_in_force = order['time_in_force'].lower()
+
+        if marketable and time_in_force != 'postonly':
+            return self.fill_order(order=order,
+                                   trade_price=quote,
+                                   execution_time=execution_time)
+        if marketable or time_in_force in ['fillorkill', 'immediateorcancel']:
+            self.update_orders([
+                dict(order,
+                     order_status='Cancelled',
+                     cancel_type='CancelByUser',
+                     update_time=execution_time)
+            ])
+            return None
+
+        # buy limits rest below the market and are triggered by a falling price, sell limits vice versa
+        self.order_books[order['symbol']].add(order_id=("order",
+                                                        order['order_id']),
+                                              price=order['price'],
+                                              rising=not buy)
+        return None
+
+    def fill_order(self, order: Dict[str, Any], trade_price: float,
+                   execution_time: pd.Timestamp) -> Dict[str, Any]:
+        '''
+        Execute an order completely and update it to order_status "Filled".
+        Reduce only orders are cancelled if there is no opposite position left to reduce.
+
+        Parameters
+        ----------
+        order: Dict[str, Any]
+            order to fill, see new_order
+        trade_price: float
+            execution price
+        execution_time: pandas.Timestamp
+            execution timestamp
+
+        Returns
+        -------
+        execution: Dict[str, Any]
+            execution of the order, None if the order was cancelled
+        '''
+        pos = self.positions[order['symbol']]
+        if order['reduce_only'] and (pos['size'] == 0 or
+                                     pos['side'] == order['side']):
+            self.update_orders([
+                dict(order,
+                     order_status='Cancelled',
+                     cancel_type='CancelByReduceOnly',
+                     update_time=execution_time)
+            ])
+            return None
+
+        execution = self.execute(symbol=order['symbol'],
+                                 side=order['side'],
+                                 qty=order['qty'],
+                                 execution_time=execution_time,
+                                 trade_price=trade_price,
+                                 stop_loss=order['stop_loss'],
+                                 take_profit=order['take_profit'],
+                                 reduce_only=order['reduce_only'])
+        self.update_orders([
+            dict(order,
+                 order_status='Filled',
+                 leaves_qty=0.0,
+                 last_exec_price=trade_price,
+                 cum_exec_qty=execution['exec_qty'],
+                 cum_exec_value=execution['exec_qty'] * trade_price,
+                 cum_exec_fee=execution['exec_fee'],
+                 update_time=execution_time)
+        ])
         return execution
 
+    def match_orders(self, symbol: str,
+                     data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        '''
+        Trigger all resting orders of a symbol whose prices lie inside the range of a new candle, see OrderBook.trigger.
+        Only orders between the low and the high of the candle are visited, in the order of placement.
+        Limit orders and triggered conditional market orders are executed at their price,
+        or at the open if the candle gaps through it.
+        Triggered conditional limit orders are submitted at that price and rest from the next candle on if they are not marketable.
+
+        Parameters
+        ----------
+        symbol: str
+            trading pair
+        data: Dict[str, Any]
+            new candle stick data, either a dictionary or a typed record (see bybit_decoders.Candle)
+
+        Returns
+        -------
+        executions: List[Dict[str, Any]]
+            executions of all filled orders
+        '''
+        execution_time = pd.Timestamp(data['end'])
+        executions = []
+        for (kind, order_id), rising in self.order_books[symbol].trigger(
+                high=data['high'], low=data['low']):
+
+            if kind == "order":
+                order = self.orders[symbol][order_id]
+                price = order['price']
+            else:
+                stop_order = self.stop_orders[symbol][order_id]
+                self.update_stop_orders([
+                    dict(stop_order,
+                         order_status='Triggered',
+                         update_time=execution_time)
+                ])
+                order = self.new_order(
+                    symbol=symbol,
+                    order_type=stop_order['order_type'],
+                    side=stop_order['side'],
+                    qty=stop_order['qty'],
+                    price=stop_order['price'],
+                    time_in_force=stop_order['time_in_force'],
+                    order_link_id=stop_order['order_link_id'],
+                    reduce_only=stop_order['reduce_only'],
+                    close_on_trigger=stop_order['close_on_trigger'])
+                price = stop_order['trigger_price']
+
+            # candles that open beyond the price are executed at the open
+            trade_price = max(price, data['open']) if rising else min(
+                price, data['open'])
+
+            if kind == "order":
+                execution = self.fill_order(order=order,
+                                            trade_price=trade_price,
+                                            execution_time=execution_time)
+            else:
+                execution = self.submit_order(order=order,
+                                              quote=trade_price,
+                                              execution_time=execution_time)
+            if execution is not None:
+                executions.append(execution)
+
+        return executions
+
+    def cancel_order(self, symbol: str, order_id: int) -> Dict[str, Any]:
+        '''
+        Cancel a resting limit order.
+
+        Parameters
+        ----------
+        symbol: str
+            trading pair
+        order_id: int
+            id of the order
+
+        Returns
+        -------
+        order: Dict[str, Any]
+            cancelled order, None if the order is not resting
+        '''
+        if not self.order_books[symbol].remove(("order", order_id)):
+            return None
+        order = dict(self.orders[symbol][order_id],
+                     order_status='Cancelled',
+                     cancel_type='CancelByUser',
+                     update_time=self.timestamp)
+        self.update_orders([order])
+        return order
+
+    def cancel_conditional_order(self, symbol: str,
+                                 stop_order_id: int) -> Dict[str, Any]:
+        '''
+        Cancel an untriggered conditional order.
+
+        Parameters
+        ----------
+        symbol: str
+            trading pair
+        stop_order_id: int
+            id of the conditional order
+
+        Returns
+        -------
+        stop_order: Dict[str, Any]
+            deactivated stop order, None if the order is not untriggered
+        '''
+        if not self.order_books[symbol].remove(("stop_order", stop_order_id)):
+            return None
+        stop_order = dict(self.stop_orders[symbol][stop_order_id],
+                          order_status='Deactivated',
+                          cancel_type='CancelByUser',
+                          update_time=self.timestamp)
+        self.update_stop_orders([stop_order])
+        return stop_order
+
     def execute(self,
                 symbol: str,
                 side: str,
@@ -321,8 +743,8 @@ class BacktestAccountData(AccountData):
             "symbol": symbol,
             "side": side.upper(),
             "open": open,
-            "order_id": len(self.executions[symbol].keys()) + 1,
-            "exec_id": len(self.executions[symbol].keys()) + 1,
+            "order_id": len(self.executions[symbol]) + 1,
+            "exec_id": len(self.executions[symbol]) + 1,
             "price": trade_price,
             "order_qty": true_qty,
             "exec_type": "Trade",
@@ -335,17 +757,38 @@ class BacktestAccountData(AccountData):
 
         return execution
 
+    def update_executions(
+            self, msg: List[Dict[str,
+                                 Any]]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        '''
+        Update executions and append them to the execution log of their symbol, see AccountData.update_executions.
+
+        Parameters
+        ----------
+        msg: List[Dict[str, Any]]
+            list of new executions with consecutive order ids per symbol
+
+        Returns
+        -------
+        self.executions: Dict[str, Dict[str, Dict[str, Any]]]
+            updated executions
+        '''
+        for exec in msg:
+            self.execution_log[exec['symbol']][exec['order_id']] = exec
+        return super().update_executions(msg)
+
     def new_market_data(self, topic: str,
                         data: Dict[str, Any]) -> List[Dict[str, Any]]:
         '''
         If new candle is received update all orders, executions, positions and wallet.
+        Resting orders are matched before the stop loss and take profit of the position are checked.
 
         Parameters
         ----------
         topic: str
             public topic of data
         data: Dict[str, Any]
-            new candle stick data
+            new candle stick data, either a dictionary or a typed record (see bybit_decoders.Candle)
         
         Returns
         --------
@@ -353,6 +796,10 @@ class BacktestAccountData(AccountData):
             updated position of traded symbol
         '''
 
+        # fill resting orders whose prices lie inside the range of the candle
+        if self.order_books[topic]:
+            self.match_orders(symbol=topic, data=data)
+
         # determine direction of old position
         pos = self.positions[topic]
 
@@ -391,7 +838,7 @@ class BacktestAccountData(AccountData):
             self.execute(symbol=topic,
                          side=side_new,
                          qty=pos['size'],
-                         execution_time=data['end'],
+                         execution_time=pd.Timestamp(data['end']),
                          trade_price=trade_price,
                          stop_loss=None,
                          take_profit=None,
@@ -403,8 +850,114 @@ class BacktestAccountData(AccountData):
         # update position value according to new close price
         pos['position_value'] = pos['size'] * data['close']
 
+        # mark the account to market with the new close price
+        if topic not in self.marked:
+            self.marked[topic] = None
+        end = data['end']
+        if not isinstance(end, (int, np.integer)):
+            end = pd.Timestamp(end).value
+        self.record_equity(end=end)
+
         return pos
 
+    def record_equity(self, end: int):
+        '''
+        Record the mark-to-market equity of the account, see EquityCurve.record.
+        The equity is the available balance of the base currency plus the value of all marked positions, short positions count negative.
+        The exposure is the sum of the values of all marked positions.
+
+        Parameters
+        ----------
+        end: int
+            close timestamp of the candle in epoch nanoseconds
+        '''
+        equity = self.wallet[BASE_CUR]['available_balance']
+        exposure = 0.0
+        for symbol in self.marked:
+            pos = self.positions[symbol]
+            value = pos['position_value']
+            exposure += value
+            equity += value if pos['side'] == 'BUY' else -value
+        self.equity.record(end, equity, exposure)
+
+    def record_equity_block(self, symbol: str, end: np.ndarray,
+                            close: np.ndarray):
+        '''
+        Record the mark-to-market equity of a block of candles at once, while the position of a symbol is held unchanged,
+        e.g. the candles that are skipped while waiting for an exit. The result is the same as recording the candles one by one.
+
+        Parameters
+        ----------
+        symbol: str
+            symbol of the candles
+        end: numpy.ndarray
+            close timestamps of the candles in epoch nanoseconds
+        close: numpy.ndarray
+            close prices of the candles
+        '''
+        if symbol not in self.marked:
+            self.marked[symbol] = None
+        equity = self.wallet[BASE_CUR]['available_balance']
+        exposure = 0.0
+        for other in self.marked:
+            if other != symbol:
+                pos = self.positions[other]
+                value = pos['position_value']
+                exposure += value
+                equity += value if pos['side'] == 'BUY' else -value
+        pos = self.positions[symbol]
+        values = pos['size'] * np.asarray(close, dtype=np.float64)
+        sign = 1.0 if pos['side'] == 'BUY' else -1.0
+        self.equity.extend(end=end,
+                           equity=equity + sign * values,
+                           exposure=exposure + values)
+
+    def find_exit(self,
+                  symbol: str,
+                  window: CandleWindow,
+                  first: int,
+                  block_size: int = 256) -> int:
+        '''
+        Find the first candle of a window that triggers the stop loss or take profit of the open position, see new_market_data.
+        The low and high arrays are searched in blocks of growing size, so that early exits are found without scanning the entire window.
+
+        Parameters
+        ----------
+        symbol: str
+            trading pair of the position
+        window: CandleWindow
+            candles of the symbol sorted by close timestamp
+        first: int
+            index of the first candle to check
+        block_size: int
+            number of candles of the first block
+
+        Returns
+        -------
+        idx: int
+            index of the first triggering candle, len(window) if no candle triggers
+        '''
+        pos = self.positions[symbol]
+        buy = pos['side'].upper() == 'BUY'
+        sell = pos['side'].upper() == 'SELL'
+
+        while first < len(window):
+            last = min(first + block_size, len(window))
+            low = window['low'][first:last]
+            high = window['high'][first:last]
+            triggered = np.zeros(last - first, dtype=bool)
+            if pos['stop_loss']:
+                triggered |= (buy * pos['stop_loss'] > low) | (pos['stop_loss']
+                                                               < sell * high)
+            if pos['take_profit']:
+                triggered |= (pos['take_profit'] <
+                              buy * high) | (sell * pos['take_profit'] > low)
+            if triggered.any():
+                return first + int(np.argmax(triggered))
+            first = last
+            block_size *= 2
+        return len(window)
+
     def set_stop_loss(self, symbol: str, side: str, stop_loss: float):
         '''
         Set stop loss of open position.
@@ -6,10 +6,16 @@ warnings.simplefilter(action='ignore', category=FutureWarning)
 warnings.simplefilter(action='ignore', category=RuntimeWarning)
 
 import json
-from typing import List, Dict, Any
-from src.endpoints.bybit_functions import format_klines
+import itertools
+import numpy as np
+import pandas as pd
+from typing import List, Dict, Any, Iterator, Tuple, Union
+from src.endpoints.bybit_decoders import Candle, decode_candle
 from src.MarketData import MarketData
+from src.Message import Message
 from src.backtest.BacktestAccountData import BacktestAccountData
+from src.backtest.CandleArchive import CandleWindow
+from src.backtest.SimulationClock import SimulationClock
 from binance.client import Client
 
 import yaml
@@ -61,23 +67,84 @@ class BacktestMarketData(MarketData):
         Attributes
         ----------
 
-        self.history: Dict[str, pandas.DataFrame]
+        self.history: CandleHistory
             dictionary that stores historical data.
-            the dictionary is indexed by the topic and stores a dataframe of candlesticks, indexed by the close timestamp.   
+            the dictionary is indexed by the topic and returns a dataframe of candlesticks, indexed by the close timestamp.
+        self.candles: Dict[str, CandleStore]
+            fixed capacity columnar candle stores, indexed by topic
         self.account: BacktestAccountData
             account data object to send new market data point to.
             Necessary to update real time account data endpoints like positions, open orders etc.
-        self.simulation_data: pandas.DataFrame
-            formatted binance candles for backtesting
-        self.bybit_messages: List[Dict[str, Any]]
-            formatted candles from self.simulation data that simulate bybit websocket messages
+        self.windows: Dict[str, CandleWindow]
+            simulation data as candle windows, indexed by topic. Simulated candles and messages are streamed from the windows.
+        self.timer: PhaseTimer
+            optional timer of the backtest, the market data and account updates of every candle are timed as laps
         '''
 
         super().__init__(client, topics)
         self.account = account
         self.binance_bybit_mapping = toppic_mapping
+        self.windows = None
+        self.timer = None
 
-    def on_message(self, message: json) -> Dict[str, Any]:
+    def candle_records(self,
+                       limit: int = None,
+                       chunk_size: int = 65536,
+                       after: int = None) -> Iterator[Tuple[str, Candle]]:
+        '''
+        Walk the candle windows in self.windows and return decoded candles without simulating websocket messages.
+        The windows are merged lazily by a SimulationClock, so that memory stays bounded regardless of the length of the backtest.
+        Candles are ordered by close timestamp, candles that close at the same timestamp by the finest interval first.
+
+        Parameters
+        ----------
+        limit: int
+            maximum number of candles, None for all candles
+        chunk_size: int
+            maximum number of candles per window that are decoded at once
+        after: int
+            optional close timestamp in epoch nanoseconds, only candles that close after it are returned.
+            Used to continue the simulation after skipping ahead. None for all candles
+
+        Returns
+        -------
+        records: Iterator[Tuple[str, Candle]]
+            topic and candle with int64 epoch nanosecond timestamps
+        '''
+        clock = SimulationClock(windows=self.windows,
+                                after=after,
+                                chunk_size=chunk_size)
+        return itertools.islice(clock, limit)
+
+    def candle_messages(self,
+                        limit: int = None,
+                        after: int = None) -> Iterator[Message]:
+        '''
+        Simulate bybit websocket messages lazily from the candle windows in self.windows, see candle_records.
+
+        Parameters
+        ----------
+        limit: int
+            maximum number of messages, None for all candles
+        after: int
+            optional close timestamp in epoch nanoseconds, only candles that close after it are simulated. None for all candles
+
+        Returns
+        -------
+        messages: Iterator[Message]
+            simulated websocket messages
+        '''
+        for topic, candle in self.candle_records(limit=limit, after=after):
+            data = candle._asdict()
+            data['start'] = candle.start / 1000000000
+            data['end'] = candle.end / 1000000000
+            yield Message({
+                "topic": topic,
+                "data": [data],
+                "timestamp_e6": candle.end
+            })
+
+    def on_message(self, message: Union[str, Message]) -> Candle:
         '''
         Receive new market data and store the data in the appropriate history, indexed by the topic.
         The last row is the current candle and gets updated until candle is full.
@@ -85,42 +152,27 @@ class BacktestMarketData(MarketData):
 
         Parameters
         ----------
-        msg: json
+        message: Union[str, Message]
             message received from api, i.e. data to store
 
         Returns
         ----------
-        data: Dict[str, Any]
-            extracted data
+        data: Candle
+            extracted candle with int64 epoch nanosecond timestamps
         '''
         # extract message
-        msg = json.loads(message)
+        msg = Message.parse(message)
 
-        if 'topic' in msg.keys():
+        if msg.topic:
             # extract topic
-            topic = msg['topic']
+            topic = msg.topic
 
             # check if topic is in private topics
             if topic in self.topics:
 
                 # extract candlestick data
-                data = format_klines(msg=msg)
-
-                # add to history
-                self.history[topic].loc[data['end']] = data
-
-                # update timestamp of account
-                self.account.timestamp = self.history[self.topics[0]].index[-1]
-
-                # restrict history to last 1000 datapoints
-                self.history[topic] = self.history[topic].iloc[-2000:]
-
-                # if new market data is received (i.e. one minute candle), trigger account data update
-                if topic == self.topics[0]:
-                    self.account.new_market_data(
-                        topic=self.binance_bybit_mapping[topic], data=data)
-
-                return data
+                return self.on_candle(topic=topic,
+                                      data=decode_candle(msg.data[0]))
             else:
                 # print('BacktestMarketData.on_message: topic: {} is not known \n{}'.format(topic, message))
                 return False
@@ -129,3 +181,34 @@ class BacktestMarketData(MarketData):
             # print('BacktestMarketData.on_message: Could not process message:{}'.format(message))
 
             return False
+
+    def on_candle(self, topic: str, data: Candle) -> Candle:
+        '''
+        Store a decoded candle of a known topic, see MarketData.on_candle.
+        Additionally trigger new_market_data function of account to update real time account data endpoints.
+
+        Parameters
+        ----------
+        topic: str
+            public topic of the candle
+        data: Candle
+            decoded candle with int64 epoch nanosecond timestamps
+
+        Returns
+        ----------
+        data: Candle
+            stored candle
+        '''
+        super().on_candle(topic=topic, data=data)
+        if self.timer is not None:
+            self.timer.lap('market_data')
+
+        # if new market data is received (i.e. one minute candle), update timestamp of account and trigger account data update
+        if topic == self.topics[0]:
+            self.account.timestamp = pd.Timestamp(data['end'])
+            self.account.new_market_data(
+                topic=self.binance_bybit_mapping[topic], data=data)
+            if self.timer is not None:
+                self.timer.lap('account')
+
+        return data
@@ -6,15 +6,25 @@ warnings.simplefilter(action='ignore', category=FutureWarning)
 warnings.simplefilter(action='ignore', category=RuntimeWarning)
 
 import pandas as pd
+import numpy as np
 import json
-from typing import Any, Dict, List
+import pickle
+import tempfile
+import cProfile
+from typing import Any, Dict, List, Tuple
 from src.TradingModel import TradingModel
+from src.ModelCoalescer import ModelCoalescer
 from src.backtest.BacktestAccountData import BacktestAccountData
 from src.backtest.BacktestMarketData import BacktestMarketData
 from binance.client import Client
-from src.endpoints.binance_functions import binance_to_bybit
+from src.endpoints.binance_functions import format_simulation_data
 # from src.endpoints.binance_functions import create_simulation_data
-from src.endpoints.bybit_functions import create_simulation_data
+from src.endpoints.bybit_functions import create_simulation_data, fetch_kline_ranges
+from src.backtest.CandleArchive import ARCHIVE_DTYPES, CandleWindow, frame_windows, load_windows
+from src.backtest.SimulationClock import drop_last
+from src.backtest.performance import attach_model_stats, count_round_trips, execution_columns
+from src.backtest.PhaseTimer import PhaseTimer
+from src.backtest.warmup import load_warmup
 
 from tqdm import tqdm
 import json
@@ -39,6 +49,11 @@ BACKTEST_SYMBOLS = config.get('backtest_symbols')
 BINANCE_BYBIT_MAPPING = config.get('binance_bybit_mapping')
 HIST_TICKERS = config.get('hist_tickers')
 
+# attributes of account and market data that are not part of a checkpoint, e.g. simulation data and connections
+CHECKPOINT_EXCLUDE = [
+    'windows', '_simulation_data', 'client', 'account', 'timer'
+]
+
 
 class BacktestTradingModel(TradingModel):
     '''
@@ -56,7 +71,8 @@ class BacktestTradingModel(TradingModel):
                  backtest_symbols: Dict[str, str] = BACKTEST_SYMBOLS,
                  model_storage: Dict[str, Any] = {},
                  model_args: Dict[str, Any] = {},
-                 model_stats: Dict[str, Any] = {}):
+                 model_stats: Dict[str, Any] = {},
+                 coalescer: ModelCoalescer = None):
         '''
         Parameters
         ----------
@@ -82,6 +98,14 @@ class BacktestTradingModel(TradingModel):
         model_stats: Dict[str, Any]
             optional additional statistics that can be stored during the backtest to be included into the trade report.
             each trade in each statistic must be indexed by the execution timestamp
+        coalescer: ModelCoalescer
+            optional coalescer of candles that close at the same timestamp, see TradingModel.
+            Its clock is set to the simulated time, so that boundaries are released like in live trading.
+
+        Attributes
+        ----------
+        self.timer: PhaseTimer
+            cumulative wall and cpu time of the phases of the last backtest and latency histogram of the model calls
         '''
 
         # initialize attributes and instantiate market and account data objects
@@ -99,16 +123,37 @@ class BacktestTradingModel(TradingModel):
         self.model_args = model_args
         self.model_stats = model_stats
 
+        # simulated candles are always confirmed, so they are never throttled
+        self.throttle = None
+        self.waiting = set()
+        self.coalescer = coalescer
+        if self.coalescer is not None:
+            self.coalescer.clock = lambda: self.account.timestamp.value / 1000000
+
         # list of bybit websocket messages for simulation
         self.bybit_messages = None
 
+        self.timer = PhaseTimer()
+
     def run_backtest(self,
                      symbols: Dict[str, str],
                      start_history: str,
                      start_str: str,
                      end_str: str,
-                     slice_length: int = 50000,
-                     save_output: bool = False) -> Dict[str, float]:
+                     slice_length: int = None,
+                     save_output: bool = False,
+                     archive: bool = False,
+                     direct: bool = False,
+                     windows: Dict[str, CandleWindow] = None,
+                     run_id: str = None,
+                     create_report: bool = True,
+                     fast_forward: bool = False,
+                     checkpoint_dir: str = None,
+                     checkpoint_freq: str = '1D',
+                     resume: str = None,
+                     profile: bool = False,
+                     warmup: bool = False,
+                     verbose: bool = False) -> Dict[str, float]:
         '''
         Run a backtest by simulating websocket messages from bybit through historical klines from binance and return a performance report.
         Parameters
@@ -125,10 +170,47 @@ class BacktestTradingModel(TradingModel):
         end_str: str
             end of simulation in format yyyy-mm-dd hh-mm-ss
         slice_length: int
-            length of partial time series to use for simulations.
-            Used to improve memory usage and speed up computation. Default is 50000.
+            deprecated, the backtest is always simulated as one series.
+            Sliced backtests with a warm-up overlap are run in parallel by sweep.run_walk_forward. Default is None
         save_output: bool
-            flag whether to export performance report and trade list to excel. Default is False
+            flag whether to export performance report and trade list to excel and the equity curve to csv,
+            see BacktestAccountData.record_equity. Default is False
+        archive: bool
+            flag whether to read simulation data as zero-copy windows of the memory mapped candle archive
+            instead of loading it into a dataframe. Default is False
+        direct: bool
+            flag whether to push decoded candles from sorted per topic arrays directly into market and account data
+            instead of simulating json websocket messages. The model sees the same data in the same order. Default is False
+        windows: Dict[str, CandleWindow]
+            optional preloaded simulation data of the entire backtest as candle windows indexed by topic, e.g. shared between the runs of a parameter sweep.
+            If provided, no simulation data is loaded. Default is None
+        run_id: str
+            optional identifier of the run that is appended to the names of exported files, see create_performance_report. Default is None
+        create_report: bool
+            flag whether to create the performance report. If False, an empty report is returned
+            and the results are only available in the account, e.g. to stitch several backtests. Default is True
+        fast_forward: bool
+            flag whether to skip ahead to the exit of a position while the model waits for it, see TradingModel.wait_for_exit and skip_to_exit.
+            Only used in direct mode without coalescer. Default is False
+        checkpoint_dir: str
+            optional directory to periodically write checkpoints of the backtest state to, see save_checkpoint. Default is None
+        checkpoint_freq: str
+            simulated time between two checkpoints, e.g. "12h". Default is "1D"
+        resume: str
+            optional path of a checkpoint to resume the backtest from, see load_checkpoint.
+            The simulation continues with the first candle after the checkpoint, the model arguments of this model are kept,
+            so that a checkpoint can be forked with different model_args. Default is None
+        profile: bool
+            flag whether to capture a cProfile profile of the backtest and write it next to the evaluation outputs,
+            see timing_name. The phases of the backtest are always timed, see PhaseTimer. Default is False
+        warmup: bool
+            flag whether to warm up market data with the history from start_history to start_str before the simulation.
+            The history is loaded through the local kline cache and a warm-up snapshot that is shared by all backtests
+            with the same symbols and history, see warmup.load_warmup. Default is False
+        verbose: bool
+            flag whether to print the timing report and the risk summary of the equity curve after the backtest,
+            e.g. for a single backtest from the command line.
+            Parallel backtests of sweeps stay quiet. Default is False
 
         Returns
         -------
@@ -136,105 +218,196 @@ class BacktestTradingModel(TradingModel):
             performance report
         '''
 
-        # store initial budget for performance measures
-        initial_budget = self.account.wallet[BASE_CUR]['available_balance']
-
-        print('Loading historical data...')
+        if slice_length is not None:
+            warnings.warn(
+                'slice_length is ignored, use sweep.run_walk_forward to run sliced backtests',
+                DeprecationWarning,
+                stacklevel=2)
 
-        ###################### For Crypto Backtest with Binance ###########################################
+        # time the phases of the backtest, candles are timed as laps in market data and call_model
+        self.timer = PhaseTimer()
+        self.market_data.timer = self.timer
+        profiler = None
+        if profile:
+            profiler = cProfile.Profile()
+            profiler.enable()
 
-        # read history from csv
-        # for symbol in symbols.keys():
-        #     history = pd.read_csv('src/backtest/data/history_{}_{}_{}.csv'.format(symbols[symbol],start_history,start_str), parse_dates=['start','end'], dtype={'open':float,'high':float,'low':float,'close':float,'volume':float,'turnover':float})
-        #     history = history.set_index('end',drop=False)
-        #     self.market_data.history[symbols[symbol]] = pd.concat([history, self.market_data.history[symbols[symbol]]])
+        # store initial budget for performance measures
+        initial_budget = self.account.wallet[BASE_CUR]['available_balance']
 
-        # add historical data for trading model
-        # self.market_data.build_history(symbols=symbols,
-        #                                start_str=start_history,
-        #                                end_str=start_str)
+        # restore the state of a checkpoint, the simulation continues after its clock
+        after = None
+        if resume is not None:
+            after, initial_budget = self.load_checkpoint(path=resume)
 
-        # write history to csv
-        # for ticker in self.market_data.history.keys():
-        #     self.market_data.history[ticker].to_csv('src/backtest/data/history_{}_{}_{}.csv'.format(ticker,start_history,start_str))
+        print('Loading historical data...')
 
-        ######################################################################################################
+        # warm up market data with the history before the simulation, a resumed backtest keeps the history of its checkpoint
+        if warmup and resume is None:
+            with self.timer.phase('warmup'):
+                self.market_data.load_history(
+                    load_warmup(symbols=symbols,
+                                start_history=start_history,
+                                start_str=start_str,
+                                fetch=fetch_kline_ranges))
 
         print('Done!')
 
-        # slice long time series into shorter time series for faster computation (OPTIONAL)
-        # partial_series = helper_functions.slice_timestamps(
-        #     start_str=start_str,
-        #     end_str=end_str,
-        #     freq='1min',
-        #     slice_length=slice_length)
-
-        partial_series = [[start_str, end_str]]
+        print('Creating simulation data...')
 
-        for timestamps in partial_series:
+        ###################### For Crypto Backtest with Bybit or Binance ###########################################
 
-            print('Creating simulation data...')
+        # read simulation data from json files
+        # with open('src/backtest/data/klines_{}_{}.json'.format(start_str,end_str), 'r') as f:
+        #     klines = json.load(f)
+        # with open('src/backtest/data/topics_{}_{}.json'.format(start_str,end_str), 'r') as f:
+        #       topics = json.load(f)
 
-            ###################### For Crypto Backtest with Bybit or Binance ###########################################
+        simulation_windows = windows
+        if simulation_windows is not None:
+            # use preloaded simulation data
+            self.account.simulation_data = None
 
-            # read simulation data from json files
-            # with open('src/backtest/data/klines_{}_{}.json'.format(timestamps[0],timestamps[1]), 'r') as f:
-            #     klines = json.load(f)
-            # with open('src/backtest/data/topics_{}_{}.json'.format(timestamps[0],timestamps[1]), 'r') as f:
-            #       topics = json.load(f)
+        elif archive:
+            # read simulation data from the memory mapped candle archive
+            with self.timer.phase('download'):
+                simulation_windows = load_windows(symbols=symbols,
+                                                  start_str=start_str,
+                                                  end_str=end_str,
+                                                  fetch=fetch_kline_ranges)
+            self.account.simulation_data = None
 
+        else:
             # create simulation data via bybit
-            klines, topics = create_simulation_data(symbols=symbols,
-                                                    start_str=timestamps[0],
-                                                    end_str=timestamps[1])
+            with self.timer.phase('download'):
+                klines, topics = create_simulation_data(symbols=symbols,
+                                                        start_str=start_str,
+                                                        end_str=end_str)
 
             # create simulation data via binance
             # klines, topics = binance_functions.create_simulation_data(
             #     session=self.market_data.client,
             #     symbols=symbols,
-            #     start_str=str(timestamps[0]),
-            #     end_str=str(timestamps[1]))
+            #     start_str=str(start_str),
+            #     end_str=str(end_str))
 
             # write simulation data to json files
             # with open(
             #         'src/backtest/data/klines_{}_{}.json'.format(
-            #             timestamps[0], timestamps[1]), 'w') as f:
+            #             start_str, end_str), 'w') as f:
             #     json.dump(klines, f)
             # with open(
             #         'src/backtest/data/topics_{}_{}.json'.format(
-            #             timestamps[0], timestamps[1]), 'w') as f:
+            #             start_str, end_str), 'w') as f:
             #     json.dump(topics, f)
 
-            # format data to bybit websocket messages
-            self.bybit_messages, self.account.simulation_data = binance_to_bybit(
-                klines, topics=topics)
+            # format data to per topic arrays, the raw klines and the formatted dataframe are released afterwards
+            with self.timer.phase('format'):
+                simulation_windows = frame_windows(
+                    format_simulation_data(klines, topics=topics))
+            self.account.simulation_data = None
+            del klines, topics
 
-            ######################################################################################################
-
-            # remove last elements of bybit messages that overlap with next partial series (two per topic)
-            # this is due to the design of create_simulation_data to pull one extra candle per topic
-            for symbol in symbols:
-                self.bybit_messages.pop()
-                self.bybit_messages.pop()
-
-            print('Done!')
-
-            # set starting timestamp
-            self.account.timestamp = self.account.simulation_data.index[0][0]
+        ######################################################################################################
 
-            print('Simulating backtest from {} to {}'.format(
-                timestamps[0], timestamps[1]))
+        # remove the extra last candles of the simulation data (two per topic)
+        # this is due to the design of create_simulation_data to pull one extra candle per topic
+        # candles and messages are streamed from the truncated windows, while trades are priced on the full windows
+        self.account.windows = simulation_windows
+        self.market_data.windows = drop_last(simulation_windows,
+                                             n=2 * len(symbols))
+        n_records = sum(
+            len(window) -
+            (window.index_after(after) if after is not None else 0)
+            for window in self.market_data.windows.values())
+
+        # preallocate one equity point per candle of the first topic, see BacktestAccountData.record_equity
+        first_window = self.market_data.windows.get(self.topics[0])
+        if first_window is not None:
+            self.account.equity.reserve(
+                len(first_window) -
+                (first_window.index_after(after) if after is not None else 0))
+        if direct:
+            self.bybit_messages = None
+        else:
+            self.bybit_messages = self.market_data.candle_messages(after=after)
 
-            # iterate through formated simulation data and run backtest
-            for msg in tqdm(self.bybit_messages):
-                self.on_message(message=msg)
+        print('Done!')
 
-            # append simulation data to global simulation data
-            # self.bybit_messages.extend(bybit_messages)
-            # self.simulation_data = pd.concat(
-            #     [self.simulation_data, simulation_data])
+        # set starting timestamp, a resumed backtest keeps the timestamp of its checkpoint
+        if after is None:
+            self.account.timestamp = pd.Timestamp(
+                min(window['end'][0] for window in simulation_windows.values()))
+        next_checkpoint = self.account.timestamp.value + pd.Timedelta(
+            checkpoint_freq).value
+
+        print('Simulating backtest from {} to {}'.format(start_str, end_str))
+
+        # the simulation is timed as a whole, candles are additionally timed as laps of its phases
+        with self.timer.phase('simulation'):
+            self.timer.start()
+            if direct:
+                # push decoded candles into market and account data and trigger the model like on_message
+                progress = tqdm(total=n_records)
+                records = self.market_data.candle_records(after=after)
+                record = next(records, None)
+                last_end = None
+                while record is not None:
+                    topic, candle = record
+
+                    # write a checkpoint once all candles of the last close timestamp are processed
+                    if checkpoint_dir is not None and last_end is not None and candle.end > last_end >= next_checkpoint:
+                        self.save_checkpoint(directory=checkpoint_dir,
+                                             time=last_end,
+                                             initial_budget=initial_budget)
+                        next_checkpoint = last_end + pd.Timedelta(
+                            checkpoint_freq).value
+                        self.timer.lap('checkpoint')
+
+                    # skip ahead to the exit of the open position once all candles of the last close timestamp are processed
+                    if fast_forward and last_end is not None and candle.end > last_end and self.can_skip(
+                    ):
+                        resume, skipped = self.skip_to_exit(after=last_end)
+                        progress.update(skipped)
+                        if resume is None:
+                            break
+                        if skipped:
+                            records = self.market_data.candle_records(
+                                after=resume - 1)
+                            topic, candle = next(records)
+                        self.timer.lap('fast_forward')
+
+                    progress.update(1)
+                    self.timer.lap('clock')
+                    last_end = candle.end
+                    self.release_expired()
+                    if topic in self.topics:
+                        self.market_data.on_candle(topic=topic, data=candle)
+                        self.trigger_model(topic=topic, data=candle)
+                    record = next(records, None)
+                progress.close()
+            else:
+                # iterate through formated simulation data and run backtest
+                last_end = None
+                for msg in tqdm(self.bybit_messages, total=n_records):
+                    self.timer.lap('messages')
+                    end = msg.body['timestamp_e6']
+                    if checkpoint_dir is not None and last_end is not None and end > last_end >= next_checkpoint:
+                        self.save_checkpoint(directory=checkpoint_dir,
+                                             time=last_end,
+                                             initial_budget=initial_budget)
+                        next_checkpoint = last_end + pd.Timedelta(
+                            checkpoint_freq).value
+                        self.timer.lap('checkpoint')
+                    last_end = end
+                    self.on_message(message=msg)
+
+            # release the last coalesced boundaries of the simulation
+            if self.coalescer is not None:
+                for ticker in self.coalescer.flush():
+                    self.call_model(ticker=ticker)
 
-            print('Done!')
+        print('Done!')
 
         # close remaining open positions
         for pos in self.account.positions.values():
@@ -248,22 +421,256 @@ class BacktestTradingModel(TradingModel):
                                          qty=pos['size'],
                                          order_type='Market',
                                          reduce_only=True)
-        report = self.create_performance_report(initial_budget=initial_budget,
-                                                start_str=start_str,
-                                                end_str=end_str,
-                                                save_output=save_output)
+
+        report = {}
+        if create_report:
+            with self.timer.phase('report'):
+                report = self.create_performance_report(
+                    initial_budget=initial_budget,
+                    start_str=start_str,
+                    end_str=end_str,
+                    save_output=save_output,
+                    run_id=run_id)
+
+        if verbose:
+            print(self.timer.report().round(3).to_string())
+            print(pd.Series(self.account.equity.summary()).to_string())
+        timing_name = self.timing_name(start_str=start_str,
+                                       end_str=end_str,
+                                       run_id=run_id)
+        if save_output:
+            with pd.ExcelWriter('{}.xlsx'.format(timing_name)) as writer:
+                self.timer.report().to_excel(writer, sheet_name='phases')
+                self.timer.histogram('model').to_excel(writer,
+                                                       sheet_name='model')
+            # the equity curve has one row per candle, it is exported as csv since it may exceed the row limit of excel
+            self.account.equity.to_frame().to_csv('{}.csv'.format(
+                self.timing_name(start_str=start_str,
+                                 end_str=end_str,
+                                 run_id=run_id,
+                                 prefix='equity')))
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats('{}.prof'.format(timing_name))
 
         return report
 
+    def timing_name(self,
+                    start_str: str,
+                    end_str: str,
+                    run_id: str = None,
+                    prefix: str = 'timings') -> str:
+        '''
+        Path of the timing report and profile of a backtest without file extension, next to the model stats, see create_performance_report.
+        Other per run outputs such as the equity curve use the same name with a different prefix.
+
+        Parameters
+        ----------
+        start_str: str
+            starting timestamp of backtest formatted as string
+        end_str: str
+            ending timestamp of backtest formatted as string
+        run_id: str
+            optional identifier of the run. Default is None
+        prefix: str
+            prefix of the file name. Default is 'timings'
+
+        Returns
+        -------
+        name: str
+            path of the timing files without file extension
+        '''
+        name = "evaluations/{}_{}_{}".format(prefix, start_str, end_str)
+        if run_id is not None:
+            name = '{}_{}'.format(name, run_id)
+        return name
+
+    def call_model(self, ticker: str):
+        '''
+        Call the model of a ticker unless it waits for the exit of its open position, see TradingModel.call_model.
+        The model calls are timed as laps with a latency histogram, including the dispatch since the market data update.
+
+        Parameters
+        ----------
+        ticker: str
+            ticker of the model
+        '''
+        if not self.is_waiting(ticker):
+            self.model(model=self, ticker=ticker)
+            self.timer.latency('model')
+
+    def save_checkpoint(self, directory: str, time: int,
+                        initial_budget: float) -> str:
+        '''
+        Write the state of the backtest to a binary checkpoint file, named by the clock of the checkpoint.
+        The checkpoint holds account data, market data including candle stores and indicators,
+        model storage, model statistics, waiting tickers and coalesced boundaries, but no simulation data.
+        The file is pickled with the highest protocol, so that numpy arrays are stored as raw buffers, and replaced atomically.
+
+        Parameters
+        ----------
+        directory: str
+            directory of the checkpoint files
+        time: int
+            close timestamp of the last processed candles in epoch nanoseconds
+        initial_budget: float
+            initial budget of the backtest for the performance report
+
+        Returns
+        -------
+        path: str
+            path of the checkpoint file
+        '''
+        state = {
+            'time':
+                time,
+            'initial_budget':
+                initial_budget,
+            'account': {
+                key: value
+                for key, value in vars(self.account).items()
+                if key not in CHECKPOINT_EXCLUDE
+            },
+            'market_data': {
+                key: value
+                for key, value in vars(self.market_data).items()
+                if key not in CHECKPOINT_EXCLUDE
+            },
+            'model_storage':
+                self.model_storage,
+            'model_stats':
+                self.model_stats,
+            'model_args':
+                self.model_args,
+            'waiting':
+                self.waiting,
+            'pending':
+                self.coalescer.pending if self.coalescer is not None else None
+        }
+
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(
+            directory, 'checkpoint_{}.pkl'.format(
+                pd.Timestamp(time).strftime('%Y%m%d_%H%M%S')))
+
+        # write to a temporary file and replace the checkpoint atomically
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        return path
+
+    def load_checkpoint(self, path: str) -> Tuple[int, float]:
+        '''
+        Restore the state of the backtest from a checkpoint file, see save_checkpoint.
+        The model arguments are not restored, so that a checkpoint can be forked with different model_args.
+
+        Parameters
+        ----------
+        path: str
+            path of the checkpoint file
+
+        Returns
+        -------
+        time: int
+            close timestamp of the last processed candles in epoch nanoseconds
+        initial_budget: float
+            initial budget of the backtest for the performance report
+        '''
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+
+        vars(self.account).update(state['account'])
+        vars(self.market_data).update(state['market_data'])
+        self.model_storage = state['model_storage']
+        self.model_stats = state['model_stats']
+        self.waiting = state['waiting']
+        if self.coalescer is not None and state['pending'] is not None:
+            self.coalescer.pending = state['pending']
+
+        return state['time'], state['initial_budget']
+
+    def can_skip(self) -> bool:
+        '''
+        Check whether the backtest can skip ahead to the exit of the open position, see skip_to_exit.
+        This is the case if the models of all tickers wait for their exit, no orders rest in the order book
+        and the position of the first topic has a stop loss or take profit.
+        '''
+        if self.coalescer is not None or any(self.account.order_books.values()):
+            return False
+        tickers = {".".join(topic.split(".")[2:]) for topic in self.topics}
+        if not all(self.is_waiting(ticker) for ticker in tickers):
+            return False
+        pos = self.account.positions[self.topic_mapping[self.topics[0]]]
+        return bool(pos['size'] > 0 and
+                    (pos['stop_loss'] or pos['take_profit']))
+
+    def skip_to_exit(self, after: int) -> Tuple[int, int]:
+        '''
+        Skip all candles until the stop loss or take profit of the open position triggers.
+        The exit candle is found by a vectorized search over the upcoming lows and highs of the first topic, see BacktestAccountData.find_exit.
+        All candles that close before it are stored in market data at once without triggering the model,
+        and account data is updated like after the last skipped candle of the first topic.
+
+        Parameters
+        ----------
+        after: int
+            close timestamp of the last processed candles in epoch nanoseconds
+
+        Returns
+        -------
+        resume: int
+            close timestamp of the exit candle in epoch nanoseconds, from which the simulation continues. None if no candle triggers
+        skipped: int
+            number of skipped candles of all topics
+        '''
+        topic = self.topics[0]
+        symbol = self.topic_mapping[topic]
+        window = self.market_data.windows[topic]
+        first = window.index_after(after)
+        idx = self.account.find_exit(symbol=symbol, window=window, first=first)
+        resume = int(window['end'][idx]) if idx < len(window) else None
+
+        skipped = 0
+        for name, candles in self.market_data.windows.items():
+            lo = candles.index_after(after)
+            hi = len(candles) if resume is None else int(
+                np.searchsorted(candles['end'], resume, side='left'))
+            skipped += max(hi - lo, 0)
+            if hi > lo and name in self.topics:
+                columns = {col: candles[col][lo:hi] for col in ARCHIVE_DTYPES}
+                columns.update(period='1',
+                               confirm=True,
+                               cross_seq=0,
+                               timestamp=columns['end'])
+                self.market_data.on_candles(topic=name, columns=columns)
+
+        # update account data like new_market_data with the last skipped candle
+        if idx > first:
+            self.account.record_equity_block(symbol=symbol,
+                                             end=window['end'][first:idx],
+                                             close=window['close'][first:idx])
+            self.account.timestamp = pd.Timestamp(int(window['end'][idx - 1]))
+            pos = self.account.positions[symbol]
+            pos['position_value'] = pos['size'] * float(
+                window['close'][idx - 1])
+
+        return resume, skipped
+
     def create_performance_report(
             self,
             initial_budget: float,
             start_str: str,
             end_str: str,
-            save_output: bool = False) -> Dict[str, Dict[str, float]]:
+            save_output: bool = False,
+            run_id: str = None) -> Dict[str, Dict[str, float]]:
         '''
         Create performance report after backtest.
-        Report is created by iterating through executions and counting a trade if it exceeds or matches a previously open position.
+        A trade is counted if a closing execution exceeds or matches a previously open position, see performance.count_round_trips.
         A trade is a winning trade if its price is better than the position price before any partial closings.
 
         Parameters
@@ -276,18 +683,21 @@ class BacktestTradingModel(TradingModel):
             ending timestamp of backtest formatted as string
         save_output: bool
             flag whether to export performance report and trade list to excel. Default is False
+        run_id: str
+            optional identifier of the run that is appended to the names of the model stats files,
+            so that parallel runs of the same time range do not overwrite each other. Default is None
         Returns
         -------
         report: Dict[str, Dict[str,float]]
             performance report
         '''
         # save model stats as json and excel
-        with open(
-                "evaluations/model_stats_{}_{}.json".format(start_str, end_str),
-                "w") as outfile:
+        stats_name = "evaluations/model_stats_{}_{}".format(start_str, end_str)
+        if run_id is not None:
+            stats_name = '{}_{}'.format(stats_name, run_id)
+        with open("{}.json".format(stats_name), "w") as outfile:
             json.dump(self.model_stats, outfile)
-        pd.DataFrame(self.model_stats).to_excel(
-            "evaluations/model_stats_{}_{}.xlsx".format(start_str, end_str))
+        pd.DataFrame(self.model_stats).to_excel("{}.xlsx".format(stats_name))
 
         report = {}
         # iterate through all symbols with executed trades
@@ -296,62 +706,9 @@ class BacktestTradingModel(TradingModel):
                 if self.account.executions[symbol].values()
         ]:
 
-            # initialize kpis
-
-            # sign, price, size and value of current position
-            sign_pos = None
-            pos_price = None
-            pos_qty = 0
-            pos_value = 0
-
-            # initialize winning and total trades to zero
-            # a winning trade is one
-            wins = 0
-            total_trades = 0
-
-            # iterate through executions
-            for exe in self.account.executions[symbol].values():
-
-                # if trade opened a new position calculate new position value and continue
-                if pos_qty == 0:
-                    sign_pos = 2 * ((exe['side'].upper() == 'BUY') - 0.5)
-                    pos_price = exe['price']
-                    pos_qty = exe['exec_qty']
-                    pos_value = pos_price * pos_qty
-                    continue
-
-                # calculate sign of new trade
-                sign_new = 2 * ((exe['side'].upper() == 'BUY') - 0.5)
-
-                # if trade was in same direction as position, calculate new position values and continue
-                if sign_new == sign_pos:
-                    pos_value += exe['price'] * exe['exec_qty']
-                    pos_qty += exe['exec_qty']
-                    pos_price = pos_value / pos_qty
-                    continue
-
-                # check if trade was a closing trade
-                if exe['open'] == False:
-
-                    # if trade was in opposite direction and exceeded or matched old position in size:
-                    # check if trade was a winning trade
-                    # open new position with execution price and residual quantity
-                    if exe['exec_qty'] >= pos_qty:
-                        if exe['price'] * sign_pos > pos_price * sign_pos:
-                            wins += 1
-                            total_trades += 1
-                        else:
-                            total_trades += 1
-
-                        pos_price = exe['price']
-                        pos_value = (exe['exec_qty'] - pos_qty) * exe['price']
-                        sign_pos = sign_new
-                        pos_qty = abs(exe['exec_qty'] - pos_qty)
-
-                # if trade did not match or exceed old position, reduce old position, but keep position price
-                else:
-                    pos_value = abs(pos_value - exe['price'] * exe['exec_qty'])
-                    pos_qty = abs(pos_qty - exe['exec_qty'])
+            # count round trips and winning round trips on columnar executions
+            total_trades, wins = count_round_trips(
+                execution_columns(self.account.execution_log[symbol]))
 
             # calculate total trading return and return in percentage of initial budget
             trading_return = self.account.wallet[
@@ -400,108 +757,14 @@ class BacktestTradingModel(TradingModel):
 
                 pd.DataFrame(report).to_excel(
                     'evaluations/performance_report_{}.xlsx'.format(args_str))
-                trades = pd.DataFrame(
-                    self.account.executions[symbol]).transpose()
+                trades = self.account.execution_log[symbol].to_frame()
                 trades['trading_value'] = -2 * (
                     (trades['side'].apply(lambda x: x.upper()) == 'BUY') - 0.5
                 ) * trades['exec_qty'] * trades['price'] - trades['exec_fee']
 
                 # add potential trade statistics as additional columns
-                for stat in self.model_stats.keys():
-                    trades[stat] = None
-                    # initialize last trade id
-                    previous_id = None
-
-                    # iterate through trade ids and add trade statistics
-                    for id in trades.index:
-
-                        # check if statisitics for current trade is available (indexed by trading time)
-                        # if not then add "None"
-                        if not str(trades.loc[id]['trade_time']
-                                  ) in self.model_stats[stat].keys():
-
-                            self.model_stats[stat][str(
-                                trades.loc[id]['trade_time'])] = {}
-
-                        # check if trade is an opening trade
-                        if trades.loc[id]['open']:
-
-                            if not 'long' in self.model_stats[stat][str(
-                                    trades.loc[id]['trade_time'])].keys():
-                                self.model_stats[stat][str(
-                                    trades.loc[id]['trade_time'])]['long'] = ""
-
-                            if not 'short' in self.model_stats[stat][str(
-                                    trades.loc[id]['trade_time'])].keys():
-                                self.model_stats[stat][str(
-                                    trades.loc[id]['trade_time'])]['short'] = ""
-
-                            # check if trade was long
-                            if trades.loc[id]['side'].upper() == 'BUY':
-                                try:
-                                    trades.loc[id,
-                                               stat] = self.model_stats[stat][
-                                                   str(trades.loc[id]
-                                                       ['trade_time'])]['long']
-                                except:
-                                    trades.loc[id, stat] = str(
-                                        self.model_stats[stat][str(
-                                            trades.loc[id]['trade_time'])]
-                                        ['long'])
-                            else:
-                                try:
-                                    trades.loc[id,
-                                               stat] = self.model_stats[stat][
-                                                   str(trades.loc[id]
-                                                       ['trade_time'])]['short']
-                                except:
-                                    trades.loc[id, stat] = str(
-                                        self.model_stats[stat][str(
-                                            trades.loc[id]['trade_time'])]
-                                        ['short'])
-
-                        # otherwise add trade statisitics of open trade
-                        else:
-                            if not 'long' in self.model_stats[stat][str(
-                                    trades.loc[previous_id]
-                                ['trade_time'])].keys():
-                                self.model_stats[stat][str(
-                                    trades.loc[previous_id]
-                                    ['trade_time'])]['long'] = ""
-
-                            if not 'short' in self.model_stats[stat][str(
-                                    trades.loc[previous_id]
-                                ['trade_time'])].keys():
-                                self.model_stats[stat][str(
-                                    trades.loc[previous_id]
-                                    ['trade_time'])]['short'] = ""
-
-                            # check if open trade was long
-                            if trades.loc[previous_id]['side'].upper() == 'BUY':
-                                try:
-                                    trades.loc[id,
-                                               stat] = self.model_stats[stat][
-                                                   str(trades.loc[previous_id]
-                                                       ['trade_time'])]['long']
-                                except:
-                                    trades.loc[id, stat] = str(
-                                        self.model_stats[stat][str(
-                                            trades.loc[previous_id]
-                                            ['trade_time'])]['long'])
-                            else:
-                                try:
-                                    trades.loc[id,
-                                               stat] = self.model_stats[stat][
-                                                   str(trades.loc[previous_id]
-                                                       ['trade_time'])]['short']
-                                except:
-                                    trades.loc[id, stat] = str(
-                                        self.model_stats[stat][str(
-                                            trades.loc[previous_id]
-                                            ['trade_time'])]['short'])
-
-                        # save previous trade id
-                        previous_id = id
+                trades = attach_model_stats(trades=trades,
+                                            model_stats=self.model_stats)
 
                 # export report to excel
                 trades.to_excel('evaluations/trade_list_{}_{}_{}.xlsx'.format(
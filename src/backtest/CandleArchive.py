@@ -0,0 +1,440 @@
+# !/usr/bin/env python
+# coding: utf-8
+
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+
+import os
+import json
+import shutil
+import tempfile
+import pandas as pd
+import numpy as np
+from typing import Any, Callable, Dict, List, Tuple
+from src.endpoints.kline_cache import KlineCache, file_lock, update_klines, KLINE_CACHE_DIR
+import yaml
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CONFIG_DIR = os.getenv('CONFIG_DIR')
+
+# Load variables from the YAML file
+with open(CONFIG_DIR, 'r') as file:
+    config = yaml.safe_load(file)
+
+# Access variables from the loaded data
+ARCHIVE_DIR = config.get('archive_dir', '.candle_archive')
+
+# fixed width column files of the archive, timestamps are int64 epoch nanoseconds
+ARCHIVE_DTYPES = {
+    'start': np.int64,
+    'end': np.int64,
+    'open': np.float64,
+    'high': np.float64,
+    'low': np.float64,
+    'close': np.float64,
+    'volume': np.float64,
+    'turnover': np.float64
+}
+
+
+class CandleWindow:
+    '''
+    Zero-copy time window of a candle archive. Columns are read-only views into the memory mapped column files.
+    '''
+
+    def __init__(self, topic: str, columns: Dict[str, np.ndarray]):
+        '''
+        Parameters
+        ----------
+        topic: str
+            public topic of the candles, e.g. "candle.1.BTCUSDT"
+        columns: Dict[str, numpy.ndarray]
+            column views of the window, indexed by column (see ARCHIVE_DTYPES)
+        '''
+        self.topic = topic
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.columns['end'])
+
+    def __getitem__(self, col: str) -> np.ndarray:
+        return self.columns[col]
+
+    def index_after(self, timestamp: Any) -> int:
+        '''
+        Return the index of the first candle that closes after a timestamp, len(self) if there is none.
+
+        Parameters
+        ----------
+        timestamp: Any
+            pandas.Timestamp or int64 epoch nanoseconds
+        '''
+        return int(
+            np.searchsorted(self.columns['end'],
+                            pd.Timestamp(timestamp).value,
+                            side='right'))
+
+    def slice(self, start: Any, end: Any) -> 'CandleWindow':
+        '''
+        Return a zero-copy window of all candles that start within an inclusive time range.
+        The window is located by binary search on the start timestamps.
+
+        Parameters
+        ----------
+        start: Any
+            first start timestamp, pandas.Timestamp, string or int64 epoch nanoseconds
+        end: Any
+            last start timestamp, pandas.Timestamp, string or int64 epoch nanoseconds
+
+        Returns
+        -------
+        window: CandleWindow
+            candles of the time range
+        '''
+        starts = self.columns['start']
+        first = np.searchsorted(starts, pd.Timestamp(start).value, side='left')
+        last = np.searchsorted(starts, pd.Timestamp(end).value, side='right')
+        return CandleWindow(
+            topic=self.topic,
+            columns={
+                col: self.columns[col][first:last] for col in self.columns
+            })
+
+    def to_frame(self) -> pd.DataFrame:
+        '''
+        Copy the window into a dataframe of candlesticks indexed by the close timestamp, see binance_functions.format_historical_klines.
+        '''
+        df = pd.DataFrame({
+            col: self.columns[col].astype('datetime64[ns]')
+            if col in ['start', 'end'] else np.array(self.columns[col])
+            for col in ARCHIVE_DTYPES
+        })
+        return df.set_index('end', drop=False)
+
+
+def frame_windows(data: pd.DataFrame) -> Dict[str, CandleWindow]:
+    '''
+    Split formatted simulation data into one candle window per topic, see binance_functions.format_simulation_data.
+    Unlike archive windows, the columns are copies of the dataframe.
+
+    Parameters
+    ----------
+    data: pandas.DataFrame
+        formatted klines indexed and sorted by end timestamp and topic
+
+    Returns
+    -------
+    windows: Dict[str, CandleWindow]
+        candle windows sorted by close timestamp, indexed by topic
+    '''
+    windows = {}
+    for topic, group in data.groupby(data['topic'].values, sort=True):
+        columns = {
+            col: group[col].values.astype('datetime64[ns]').view(np.int64)
+            if col in ['start', 'end'] else group[col].to_numpy(dtype=dtype)
+            for col, dtype in ARCHIVE_DTYPES.items()
+        }
+        windows[topic] = CandleWindow(topic=topic, columns=columns)
+    return windows
+
+
+class CandleArchive:
+    '''
+    Read-only columnar candle archive of one symbol and interval.
+    Every column is stored as a fixed width binary file and opened via numpy.memmap,
+    so that multi-year ranges can be sliced by time without loading them into memory.
+
+    The column files live in a version directory together with a metadata file that holds the number of archived candles
+    and the exported ranges of the kline cache. A pointer file names the current version.
+    New candles are appended to the column files of the current version, and the metadata is replaced afterwards,
+    so readers never see more candles than every column holds. A rebuild writes a new version and swaps the pointer,
+    so a backtest that opens the archive meanwhile reads either the old or the new version.
+    '''
+
+    def __init__(self, symbol: str, interval: str, root: str = ARCHIVE_DIR):
+        '''
+        Parameters
+        ----------
+        symbol: str
+            ticker of the candles, e.g. "BTCUSDT"
+        interval: str
+            interval of the candles, e.g. "1m"
+        root: str
+            root directory of the archive
+
+        Attributes
+        ----------
+        self.path: str
+            directory of the versions of the archive
+        self.version: str
+            name of the opened version, None if the archive is empty
+        self.ranges: numpy.ndarray
+            inclusive ranges of kline start timestamps in epoch milliseconds of the kline cache the archive was exported from
+        self.columns: Dict[str, numpy.memmap]
+            memory mapped columns, sorted by start timestamp
+        '''
+        self.symbol = symbol
+        self.interval = interval
+        self.path = os.path.join(root, symbol, interval)
+        self.version = None
+        self.ranges = np.empty((0, 2), dtype=np.int64)
+        self.columns = {}
+        self.open()
+
+    def __len__(self) -> int:
+        return len(self.columns['start'])
+
+    def _version_path(self, version: str, name: str = None) -> str:
+        path = os.path.join(self.path, version)
+        return path if name is None else os.path.join(path, name)
+
+    def _replace(self, path: str, text: str):
+        # write a small file to a temporary file and replace it atomically
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path),
+                                        suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def _write_meta(self, version: str, rows: int, ranges: np.ndarray):
+        self._replace(
+            self._version_path(version, 'meta.json'),
+            json.dumps({
+                'rows': int(rows),
+                'ranges': np.asarray(ranges, dtype=np.int64).tolist()
+            }))
+
+    def open(self):
+        '''
+        Memory map all column files of the current version. An archive without version is opened with empty columns.
+        '''
+        pointer = os.path.join(self.path, 'CURRENT')
+        meta = {'rows': 0, 'ranges': []}
+        self.version = None
+        if os.path.exists(pointer):
+            with open(pointer, 'r') as f:
+                self.version = f.read().strip()
+            with open(self._version_path(self.version, 'meta.json'), 'r') as f:
+                meta = json.load(f)
+
+        self.ranges = np.array(meta['ranges'], dtype=np.int64).reshape(-1, 2)
+        self.columns = {}
+        for col, dtype in ARCHIVE_DTYPES.items():
+            if meta['rows'] == 0:
+                self.columns[col] = np.empty(0, dtype=dtype)
+            else:
+                # the column files may already hold appended candles that are not published in the metadata yet
+                self.columns[col] = np.memmap(self._version_path(
+                    self.version, '{}.bin'.format(col)),
+                                              dtype=dtype,
+                                              mode='r',
+                                              shape=(meta['rows'],))
+
+    def write(self, columns: Dict[str, np.ndarray], ranges: np.ndarray = None):
+        '''
+        Replace the archive with new columns and reopen it.
+        The columns are written to a new version, which is published by atomically replacing the pointer file.
+        Versions before the previous one are removed. Writers are not synchronized, see export.
+
+        Parameters
+        ----------
+        columns: Dict[str, numpy.ndarray]
+            columns of equal length sorted by start timestamp, indexed by column (see ARCHIVE_DTYPES)
+        ranges: numpy.ndarray
+            inclusive ranges of kline start timestamps in epoch milliseconds that the columns were exported from.
+            Default is the range from the first to the last candle
+        '''
+        rows = len(columns['start'])
+        if ranges is None:
+            starts = np.asarray(columns['start'], dtype=np.int64) // 1000000
+            ranges = np.array([[starts[0], starts[-1]]] if rows else [],
+                              dtype=np.int64).reshape(-1, 2)
+
+        os.makedirs(self.path, exist_ok=True)
+        versions = sorted(name for name in os.listdir(self.path)
+                          if name.startswith('v') and name[1:].isdigit())
+        version = 'v{:06d}'.format(int(versions[-1][1:]) + 1 if versions else 1)
+        os.makedirs(self._version_path(version))
+        for col, dtype in ARCHIVE_DTYPES.items():
+            np.ascontiguousarray(columns[col], dtype=dtype).tofile(
+                self._version_path(version, '{}.bin'.format(col)))
+        self._write_meta(version=version, rows=rows, ranges=ranges)
+        self._replace(os.path.join(self.path, 'CURRENT'), version)
+
+        # open memory maps keep removed files readable on posix systems, the previous version is kept for readers that are opening it
+        for old in versions[:-1]:
+            shutil.rmtree(self._version_path(old), ignore_errors=True)
+        self.open()
+
+    def append(self, columns: Dict[str, np.ndarray], ranges: np.ndarray):
+        '''
+        Append candles to the current version and reopen the archive.
+        The candles are written behind the published candles of every column file before the metadata is replaced,
+        so readers of the archive are not affected. Writers are not synchronized, see export.
+
+        Parameters
+        ----------
+        columns: Dict[str, numpy.ndarray]
+            columns of equal length sorted by start timestamp that start after the last archived candle, indexed by column (see ARCHIVE_DTYPES)
+        ranges: numpy.ndarray
+            inclusive ranges of kline start timestamps in epoch milliseconds of the archive including the new candles
+        '''
+        if self.version is None:
+            self.write(columns=columns, ranges=ranges)
+            return
+
+        rows = len(self)
+        for col, dtype in ARCHIVE_DTYPES.items():
+            with open(self._version_path(self.version, '{}.bin'.format(col)),
+                      'r+b') as f:
+                # drop candles of an interrupted append that were never published
+                f.truncate(rows * np.dtype(dtype).itemsize)
+                f.seek(0, os.SEEK_END)
+                np.ascontiguousarray(columns[col], dtype=dtype).tofile(f)
+        self._write_meta(version=self.version,
+                         rows=rows + len(columns['start']),
+                         ranges=ranges)
+        self.open()
+
+    def export(self, cache: KlineCache) -> bool:
+        '''
+        Update the archive from a kline cache if the cache covers ranges that are not archived yet.
+        Only the covered ranges of the cache are read to detect changes. If the cache only grew after the archived ranges,
+        the new klines are appended, otherwise the archive is rebuilt. Concurrent exports are serialized by a file lock.
+
+        Parameters
+        ----------
+        cache: KlineCache
+            kline cache of the same symbol and interval
+
+        Returns
+        -------
+        updated: bool
+            True if candles were appended or the archive was rebuilt
+        '''
+        if np.array_equal(cache.ranges(), self.ranges):
+            return False
+
+        with file_lock(self.path + '.lock'):
+            # another process may have exported the cache in the meantime
+            self.open()
+            end = int(self.ranges[-1, 1]) if len(self.ranges) else None
+            klines, ranges = cache.load_after(end)
+            if np.array_equal(ranges, self.ranges):
+                return False
+
+            # klines before the end of the archived ranges are unchanged if the covered ranges up to it are unchanged
+            tail = end is not None
+            if tail:
+                clipped = ranges[ranges[:, 0] <= end].copy()
+                clipped[:, 1] = np.minimum(clipped[:, 1], end)
+                tail = np.array_equal(clipped, self.ranges)
+            if not tail:
+                klines, ranges = cache.load_after(None)
+
+            # round timestamps to seconds like binance_functions.format_historical_klines
+            columns = {
+                col: klines[col] for col in
+                ['open', 'high', 'low', 'close', 'volume', 'turnover']
+            }
+            for col in ['start', 'end']:
+                columns[col] = np.round(klines[col] / 1000).astype(
+                    np.int64) * 1000000000
+
+            if tail:
+                self.append(columns=columns, ranges=ranges)
+            else:
+                self.write(columns=columns, ranges=ranges)
+        return True
+
+    def slice(self, start: Any, end: Any, topic: str = None) -> CandleWindow:
+        '''
+        Return a zero-copy window of all candles that start within an inclusive time range.
+        The window is located by binary search on the start timestamps.
+
+        Parameters
+        ----------
+        start: Any
+            first start timestamp, pandas.Timestamp, string or int64 epoch nanoseconds
+        end: Any
+            last start timestamp, pandas.Timestamp, string or int64 epoch nanoseconds
+        topic: str
+            public topic of the window
+
+        Returns
+        -------
+        window: CandleWindow
+            candles of the time range
+        '''
+        return CandleWindow(topic=topic,
+                            columns=self.columns).slice(start=start, end=end)
+
+
+def load_windows(symbols: Dict[str, str],
+                 start_str: str,
+                 end_str: str,
+                 fetch: Callable[[Dict[Any, Tuple[str, str, int, int]]],
+                                 Dict[Any, List[List[Any]]]],
+                 exchange: str = 'bybit',
+                 root: str = ARCHIVE_DIR,
+                 cache_dir: str = KLINE_CACHE_DIR) -> Dict[str, CandleWindow]:
+    '''
+    Load simulation data of several symbols as zero-copy windows of the candle archive.
+    Missing klines are downloaded into the kline cache, and klines that are not archived yet are exported to the archive, see CandleArchive.export.
+    The windows cover the same candles as create_simulation_data.
+
+    Parameters
+    ----------
+    symbols: Dict[str, str]
+        dictionary of relevant symbols for backtesting
+        keys have format binance_ticker.binance_interval and values are coresponding bybit ws topics.
+    start_str: str
+        start of simulation in format yyyy-mm-dd hh-mm-ss
+    end_str: str
+        end of simulation in format yyyy-mm-dd hh-mm-ss
+    fetch: Callable
+        function that downloads klines of missing ranges, e.g. bybit_functions.fetch_kline_ranges
+    exchange: str
+        exchange the klines are downloaded from
+    root: str
+        root directory of the archive
+    cache_dir: str
+        root directory of the kline cache
+
+    Returns
+    -------
+    windows: Dict[str, CandleWindow]
+        candle windows, indexed by bybit topic
+    '''
+    ranges = {}
+    for symbol in symbols:
+        ticker, interval = symbol.split('.')
+
+        # extend data by one interval to close trades in the last timestamp
+        actual_end_str = str(pd.Timestamp(end_str) + pd.Timedelta(interval))
+        ranges[symbol] = (ticker, interval,
+                          int(pd.Timestamp(start_str).value / 1000000),
+                          int(pd.Timestamp(actual_end_str).value / 1000000))
+
+    caches, _ = update_klines(ranges=ranges,
+                              fetch=fetch,
+                              exchange=exchange,
+                              cache_dir=cache_dir)
+
+    windows = {}
+    for symbol, (ticker, interval, start_ts, end_ts) in ranges.items():
+        archive = CandleArchive(symbol=ticker,
+                                interval=interval,
+                                root=os.path.join(root, exchange))
+        archive.export(caches[symbol])
+        windows[symbols[symbol]] = archive.slice(start=start_ts * 1000000,
+                                                 end=end_ts * 1000000,
+                                                 topic=symbols[symbol])
+    return windows
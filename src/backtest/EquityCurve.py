@@ -0,0 +1,197 @@
+# !/usr/bin/env python
+# coding: utf-8
+
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+
+import pandas as pd
+import numpy as np
+from typing import Any, Dict
+
+
+class EquityCurve:
+    '''
+    Mark-to-market equity of a backtest account with one point per candle, backed by preallocated numpy arrays.
+    Every point stores the close timestamp, the equity, the gross exposure and the running maximum drawdown.
+    The running peak and the risk metrics of the whole curve are updated with every point,
+    so that they can be queried in constant time at the end of a backtest, see summary.
+    '''
+
+    def __init__(self, capacity: int = 1024):
+        '''
+        Parameters
+        ----------
+        capacity: int
+            initial number of points, the capacity is doubled once it is exhausted, see reserve
+
+        Attributes
+        ----------
+        self.peak: float
+            highest equity so far, None before the first point
+        self.max_drawdown: float
+            largest drop of the equity from its previous peak in base currency
+        self.max_drawdown_percent: float
+            largest drop of the equity from its previous peak relative to the peak
+        self.max_exposure: float
+            largest gross exposure in base currency
+        '''
+        capacity = max(capacity, 1)
+        self._end = np.zeros(capacity, dtype=np.int64)
+        self._equity = np.zeros(capacity, dtype=np.float64)
+        self._exposure = np.zeros(capacity, dtype=np.float64)
+        self._max_drawdown = np.zeros(capacity, dtype=np.float64)
+        self._size = 0
+        self.peak = None
+        self.max_drawdown = 0.0
+        self.max_drawdown_percent = 0.0
+        self.max_exposure = 0.0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __repr__(self) -> str:
+        return 'EquityCurve({} points)'.format(self._size)
+
+    def reserve(self, n: int):
+        '''
+        Make room for at least n further points, e.g. the number of candles of a backtest, so that recording never reallocates.
+
+        Parameters
+        ----------
+        n: int
+            number of upcoming points
+        '''
+        if self._size + n <= len(self._end):
+            return
+        capacity = max(self._size + n, 2 * len(self._end))
+        for name in ['_end', '_equity', '_exposure', '_max_drawdown']:
+            data = np.zeros(capacity, dtype=getattr(self, name).dtype)
+            data[:self._size] = getattr(self, name)[:self._size]
+            setattr(self, name, data)
+
+    def record(self, end: int, equity: float, exposure: float):
+        '''
+        Append the point of a candle and update the running peak and risk metrics.
+
+        Parameters
+        ----------
+        end: int
+            close timestamp of the candle in epoch nanoseconds
+        equity: float
+            mark-to-market equity in base currency
+        exposure: float
+            gross value of all open positions in base currency
+        '''
+        i = self._size
+        if i == len(self._end):
+            self.reserve(1)
+        if self.peak is None or equity > self.peak:
+            self.peak = equity
+        drawdown = self.peak - equity
+        if drawdown > self.max_drawdown:
+            self.max_drawdown = drawdown
+        if drawdown > 0 and drawdown > self.max_drawdown_percent * self.peak:
+            self.max_drawdown_percent = drawdown / self.peak
+        if exposure > self.max_exposure:
+            self.max_exposure = exposure
+        self._end[i] = end
+        self._equity[i] = equity
+        self._exposure[i] = exposure
+        self._max_drawdown[i] = self.max_drawdown
+        self._size = i + 1
+
+    def extend(self, end: np.ndarray, equity: np.ndarray, exposure: np.ndarray):
+        '''
+        Append the points of a block of candles at once, e.g. the candles that are skipped while waiting for an exit.
+        The result is the same as recording the points one by one.
+
+        Parameters
+        ----------
+        end: numpy.ndarray
+            close timestamps of the candles in epoch nanoseconds
+        equity: numpy.ndarray
+            mark-to-market equity in base currency
+        exposure: numpy.ndarray
+            gross value of all open positions in base currency
+        '''
+        n = len(end)
+        if n == 0:
+            return
+        self.reserve(n)
+        peak = np.maximum.accumulate(equity)
+        if self.peak is not None:
+            peak = np.maximum(peak, self.peak)
+        drawdown = peak - equity
+        max_drawdown = np.maximum.accumulate(drawdown)
+        np.maximum(max_drawdown, self.max_drawdown, out=max_drawdown)
+
+        i = self._size
+        self._end[i:i + n] = end
+        self._equity[i:i + n] = equity
+        self._exposure[i:i + n] = exposure
+        self._max_drawdown[i:i + n] = max_drawdown
+        self._size = i + n
+
+        self.peak = float(peak[-1])
+        self.max_drawdown = float(max_drawdown[-1])
+        self.max_drawdown_percent = max(self.max_drawdown_percent,
+                                        float(np.max(drawdown / peak)))
+        self.max_exposure = max(self.max_exposure, float(np.max(exposure)))
+
+    def summary(self) -> Dict[str, float]:
+        '''
+        Risk metrics of the whole curve, in constant time.
+
+        Returns
+        -------
+        summary: Dict[str, float]
+            final and peak equity, absolute and relative maximum drawdown and maximum exposure
+        '''
+        return {
+            'final_equity':
+                float(self._equity[self._size - 1]) if self._size else None,
+            'peak_equity':
+                self.peak,
+            'max_drawdown':
+                self.max_drawdown,
+            'max_drawdown_percent':
+                self.max_drawdown_percent,
+            'max_exposure':
+                self.max_exposure
+        }
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # only the recorded points are pickled, not the spare capacity
+        n = self._size
+        return dict(self.__dict__,
+                    _end=self._end[:n].copy(),
+                    _equity=self._equity[:n].copy(),
+                    _exposure=self._exposure[:n].copy(),
+                    _max_drawdown=self._max_drawdown[:n].copy())
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__dict__.update(state)
+
+    def to_frame(self) -> pd.DataFrame:
+        '''
+        Export the curve to a time series indexed by close timestamp.
+
+        Returns
+        -------
+        frame: pandas.DataFrame
+            equity, exposure, drawdown from the running peak in base currency and relative to the peak, and running maximum drawdown
+        '''
+        n = self._size
+        equity = self._equity[:n]
+        peak = np.maximum.accumulate(equity)
+        return pd.DataFrame(
+            {
+                'equity': equity,
+                'exposure': self._exposure[:n],
+                'drawdown': peak - equity,
+                'drawdown_percent': (peak - equity) / peak,
+                'max_drawdown': self._max_drawdown[:n]
+            },
+            index=pd.DatetimeIndex(self._end[:n].astype('datetime64[ns]'),
+                                   name='end'))
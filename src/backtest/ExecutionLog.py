@@ -0,0 +1,139 @@
+# !/usr/bin/env python
+# coding: utf-8
+
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+
+import pandas as pd
+import numpy as np
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator
+
+# fixed width record of an execution, the trade time is stored in int64 epoch nanoseconds
+EXECUTION_DTYPE = np.dtype([('trade_time', np.int64), ('buy', np.bool_),
+                            ('exec_qty', np.float64), ('price', np.float64),
+                            ('exec_fee', np.float64), ('open', np.bool_),
+                            ('order_id', np.int64)])
+
+
+class ExecutionLog(Mapping):
+    '''
+    Append-only log of the executions of one symbol, backed by a growable structured numpy array.
+    The log reads like a dictionary of executions indexed by order id, see BacktestAccountData.execution_log.
+    Executions are appended by assigning the next order id, see BacktestAccountData.update_executions.
+    New executions are buffered as tuples and written to the array in blocks once the records are read.
+    '''
+
+    def __init__(self, symbol: str, capacity: int = 64):
+        '''
+        Parameters
+        ----------
+        symbol: str
+            trading pair of the executions
+        capacity: int
+            initial number of records, the capacity is doubled once it is exhausted
+
+        Attributes
+        ----------
+        self.records: numpy.ndarray
+            structured view of all logged executions, see EXECUTION_DTYPE
+        '''
+        self.symbol = symbol
+        self._data = np.zeros(max(capacity, 1), dtype=EXECUTION_DTYPE)
+        self._size = 0
+        self._pending = []
+
+    @property
+    def records(self) -> np.ndarray:
+        if self._pending:
+            self._flush()
+        return self._data[:self._size]
+
+    def _flush(self):
+        # grow the array by doubling and write all buffered executions at once
+        size = self._size - len(self._pending)
+        if self._size > len(self._data):
+            data = np.zeros(max(self._size, 2 * len(self._data)),
+                            dtype=EXECUTION_DTYPE)
+            data[:size] = self._data[:size]
+            self._data = data
+        self._data[size:self._size] = self._pending
+        self._pending = []
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(range(1, self._size + 1))
+
+    def __contains__(self, order_id: Any) -> bool:
+        return isinstance(order_id,
+                          (int, np.integer)) and 0 < order_id <= self._size
+
+    def __getitem__(self, order_id: int) -> Dict[str, Any]:
+        if order_id not in self:
+            raise KeyError(order_id)
+        trade_time, buy, qty, price, fee, open, order_id = self.records[
+            order_id - 1].tolist()
+        return {
+            "symbol": self.symbol,
+            "side": "BUY" if buy else "SELL",
+            "open": open,
+            "order_id": order_id,
+            "exec_id": order_id,
+            "price": price,
+            "order_qty": qty,
+            "exec_type": "Trade",
+            "exec_qty": qty,
+            "exec_fee": fee,
+            "trade_time": pd.Timestamp(trade_time)
+        }
+
+    def __setitem__(self, order_id: int, execution: Dict[str, Any]):
+        '''
+        Append an execution, see BacktestAccountData.execute. Order ids are consecutive, starting at 1.
+        '''
+        if order_id != self._size + 1:
+            raise KeyError(
+                'ExecutionLog: executions are append-only, the next order id is {}'
+                .format(self._size + 1))
+        trade_time = execution['trade_time']
+        if not isinstance(trade_time, pd.Timestamp):
+            trade_time = pd.Timestamp(trade_time)
+        self._pending.append(
+            (trade_time.value, execution['side'].upper() == 'BUY',
+             execution['exec_qty'], execution['price'], execution['exec_fee'],
+             execution['open'], order_id))
+        self._size += 1
+
+    def __repr__(self) -> str:
+        return 'ExecutionLog({}, {} executions)'.format(self.symbol, self._size)
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # only the logged records are pickled, not the spare capacity
+        return dict(self.__dict__, _data=self.records.copy(), _pending=[])
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self.__dict__.update(state)
+
+    def to_frame(self) -> pd.DataFrame:
+        '''
+        Export the log to a dataframe of executions indexed by order id, with the same columns as the executions.
+        '''
+        records = self.records
+        return pd.DataFrame(
+            {
+                "symbol": self.symbol,
+                "side": np.where(records['buy'], "BUY", "SELL"),
+                "open": records['open'],
+                "order_id": records['order_id'],
+                "exec_id": records['order_id'],
+                "price": records['price'],
+                "order_qty": records['exec_qty'],
+                "exec_type": "Trade",
+                "exec_qty": records['exec_qty'],
+                "exec_fee": records['exec_fee'],
+                "trade_time": records['trade_time'].astype('datetime64[ns]')
+            },
+            index=pd.Index(records['order_id']))
@@ -0,0 +1,112 @@
+# !/usr/bin/env python
+# coding: utf-8
+
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+
+import bisect
+from typing import Any, Dict, List, Tuple
+
+
+class OrderBook:
+    '''
+    Simulated book of the resting orders of one symbol, indexed by trigger price per side.
+    Orders on the rising side are triggered once the high of a candle reaches their price, e.g. sell limits and buy stops.
+    Orders on the falling side are triggered once the low of a candle reaches their price, e.g. buy limits and sell stops.
+    Both sides are kept sorted by price, so that a candle only visits the orders whose prices lie inside its range.
+    '''
+
+    def __init__(self):
+        '''
+        Attributes
+        ----------
+        self.rising: List[Tuple[float, int, Any]]
+            price, sequence number and id of all orders that are triggered by a rising price, sorted by price
+        self.falling: List[Tuple[float, int, Any]]
+            price, sequence number and id of all orders that are triggered by a falling price, sorted by price
+        self.entries: Dict[Any, Tuple[bool, Tuple[float, int, Any]]]
+            side and entry of every resting order, indexed by order id
+        self._seq: int
+            sequence number of the next order, a plain counter so that order books can be pickled into checkpoints
+        '''
+        self.rising = []
+        self.falling = []
+        self.entries = {}
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, order_id: Any) -> bool:
+        return order_id in self.entries
+
+    def add(self, order_id: Any, price: float, rising: bool):
+        '''
+        Add a resting order.
+
+        Parameters
+        ----------
+        order_id: Any
+            unique id of the order
+        price: float
+            limit or trigger price of the order
+        rising: bool
+            True if the order is triggered by a rising price, False if it is triggered by a falling price
+        '''
+        entry = (price, self._seq, order_id)
+        self._seq += 1
+        bisect.insort(self.rising if rising else self.falling, entry)
+        self.entries[order_id] = (rising, entry)
+
+    def remove(self, order_id: Any) -> bool:
+        '''
+        Remove a resting order, e.g. after it was cancelled.
+
+        Parameters
+        ----------
+        order_id: Any
+            id of the order
+
+        Returns
+        -------
+        removed: bool
+            True if the order was resting in the book
+        '''
+        if order_id not in self.entries:
+            return False
+        rising, entry = self.entries.pop(order_id)
+        side = self.rising if rising else self.falling
+        del side[bisect.bisect_left(side, entry)]
+        return True
+
+    def trigger(self, high: float, low: float) -> List[Tuple[Any, bool]]:
+        '''
+        Remove and return all orders whose prices lie inside the range of a candle.
+
+        Parameters
+        ----------
+        high: float
+            high price of the candle
+        low: float
+            low price of the candle
+
+        Returns
+        -------
+        orders: List[Tuple[Any, bool]]
+            id and side of every triggered order in the order of placement
+        '''
+        # rising orders with a price up to the high and falling orders with a price down to the low
+        last = bisect.bisect_right(self.rising, (high, float('inf')))
+        first = bisect.bisect_left(self.falling, (low, -1))
+        triggered = [(entry, True) for entry in self.rising[:last]]
+        triggered += [(entry, False) for entry in self.falling[first:]]
+        if not triggered:
+            return []
+
+        del self.rising[:last]
+        del self.falling[first:]
+        triggered.sort(key=lambda item: item[0][1])
+        for (_, _, order_id), _ in triggered:
+            del self.entries[order_id]
+        return [(order_id, rising) for (_, _, order_id), rising in triggered]
@@ -0,0 +1,157 @@
+# !/usr/bin/env python
+# coding: utf-8
+
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+
+import pandas as pd
+import numpy as np
+from contextlib import contextmanager
+from time import perf_counter_ns, process_time_ns
+from typing import Dict, Iterator, List
+
+# number of latency buckets, bucket i counts calls that took less than 2**i nanoseconds, enough for any int64 duration
+LATENCY_BUCKETS = 64
+
+
+class PhaseTimer:
+    '''
+    Cumulative timing of the phases of a backtest, e.g. loading data, the market data update, the model and the report.
+    Coarse phases are timed with wall and cpu time, see phase.
+    Phases that run once per candle are timed by laps of a single wall clock, see lap, because reading the cpu clock
+    costs more than most of these phases. Laps are exclusive, every lap measures the time since the previous lap.
+    '''
+
+    def __init__(self):
+        '''
+        Attributes
+        ----------
+        self.phases: Dict[str, List[int]]
+            cumulative wall time in nanoseconds, number of calls and cumulative cpu time in nanoseconds, indexed by phase.
+            The cpu time of phases that are timed by laps is None
+        self.latencies: Dict[str, List[int]]
+            histograms of the wall time per call with power of two buckets, indexed by phase
+        self.last: int
+            wall clock of the previous lap in nanoseconds
+        '''
+        self.phases = {}
+        self.latencies = {}
+        self.last = perf_counter_ns()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        '''
+        Time a coarse phase with wall and cpu time. The lap clock is restarted at the end of the phase.
+
+        Parameters
+        ----------
+        name: str
+            name of the phase
+        '''
+        wall = perf_counter_ns()
+        cpu = process_time_ns()
+        try:
+            yield
+        finally:
+            self.last = perf_counter_ns()
+            phase = self.phases.setdefault(name, [0, 0, 0])
+            phase[0] += self.last - wall
+            phase[1] += 1
+            phase[2] = (phase[2] or 0) + process_time_ns() - cpu
+
+    def start(self):
+        '''
+        Restart the lap clock, e.g. before the first candle of a simulation.
+        '''
+        self.last = perf_counter_ns()
+
+    def lap(self, name: str) -> int:
+        '''
+        Add the wall time since the previous lap to a phase.
+
+        Parameters
+        ----------
+        name: str
+            name of the phase that ends with this lap
+
+        Returns
+        -------
+        elapsed: int
+            wall time of the lap in nanoseconds
+        '''
+        now = perf_counter_ns()
+        elapsed = now - self.last
+        self.last = now
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.phases[name] = [0, 0, None]
+        phase[0] += elapsed
+        phase[1] += 1
+        return elapsed
+
+    def latency(self, name: str) -> int:
+        '''
+        Lap that additionally counts the wall time of the call in the latency histogram of the phase.
+
+        Parameters
+        ----------
+        name: str
+            name of the phase that ends with this lap
+
+        Returns
+        -------
+        elapsed: int
+            wall time of the lap in nanoseconds
+        '''
+        elapsed = self.lap(name)
+        histogram = self.latencies.get(name)
+        if histogram is None:
+            histogram = self.latencies[name] = [0] * LATENCY_BUCKETS
+        histogram[elapsed.bit_length()] += 1
+        return elapsed
+
+    def report(self) -> pd.DataFrame:
+        '''
+        Summarize the timed phases in the order in which they were first timed.
+
+        Returns
+        -------
+        report: pandas.DataFrame
+            wall and cpu time in seconds, number of calls and mean wall time per call in microseconds, indexed by phase.
+            The cpu time of lap phases is not available.
+        '''
+        report = pd.DataFrame(list(self.phases.values()),
+                              index=list(self.phases),
+                              columns=['wall_s', 'calls', 'cpu_s'],
+                              dtype=float)
+        report['wall_s'] /= 1e9
+        report['cpu_s'] /= 1e9
+        report['calls'] = report['calls'].astype(np.int64)
+        report['wall_per_call_us'] = report['wall_s'] / report['calls'] * 1e6
+        return report[['wall_s', 'cpu_s', 'calls', 'wall_per_call_us']]
+
+    def histogram(self, name: str) -> pd.Series:
+        '''
+        Latency histogram of a phase, see latency.
+
+        Parameters
+        ----------
+        name: str
+            name of the phase
+
+        Returns
+        -------
+        histogram: pandas.Series
+            number of calls, indexed by the upper bound of the bucket in microseconds. Empty buckets at both ends are dropped.
+        '''
+        counts = self.latencies.get(name,
+                                    np.zeros(LATENCY_BUCKETS, dtype=np.int64))
+        used = np.flatnonzero(counts)
+        if len(used) == 0:
+            return pd.Series(dtype=np.int64, name=name)
+        bounds = 2.0**np.arange(LATENCY_BUCKETS) / 1e3
+        return pd.Series(counts[used[0]:used[-1] + 1],
+                         index=pd.Index(bounds[used[0]:used[-1] + 1],
+                                        name='below_us'),
+                         name=name)
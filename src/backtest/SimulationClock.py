@@ -0,0 +1,204 @@
+# !/usr/bin/env python
+# coding: utf-8
+
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+
+import sys
+import heapq
+import numpy as np
+from typing import Dict, Iterator, List, Tuple
+from src.CandleAggregator import MINUTE_NS, parse_topic
+from src.backtest.CandleArchive import ARCHIVE_DTYPES, CandleWindow
+from src.endpoints.bybit_decoders import Candle
+
+
+def topic_order(topics: List[str]) -> List[str]:
+    '''
+    Order topics for candles that close at the same timestamp: finest interval first, then by topic.
+    Topics without a minute interval, e.g. daily candles, come last.
+
+    Parameters
+    ----------
+    topics: List[str]
+        public kline topics, e.g. ["candle.15.BTCUSDT", "candle.1.BTCUSDT", "candle.5.BTCUSDT"]
+
+    Returns
+    -------
+    topics: List[str]
+        ordered topics, e.g. ["candle.1.BTCUSDT", "candle.5.BTCUSDT", "candle.15.BTCUSDT"]
+    '''
+
+    def key(topic: str) -> Tuple[int, str]:
+        parsed = parse_topic(topic)
+        if parsed is None:
+            return sys.maxsize, topic
+        return parsed[0] * MINUTE_NS, topic
+
+    return sorted(topics, key=key)
+
+
+def stream_window(window: CandleWindow,
+                  first: int = 0,
+                  chunk_size: int = 65536) -> Iterator[Candle]:
+    '''
+    Decode the candles of a window lazily, starting at an index.
+    Columns are converted to plain python values in chunks that grow up to chunk_size,
+    so that a stream that is only read briefly, e.g. after skipping ahead, stays cheap.
+
+    Parameters
+    ----------
+    window: CandleWindow
+        candles sorted by close timestamp
+    first: int
+        index of the first candle
+    chunk_size: int
+        maximum number of candles that are converted at once
+
+    Returns
+    -------
+    candles: Iterator[Candle]
+        candles with int64 epoch nanosecond timestamps
+    '''
+    size = min(64, chunk_size)
+    while first < len(window):
+        last = min(first + size, len(window))
+        chunk = [window[col][first:last].tolist() for col in ARCHIVE_DTYPES]
+        for start, end, open_, high, low, close, volume, turnover in zip(
+                *chunk):
+            yield Candle(start=start,
+                         end=end,
+                         period='1',
+                         open=open_,
+                         close=close,
+                         high=high,
+                         low=low,
+                         volume=volume,
+                         turnover=turnover,
+                         confirm=True,
+                         cross_seq=0,
+                         timestamp=end)
+        first = last
+        size = min(2 * size, chunk_size)
+
+
+def drop_last(windows: Dict[str, CandleWindow],
+              n: int) -> Dict[str, CandleWindow]:
+    '''
+    Drop the last candles of several windows in the order of the simulation clock, i.e. by close timestamp and topic_order.
+    Every window is truncated without copying, so that the remaining candles can be streamed from any timestamp.
+
+    Parameters
+    ----------
+    windows: Dict[str, CandleWindow]
+        candle windows sorted by close timestamp, indexed by topic
+    n: int
+        number of candles to drop
+
+    Returns
+    -------
+    windows: Dict[str, CandleWindow]
+        truncated candle windows, indexed by topic
+    '''
+    if n <= 0 or not windows:
+        return dict(windows)
+    topics = topic_order(list(windows.keys()))
+
+    # the last n candles are among the last n candles of every window
+    ends = np.concatenate([windows[topic]['end'][-n:] for topic in topics])
+    topic_idx = np.concatenate([
+        np.full(min(n, len(windows[topic])), i, dtype=np.int64)
+        for i, topic in enumerate(topics)
+    ])
+    order = np.lexsort((topic_idx, ends))
+    dropped = np.bincount(topic_idx[order[-n:]], minlength=len(topics))
+
+    return {
+        topic:
+        CandleWindow(topic=topic,
+                     columns={
+                         col: values[:len(values) - dropped[i]]
+                         for col, values in windows[topic].columns.items()
+                     }) for i, topic in enumerate(topics)
+    }
+
+
+class SimulationClock:
+    '''
+    Clock of a backtest that merges the sorted candle streams of all topics by close timestamp.
+    The head of every stream is kept in a heap, so that every candle costs O(log k) for k topics
+    and no global sort of the simulation data is needed.
+    Candles that close at the same timestamp are ordered by topic_order, i.e. the finest interval first.
+    '''
+
+    def __init__(self,
+                 windows: Dict[str, CandleWindow],
+                 after: int = None,
+                 chunk_size: int = 65536):
+        '''
+        Parameters
+        ----------
+        windows: Dict[str, CandleWindow]
+            candle windows sorted by close timestamp, indexed by topic
+        after: int
+            optional close timestamp in epoch nanoseconds, only candles that close after it are returned. None for all candles
+        chunk_size: int
+            maximum number of candles per window that are decoded at once, see stream_window
+
+        Attributes
+        ----------
+        self.time: int
+            close timestamp of the last returned candle in epoch nanoseconds, None before the first candle
+        self.topics: List[str]
+            topics in the order of ties, see topic_order
+        '''
+        self.windows = windows
+        self.after = after
+        self.chunk_size = chunk_size
+        self.time = None
+        self.topics = topic_order(list(windows.keys()))
+
+    def __len__(self) -> int:
+        '''
+        Number of candles of the clock.
+        '''
+        return sum(
+            len(window) - self._first(window)
+            for window in self.windows.values())
+
+    def _first(self, window: CandleWindow) -> int:
+        return 0 if self.after is None else window.index_after(self.after)
+
+    def __iter__(self) -> Iterator[Tuple[str, Candle]]:
+        '''
+        Merge the candle streams of all topics.
+
+        Returns
+        -------
+        records: Iterator[Tuple[str, Candle]]
+            topic and candle with int64 epoch nanosecond timestamps, ordered by close timestamp and topic_order
+        '''
+        # heap entries are unique by the rank of the topic, so candles are never compared
+        heap = []
+        for rank, topic in enumerate(self.topics):
+            window = self.windows[topic]
+            stream = stream_window(window=window,
+                                   first=self._first(window),
+                                   chunk_size=self.chunk_size)
+            candle = next(stream, None)
+            if candle is not None:
+                heap.append((candle.end, rank, topic, candle, stream))
+        heapq.heapify(heap)
+
+        while heap:
+            _, rank, topic, candle, stream = heap[0]
+            self.time = candle.end
+            yield topic, candle
+
+            candle = next(stream, None)
+            if candle is None:
+                heapq.heappop(heap)
+            else:
+                heapq.heapreplace(heap,
+                                  (candle.end, rank, topic, candle, stream))
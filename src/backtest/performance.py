@@ -0,0 +1,236 @@
+# !/usr/bin/env python
+# coding: utf-8
+
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+
+import pandas as pd
+import numpy as np
+from typing import Any, Dict, Tuple
+from src.backtest.ExecutionLog import ExecutionLog
+
+
+def execution_columns(
+        executions: Dict[Any, Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    '''
+    Collect the executions of one symbol into columnar arrays in the order of execution.
+    The columns of an ExecutionLog are returned without copying.
+
+    Parameters
+    ----------
+    executions: Dict[Any, Dict[str, Any]]
+        executions of one symbol, indexed by order id, e.g. an ExecutionLog
+
+    Returns
+    -------
+    columns: Dict[str, numpy.ndarray]
+        boolean arrays "buy" and "open" and float arrays "price" and "exec_qty"
+    '''
+    if isinstance(executions, ExecutionLog):
+        records = executions.records
+        return {
+            col: records[col] for col in ['buy', 'open', 'price', 'exec_qty']
+        }
+
+    values = list(executions.values())
+    return {
+        'buy':
+            np.array([exe['side'].upper() == 'BUY' for exe in values],
+                     dtype=bool),
+        'open':
+            np.array([exe['open'] == True for exe in values], dtype=bool),
+        'price':
+            np.array([exe['price'] for exe in values], dtype=np.float64),
+        'exec_qty':
+            np.array([exe['exec_qty'] for exe in values], dtype=np.float64)
+    }
+
+
+def scan_round_trips(columns: Dict[str, np.ndarray]) -> Tuple[int, int]:
+    '''
+    Count round trips and winning round trips by iterating through the executions.
+    A round trip is counted if a closing execution exceeds or matches the previously open position.
+    It is a winning round trip if its price is better than the position price before any partial closings.
+
+    Parameters
+    ----------
+    columns: Dict[str, numpy.ndarray]
+        columnar executions, see execution_columns
+
+    Returns
+    -------
+    total_trades: int
+        number of round trips
+    wins: int
+        number of winning round trips
+    '''
+    # sign, price, size and value of current position
+    sign_pos = None
+    pos_price = None
+    pos_qty = 0
+    pos_value = 0
+    wins = 0
+    total_trades = 0
+
+    for buy, open, price, qty in zip(columns['buy'].tolist(),
+                                     columns['open'].tolist(),
+                                     columns['price'].tolist(),
+                                     columns['exec_qty'].tolist()):
+
+        # if trade opened a new position calculate new position value and continue
+        if pos_qty == 0:
+            sign_pos = 2 * (buy - 0.5)
+            pos_price = price
+            pos_qty = qty
+            pos_value = pos_price * pos_qty
+            continue
+
+        # calculate sign of new trade
+        sign_new = 2 * (buy - 0.5)
+
+        # if trade was in same direction as position, calculate new position values and continue
+        if sign_new == sign_pos:
+            pos_value += price * qty
+            pos_qty += qty
+            pos_price = pos_value / pos_qty
+            continue
+
+        # if a closing trade exceeded or matched the old position in size, count it
+        # and open new position with execution price and residual quantity
+        if not open:
+            if qty >= pos_qty:
+                wins += price * sign_pos > pos_price * sign_pos
+                total_trades += 1
+
+                pos_price = price
+                pos_value = (qty - pos_qty) * price
+                sign_pos = sign_new
+                pos_qty = abs(qty - pos_qty)
+
+        # if trade did not match or exceed old position, reduce old position, but keep position price
+        else:
+            pos_value = abs(pos_value - price * qty)
+            pos_qty = abs(pos_qty - qty)
+
+    return total_trades, int(wins)
+
+
+def count_round_trips(columns: Dict[str, np.ndarray]) -> Tuple[int, int]:
+    '''
+    Count round trips and winning round trips like scan_round_trips with cumulative position arithmetic.
+    The executions are split into round trips that end with a closing execution.
+    All round trips are accumulated at once, one execution per round trip and step,
+    so that positions are summed in the same order as by scan_round_trips and the result is identical.
+    Executions that partially close, reverse or exceed the position are counted by scan_round_trips.
+
+    Parameters
+    ----------
+    columns: Dict[str, numpy.ndarray]
+        columnar executions, see execution_columns
+
+    Returns
+    -------
+    total_trades: int
+        number of round trips
+    wins: int
+        number of winning round trips
+    '''
+    buy = columns['buy']
+    closing = ~columns['open']
+    price = columns['price']
+    qty = columns['exec_qty']
+    if len(qty) == 0:
+        return 0, 0
+
+    # round trip of every execution and position of the execution within its round trip
+    trip = np.concatenate([[0], np.cumsum(closing)[:-1]])
+    starts = np.flatnonzero(np.concatenate([[True], closing[:-1]]))
+    step = np.arange(len(qty)) - starts[trip]
+    sign_pos = 2 * (buy[starts] - 0.5)
+    sign = 2 * (buy - 0.5)
+
+    # every round trip has to be opened, increased in the same direction and closed in the opposite direction
+    if closing[starts].any() or np.any(qty <= 0) or np.any(
+        (sign == sign_pos[trip]) == (closing & (step > 0))):
+        return scan_round_trips(columns)
+
+    pos_qty = qty[starts].copy()
+    pos_value = pos_qty * price[starts]
+    pos_price = price[starts].copy()
+    wins = 0
+    total_trades = 0
+
+    order = np.argsort(step, kind='stable')
+    bounds = np.searchsorted(step[order], np.arange(1, step.max() + 2))
+    for first, last in zip(bounds[:-1], bounds[1:]):
+        idx = order[first:last]
+
+        # increase positions and update position prices
+        add = idx[~closing[idx]]
+        pos_value[trip[add]] += price[add] * qty[add]
+        pos_qty[trip[add]] += qty[add]
+        pos_price[trip[add]] = pos_value[trip[add]] / pos_qty[trip[add]]
+
+        # closing executions have to match the position exactly
+        close = idx[closing[idx]]
+        t = trip[close]
+        if np.any(qty[close] != pos_qty[t]):
+            return scan_round_trips(columns)
+        wins += int(
+            np.sum(price[close] * sign_pos[t] > pos_price[t] * sign_pos[t]))
+        total_trades += len(close)
+
+    return total_trades, wins
+
+
+def attach_model_stats(trades: pd.DataFrame,
+                       model_stats: Dict[str, Dict[str, Any]]) -> pd.DataFrame:
+    '''
+    Add model statistics as additional columns to a trade list.
+    Statistics are indexed by the trade time of the opening trade and by "long" or "short",
+    closing trades get the statistics of the preceding trade.
+    Missing statistics are added to model_stats as empty strings.
+
+    Parameters
+    ----------
+    trades: pandas.DataFrame
+        executions of one symbol in the order of execution
+    model_stats: Dict[str, Dict[str, Any]]
+        statistics of the model, indexed by statistic and trade time
+
+    Returns
+    -------
+    trades: pandas.DataFrame
+        trade list with one column per statistic
+    '''
+    times = [str(time) for time in trades['trade_time']]
+    sides = [
+        'long' if side.upper() == 'BUY' else 'short' for side in trades['side']
+    ]
+    opens = list(trades['open'])
+
+    # closing trades are looked up by the time and side of the preceding trade
+    keys = [(times[i], sides[i]) if opens[i] else (times[i - 1], sides[i - 1])
+            for i in range(len(times))]
+
+    for stat, values in model_stats.items():
+        for time in times:
+            values.setdefault(time, {})
+        for time in set(time for time, _ in keys):
+            values[time].setdefault('long', "")
+            values[time].setdefault('short', "")
+
+        trades[stat] = pd.Series([values[time][side] for time, side in keys],
+                                 index=trades.index,
+                                 dtype=object)
+
+        # statistics that do not fit into a single cell are stored as strings
+        for id, value in zip(trades.index, trades[stat]):
+            if not pd.api.types.is_scalar(value):
+                try:
+                    trades.loc[id, stat] = value
+                except:
+                    trades.loc[id, stat] = str(value)
+
+    return trades
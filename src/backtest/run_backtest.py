@@ -5,6 +5,7 @@ sys.path.append('../')
 from binance.client import Client
 from dotenv import load_dotenv
 from src.backtest.BacktestTradingModel import BacktestTradingModel
+from src.backtest.sweep import run_per_symbol, run_walk_forward
 from src.models.checklist_model import checklist_model
 import os
 import pandas as pd
@@ -72,10 +73,93 @@ def main():
     parser.add_argument('--end_str',
                         type=str,
                         help="end for backtest format yyyy-mm-dd hh:mm:ss")
+    parser.add_argument(
+        '--slice_length',
+        type=int,
+        default=None,
+        help=
+        "number of minutes per slice, runs the slices in parallel as walk-forward backtest"
+    )
+    parser.add_argument(
+        '--warmup_length',
+        type=str,
+        default=None,
+        help=
+        "history before every slice of a walk-forward backtest to warm up market data, e.g. 12h. Default is 1D"
+    )
+    parser.add_argument(
+        '--cold_start',
+        action='store_true',
+        help=
+        "start the model without warming up market data with the history from start_history, or before every slice with --slice_length"
+    )
+    parser.add_argument(
+        '--per_symbol',
+        action='store_true',
+        help="run the backtest of every ticker in its own worker process")
+    parser.add_argument('--processes',
+                        type=int,
+                        default=None,
+                        help="number of worker processes, default is all cpus")
+    parser.add_argument('--archive',
+                        action='store_true',
+                        help="read simulation data from the candle archive")
+    parser.add_argument('--checkpoint_dir',
+                        type=str,
+                        default=None,
+                        help="directory to periodically write checkpoints to")
+    parser.add_argument('--checkpoint_freq',
+                        type=str,
+                        default='1D',
+                        help="simulated time between checkpoints, e.g. 12h")
+    parser.add_argument('--resume',
+                        type=str,
+                        default=None,
+                        help="path of a checkpoint to resume the backtest from")
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help="capture a cProfile profile of the backtest next to the evaluations"
+    )
+    parser.add_argument(
+        '--direct',
+        action='store_true',
+        help=
+        "push candles directly into the model instead of simulating json messages, parallel backtests are always direct"
+    )
+    parser.add_argument(
+        '--fast_forward',
+        action='store_true',
+        help=
+        "skip ahead to the exit of a position while the model waits for it, requires --direct"
+    )
 
     args = parser.parse_args()
     args = vars(args)
 
+    # parallel backtests run in worker processes without checkpoints, profiles or fast-forward
+    parallel = [
+        flag for flag in ['slice_length', 'per_symbol']
+        if args[flag] not in [None, False]
+    ]
+    if len(parallel) > 1:
+        parser.error('--slice_length and --per_symbol can not be combined')
+    for flag in ['checkpoint_dir', 'resume', 'profile', 'fast_forward']:
+        if parallel and args[flag] not in [None, False]:
+            parser.error('--{} is not supported with --{}'.format(
+                flag, parallel[0]))
+    if args['fast_forward'] and not args['direct']:
+        parser.error('--fast_forward requires --direct')
+    if args['slice_length'] is None and not args[
+            'cold_start'] and args['start_history'] is None:
+        parser.error('--start_history is required without --cold_start')
+    if args['warmup_length'] is not None:
+        if args['slice_length'] is None:
+            parser.error('--warmup_length requires --slice_length')
+        if args['cold_start']:
+            parser.error(
+                '--warmup_length can not be combined with --cold_start')
+
     freqs = args['freqs'].split()
     tick_sizes_raw = args['tick_sizes'].split()
     trading_freqs = args['trading_freqs'].split()
@@ -118,6 +202,51 @@ def main():
         budget[ticker[-len(BASE_CUR):]] = 1000
         budget[ticker[:-len(BASE_CUR)]] = 0
 
+    model_storage = {
+        'open': None,
+        'close': None,
+        'entry_bar_time': pd.Timestamp(0)
+    }
+
+    # run slices of the backtest in parallel
+    if args['slice_length'] is not None:
+        run_walk_forward(model=checklist_model,
+                         symbols=BACKTEST_SYMBOLS,
+                         account_symbols=symbols,
+                         budget=budget,
+                         topics=PUBLIC_TOPICS,
+                         topic_mapping=BINANCE_BYBIT_MAPPING,
+                         start_str=args['start_str'],
+                         end_str=args['end_str'],
+                         slice_length=args['slice_length'],
+                         warmup='0min' if args['cold_start'] else
+                         (args['warmup_length'] or '1D'),
+                         model_args=model_args,
+                         model_storage=model_storage,
+                         processes=args['processes'],
+                         archive=args['archive'],
+                         save_output=True)
+        return
+
+    # run independent tickers in parallel
+    if args['per_symbol']:
+        run_per_symbol(model=checklist_model,
+                       symbols=BACKTEST_SYMBOLS,
+                       account_symbols=symbols,
+                       budget=budget,
+                       topics=PUBLIC_TOPICS,
+                       topic_mapping=BINANCE_BYBIT_MAPPING,
+                       start_history=args['start_history'],
+                       start_str=args['start_str'],
+                       end_str=args['end_str'],
+                       model_args=model_args,
+                       model_storage=model_storage,
+                       processes=args['processes'],
+                       archive=args['archive'],
+                       save_output=True,
+                       warmup=not args['cold_start'])
+        return
+
     # instantiate model
     model = BacktestTradingModel(model=checklist_model,
                                  http_session=binance_client,
@@ -127,18 +256,23 @@ def main():
                                  topic_mapping=BINANCE_BYBIT_MAPPING,
                                  backtest_symbols=BACKTEST_SYMBOLS,
                                  model_args=model_args,
-                                 model_storage={
-                                     'open': None,
-                                     'close': None,
-                                     'entry_bar_time': pd.Timestamp(0)
-                                 })
+                                 model_storage=model_storage)
 
     # create performance report
     model.run_backtest(symbols=BACKTEST_SYMBOLS,
                        start_history=args['start_history'],
                        start_str=args['start_str'],
                        end_str=args['end_str'],
-                       save_output=True)
+                       save_output=True,
+                       archive=args['archive'],
+                       checkpoint_dir=args['checkpoint_dir'],
+                       checkpoint_freq=args['checkpoint_freq'],
+                       resume=args['resume'],
+                       profile=args['profile'],
+                       direct=args['direct'],
+                       fast_forward=args['fast_forward'],
+                       warmup=not args['cold_start'],
+                       verbose=True)
 
 
 if __name__ == "__main__":
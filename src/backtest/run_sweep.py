@@ -0,0 +1,160 @@
+import sys
+
+sys.path.append('../')
+
+from src.backtest.sweep import parameter_grid, run_sweep
+from src.models.checklist_model import checklist_model
+import pandas as pd
+import argparse
+
+import yaml
+from dotenv import load_dotenv
+import os
+
+load_dotenv()
+
+CONFIG_DIR = os.getenv('CONFIG_DIR')
+
+# Load variables from the YAML file
+with open(CONFIG_DIR, 'r') as file:
+    config = yaml.safe_load(file)
+
+# Access variables from the loaded data
+BASE_CUR = config.get('base_cur', 'USDT')
+
+
+def main():
+
+    # parse arguments
+    parser = argparse.ArgumentParser(
+        description="Run a parallel parameter sweep of backtests.")
+
+    parser.add_argument('--tickers', type=str, default="RTYUSD")
+    parser.add_argument('--tick_sizes',
+                        type=str,
+                        default="0.1",
+                        help="Tick size for each ticker")
+    parser.add_argument(
+        '--freqs',
+        type=str,
+        default="1 5 15",
+        help="List of candle frequencies in minutes required by the model")
+
+    parser.add_argument(
+        '--trading_freqs',
+        type=str,
+        default="5",
+        help="List of candle frequencies in minutes required by the model")
+
+    parser.add_argument(
+        '--grid',
+        type=str,
+        default=str({'param': [1]}),
+        help="candidate values of the model arguments, all combinations are run"
+    )
+    parser.add_argument(
+        '--model_args_list',
+        type=str,
+        default=None,
+        help="explicit list of model arguments, used instead of --grid")
+    parser.add_argument('--processes',
+                        type=int,
+                        default=None,
+                        help="number of worker processes, default is all cpus")
+    parser.add_argument('--archive',
+                        action='store_true',
+                        help="read simulation data from the candle archive")
+    parser.add_argument(
+        '--cold_start',
+        action='store_true',
+        help=
+        "start the model without warming up market data with the history from start_history"
+    )
+    parser.add_argument(
+        '--start_history',
+        type=str,
+        help=" start for historical data for modelformat yyyy-mm-dd hh:mm:ss")
+    parser.add_argument('--start_str',
+                        type=str,
+                        help="start for backtest format yyyy-mm-dd hh:mm:ss")
+    parser.add_argument('--end_str',
+                        type=str,
+                        help="end for backtest format yyyy-mm-dd hh:mm:ss")
+
+    args = parser.parse_args()
+    args = vars(args)
+
+    freqs = args['freqs'].split()
+    tick_sizes_raw = args['tick_sizes'].split()
+    trading_freqs = args['trading_freqs'].split()
+    tickers = args['tickers'].split()
+
+    if args['model_args_list'] is not None:
+        model_args_list = eval(args['model_args_list'])
+    else:
+        model_args_list = parameter_grid(eval(args['grid']))
+
+    tick_sizes = {
+        ticker: float(tick_size)
+        for ticker, tick_size in zip(tickers, tick_sizes_raw)
+    }
+
+    for model_args in model_args_list:
+        model_args['tickers'] = tickers
+        model_args['tick_sizes'] = tick_sizes
+        model_args['expiries'] = {ticker: 'None' for ticker in tickers}
+        model_args['trading_freqs'] = trading_freqs
+        model_args['open'] = None
+        model_args['reduce_only'] = True
+
+    BACKTEST_SYMBOLS = {
+        '{}.{}m'.format(ticker, freq): 'candle.{}.{}'.format(freq, ticker)
+        for freq in freqs for ticker in tickers
+    }
+    BINANCE_BYBIT_MAPPING = {
+        'candle.{}.{}'.format(freq, ticker): '{}'.format(ticker)
+        for freq in freqs for ticker in tickers
+    }
+
+    PUBLIC_TOPICS = [
+        "candle.{}.{}".format(freq, ticker)
+        for freq in freqs
+        for ticker in tickers
+    ]
+
+    symbols = [ticker[:-len(BASE_CUR)] for ticker in tickers]
+    symbols.extend([ticker[-len(BASE_CUR):] for ticker in tickers])
+
+    budget = {}
+    for ticker in tickers:
+        budget[ticker[-len(BASE_CUR):]] = 1000
+        budget[ticker[:-len(BASE_CUR)]] = 0
+
+    # run all backtests on shared simulation data
+    results = run_sweep(model=checklist_model,
+                        model_args=model_args_list,
+                        symbols=BACKTEST_SYMBOLS,
+                        account_symbols=symbols,
+                        budget=budget,
+                        topics=PUBLIC_TOPICS,
+                        topic_mapping=BINANCE_BYBIT_MAPPING,
+                        start_history=args['start_history'],
+                        start_str=args['start_str'],
+                        end_str=args['end_str'],
+                        model_storage={
+                            'open': None,
+                            'close': None,
+                            'entry_bar_time': pd.Timestamp(0)
+                        },
+                        processes=args['processes'],
+                        archive=args['archive'],
+                        warmup=not args['cold_start'])
+
+    # export results table
+    results.to_excel('evaluations/sweep_{}_{}.xlsx'.format(
+        args['start_str'], args['end_str']))
+    print(results)
+
+
+if __name__ == "__main__":
+    main()
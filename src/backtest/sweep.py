@@ -0,0 +1,762 @@
+# !/usr/bin/env python
+# coding: utf-8
+
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+
+import copy
+import gc
+import itertools
+import multiprocessing
+import multiprocessing.util
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Tuple
+from src.backtest.BacktestTradingModel import BacktestTradingModel
+from src.backtest.CandleArchive import ARCHIVE_DTYPES, CandleWindow, frame_windows, load_windows
+from src.endpoints.binance_functions import format_simulation_data
+from src.endpoints.bybit_functions import create_simulation_data, fetch_kline_ranges
+from src.backtest.warmup import load_warmup
+from src.helper_functions.helper_functions import slice_timestamps
+import yaml
+from dotenv import load_dotenv
+import os
+
+load_dotenv()
+
+CONFIG_DIR = os.getenv('CONFIG_DIR')
+
+# Load variables from the YAML file
+with open(CONFIG_DIR, 'r') as file:
+    config = yaml.safe_load(file)
+
+# layout of shared candle windows: offset in bytes and length of every column, indexed by topic and column
+WindowSpec = Dict[str, Dict[str, Tuple[int, int]]]
+
+# base currency of the account, used for the initial budget of stitched backtests
+BASE_CUR = config.get('base_cur', 'USDT')
+
+# simulation data and backtest settings of the current worker process, see _init_worker
+_worker = {}
+
+
+def parameter_grid(grid: Dict[str, List[Any]]) -> List[Dict[str, Any]]:
+    '''
+    Expand a grid of model arguments into the list of all combinations.
+
+    Parameters
+    ----------
+    grid: Dict[str, List[Any]]
+        candidate values of every model argument, e.g. {"sl": [1, 2], "tp": [3, 4]}
+
+    Returns
+    -------
+    model_args: List[Dict[str, Any]]
+        all combinations, e.g. [{"sl": 1, "tp": 3}, {"sl": 1, "tp": 4}, ...]
+    '''
+    keys = list(grid.keys())
+    return [
+        dict(zip(keys, values))
+        for values in itertools.product(*[grid[key] for key in keys])
+    ]
+
+
+def share_windows(
+    windows: Dict[str, CandleWindow]
+) -> Tuple[shared_memory.SharedMemory, WindowSpec]:
+    '''
+    Copy candle windows once into a single shared memory block.
+    The caller owns the block and needs to close and unlink it.
+
+    Parameters
+    ----------
+    windows: Dict[str, CandleWindow]
+        candle windows indexed by topic
+
+    Returns
+    -------
+    shm: multiprocessing.shared_memory.SharedMemory
+        shared memory block holding all columns
+    spec: WindowSpec
+        layout of the columns in the block, used to attach the windows in other processes
+    '''
+    spec = {}
+    size = 0
+    for topic, window in windows.items():
+        spec[topic] = {}
+        for col, dtype in ARCHIVE_DTYPES.items():
+            spec[topic][col] = (size, len(window))
+            size += len(window) * np.dtype(dtype).itemsize
+
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    for topic, columns in attach_windows(shm, spec).items():
+        for col in ARCHIVE_DTYPES:
+            columns[col][:] = windows[topic][col]
+    return shm, spec
+
+
+def attach_windows(shm: shared_memory.SharedMemory,
+                   spec: WindowSpec) -> Dict[str, CandleWindow]:
+    '''
+    Build zero-copy candle windows on a shared memory block, see share_windows.
+
+    Parameters
+    ----------
+    shm: multiprocessing.shared_memory.SharedMemory
+        shared memory block holding all columns
+    spec: WindowSpec
+        layout of the columns in the block
+
+    Returns
+    -------
+    windows: Dict[str, CandleWindow]
+        candle windows indexed by topic, the columns are views into the block
+    '''
+    return {
+        topic: CandleWindow(topic=topic,
+                            columns={
+                                col: np.ndarray((length,),
+                                                dtype=ARCHIVE_DTYPES[col],
+                                                buffer=shm.buf,
+                                                offset=offset)
+                                for col, (offset, length) in columns.items()
+                            }) for topic, columns in spec.items()
+    }
+
+
+def _init_worker(name: str, spec: WindowSpec, settings: Dict[str, Any]):
+    '''
+    Attach the shared simulation data once per worker process.
+    '''
+    shm = shared_memory.SharedMemory(name=name)
+    _worker['shm'] = shm
+    _worker['windows'] = attach_windows(shm, spec)
+    _worker['settings'] = settings
+
+    # pool workers leave through os._exit, which skips atexit handlers but runs multiprocessing finalizers
+    multiprocessing.util.Finalize(None, _close_worker, exitpriority=10)
+
+
+def _close_worker():
+    '''
+    Detach the shared simulation data when the worker process exits. Only the parent process unlinks the block.
+    '''
+    shm = _worker.pop('shm', None)
+    _worker.clear()
+
+    # the block can only be closed once no window views into it are left, e.g. in reference cycles of finished models
+    gc.collect()
+    if shm is not None:
+        shm.close()
+
+
+def _map_shared(func: Callable[[Any], Any], tasks: List[Any],
+                windows: Dict[str, CandleWindow], settings: Dict[str, Any],
+                processes: int) -> List[Any]:
+    '''
+    Share candle windows with a pool of worker processes and map a function over tasks.
+    '''
+    shm, spec = share_windows(windows)
+    try:
+        with multiprocessing.Pool(processes=processes,
+                                  initializer=_init_worker,
+                                  initargs=(shm.name, spec, settings)) as pool:
+            results = pool.map(func, tasks, chunksize=1)
+
+            # let the workers exit normally, so that they detach the block before the pool would terminate them
+            pool.close()
+            pool.join()
+        return results
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _create_model(model_args: Dict[str, Any]) -> BacktestTradingModel:
+    '''
+    Create a fresh backtest trading model from the settings of the worker.
+    '''
+    settings = _worker['settings']
+    return BacktestTradingModel(model=settings['model'],
+                                http_session=None,
+                                symbols=settings['account_symbols'],
+                                budget=copy.deepcopy(settings['budget']),
+                                topics=settings['topics'],
+                                topic_mapping=settings['topic_mapping'],
+                                backtest_symbols=settings['symbols'],
+                                model_args=copy.deepcopy(model_args),
+                                model_storage=copy.deepcopy(
+                                    settings['model_storage']),
+                                model_stats={})
+
+
+def _run(run: Tuple[int, Dict[str, Any]]) -> Dict[str, Dict[str, float]]:
+    '''
+    Run the backtest of one set of model arguments on the shared simulation data of the worker.
+    '''
+    run_id, model_args = run
+    settings = _worker['settings']
+    model = _create_model(model_args)
+
+    return model.run_backtest(symbols=settings['symbols'],
+                              start_history=settings['start_history'],
+                              start_str=settings['start_str'],
+                              end_str=settings['end_str'],
+                              save_output=settings['save_output'],
+                              direct=True,
+                              windows=_worker['windows'],
+                              run_id=str(run_id),
+                              warmup=settings['warmup'])
+
+
+def load_simulation_windows(symbols: Dict[str, str],
+                            start_str: str,
+                            end_str: str,
+                            archive: bool = False) -> Dict[str, CandleWindow]:
+    '''
+    Load the simulation data of a backtest as candle windows, see BacktestTradingModel.run_backtest.
+
+    Parameters
+    ----------
+    symbols: Dict[str, str]
+        dictionary of relevant symbols for backtesting
+        keys have format binance_ticker.binance_interval and values are coresponding bybit ws topics.
+    start_str: str
+        start of simulation in format yyyy-mm-dd hh-mm-ss
+    end_str: str
+        end of simulation in format yyyy-mm-dd hh-mm-ss
+    archive: bool
+        flag whether to read simulation data from the memory mapped candle archive. Default is False
+
+    Returns
+    -------
+    windows: Dict[str, CandleWindow]
+        candle windows indexed by topic
+    '''
+    if archive:
+        return load_windows(symbols=symbols,
+                            start_str=start_str,
+                            end_str=end_str,
+                            fetch=fetch_kline_ranges)
+
+    klines, topics = create_simulation_data(symbols=symbols,
+                                            start_str=start_str,
+                                            end_str=end_str)
+    return frame_windows(format_simulation_data(klines, topics=topics))
+
+
+def run_sweep(model: Any,
+              model_args: List[Dict[str, Any]],
+              symbols: Dict[str, str],
+              account_symbols: List[str],
+              budget: Dict[str, Any],
+              topics: List[str],
+              topic_mapping: Dict[str, str],
+              start_history: str,
+              start_str: str,
+              end_str: str,
+              model_storage: Dict[str, Any] = {},
+              processes: int = None,
+              archive: bool = False,
+              save_output: bool = False,
+              warmup: bool = False) -> pd.DataFrame:
+    '''
+    Run the backtest of several sets of model arguments in parallel.
+    The simulation data is loaded once into shared memory and all worker processes read the same candle arrays without copying them.
+
+    Parameters
+    ----------
+    model: Any
+        function that holds the trading logic, needs to be importable by the worker processes
+    model_args: List[Dict[str, Any]]
+        model arguments of every run, e.g. from parameter_grid
+    symbols: Dict[str, str]
+        dictionary of relevant symbols for backtesting
+        keys have format binance_ticker.binance_interval and values are coresponding bybit ws topics.
+    account_symbols: List[str]
+        list of symbols to incorporate into account data
+    budget: Dict[str, float]
+        start budget for all tickers as dictionary with key = symbol, value= budget
+    topics: List[str]
+        all topics to store in market data object
+    topic_mapping: Dict[str,str]
+        mapping between bybit websocket topics and binance symbols
+    start_history: str
+        start of historical data to pull for model in format yyyy-mm-dd hh-mm-ss
+    start_str: str
+        start of simulation in format yyyy-mm-dd hh-mm-ss
+    end_str: str
+        end of simulation in format yyyy-mm-dd hh-mm-ss
+    model_storage: Dict[str, Any]
+        initial model storage, every run starts with its own copy
+    processes: int
+        number of worker processes. Default is the number of cpus.
+    archive: bool
+        flag whether to read simulation data from the memory mapped candle archive. Default is False
+    save_output: bool
+        flag whether every run exports its performance report and trade list to excel. Default is False
+    warmup: bool
+        flag whether every run warms up market data with the history from start_history to start_str.
+        The warm-up snapshot is built once before the runs start, see warmup.load_warmup. Default is False
+
+    Returns
+    -------
+    results: pandas.DataFrame
+        one row per run and traded symbol with the model arguments and the performance report
+    '''
+    windows = load_simulation_windows(symbols=symbols,
+                                      start_str=start_str,
+                                      end_str=end_str,
+                                      archive=archive)
+
+    settings = {
+        'model': model,
+        'symbols': symbols,
+        'account_symbols': account_symbols,
+        'budget': budget,
+        'topics': topics,
+        'topic_mapping': topic_mapping,
+        'model_storage': model_storage,
+        'start_history': start_history,
+        'start_str': start_str,
+        'end_str': end_str,
+        'save_output': save_output,
+        'warmup': warmup
+    }
+
+    # build the warm-up snapshot once, the runs read it
+    if warmup:
+        load_warmup(symbols=symbols,
+                    start_history=start_history,
+                    start_str=start_str,
+                    fetch=fetch_kline_ranges)
+
+    reports = _map_shared(func=_run,
+                          tasks=list(enumerate(model_args)),
+                          windows=windows,
+                          settings=settings,
+                          processes=processes)
+
+    # collect all performance reports in one table
+    rows = []
+    for run_id, (args, report) in enumerate(zip(model_args, reports)):
+        for symbol, kpis in report.items():
+            rows.append({'run_id': run_id, **args, 'symbol': symbol, **kpis})
+    return pd.DataFrame(rows)
+
+
+def _run_slice(
+    run: Tuple[int, Tuple[pd.Timestamp, pd.Timestamp]]
+) -> Tuple[Dict[str, Dict[int, Dict[str, Any]]], Dict[str, Dict[str, Any]],
+           Dict[str, Any]]:
+    '''
+    Run the backtest of one time slice on the shared simulation data of the worker, after warming up market data.
+    '''
+    slice_id, (start, end) = run
+    settings = _worker['settings']
+    model = _create_model(settings['model_args'])
+
+    windows = {}
+    for symbol, topic in settings['symbols'].items():
+        window = _worker['windows'][topic]
+
+        # warm up market data and indicators with the candles before the slice
+        warmup = window.slice(start=start - settings['warmup'],
+                              end=start - pd.Timedelta(1, unit='ns'))
+        if len(warmup) and topic in model.market_data.topics:
+            model.market_data.add_history(topic=topic, data=warmup.to_frame())
+
+        # extend slice by one interval like create_simulation_data
+        interval = pd.Timedelta(symbol.split('.')[1])
+        windows[topic] = window.slice(start=start, end=end + interval)
+
+    model.run_backtest(symbols=settings['symbols'],
+                       start_history=str(start - settings['warmup']),
+                       start_str=str(start),
+                       end_str=str(end),
+                       direct=True,
+                       windows=windows,
+                       create_report=False)
+
+    return model.account.executions, model.account.wallet, model.model_stats
+
+
+def run_walk_forward(model: Any,
+                     symbols: Dict[str, str],
+                     account_symbols: List[str],
+                     budget: Dict[str, Any],
+                     topics: List[str],
+                     topic_mapping: Dict[str, str],
+                     start_str: str,
+                     end_str: str,
+                     slice_length: int,
+                     warmup: str = '1D',
+                     freq: str = '1min',
+                     model_args: Dict[str, Any] = {},
+                     model_storage: Dict[str, Any] = {},
+                     processes: int = None,
+                     archive: bool = False,
+                     save_output: bool = False) -> Dict[str, Dict[str, float]]:
+    '''
+    Run a backtest as consecutive time slices in parallel and stitch the slices into one performance report.
+    The simulation data is loaded once into shared memory, see run_sweep.
+
+    Rules at slice boundaries:
+        - Every slice ends at the start of the next slice, so that together the slices simulate the same candles as a single backtest.
+        - Every slice starts flat with the initial budget and a fresh model storage.
+          Market data and indicators are warmed up with the candles of the warmup period before the slice, without triggering the model.
+        - Positions that are still open at the end of a slice are closed with a market order
+          at the open of the first candle after the slice, like at the end of a regular backtest.
+          The next slice does not inherit them, so strategies that hold positions across a boundary differ from a single backtest.
+        - Executions of all slices are renumbered in time order, the wallet is the initial budget plus the sum of the wallet changes of all slices
+          and the model stats of all slices are merged.
+
+    Parameters
+    ----------
+    model: Any
+        function that holds the trading logic, needs to be importable by the worker processes
+    symbols: Dict[str, str]
+        dictionary of relevant symbols for backtesting
+        keys have format binance_ticker.binance_interval and values are coresponding bybit ws topics.
+    account_symbols: List[str]
+        list of symbols to incorporate into account data
+    budget: Dict[str, float]
+        start budget for all tickers as dictionary with key = symbol, value= budget
+    topics: List[str]
+        all topics to store in market data object
+    topic_mapping: Dict[str,str]
+        mapping between bybit websocket topics and binance symbols
+    start_str: str
+        start of simulation in format yyyy-mm-dd hh-mm-ss
+    end_str: str
+        end of simulation in format yyyy-mm-dd hh-mm-ss
+    slice_length: int
+        number of timestamps of frequency freq per slice, see helper_functions.slice_timestamps
+    warmup: str
+        length of the history before every slice that is loaded into market data, e.g. "1D" or "12h". Default is one day
+    freq: str
+        frequency of the timestamps that are sliced. Default is one minute
+    model_args: Dict[str, Any]
+        optional additional parameters for the trading model
+    model_storage: Dict[str, Any]
+        initial model storage, every slice starts with its own copy
+    processes: int
+        number of worker processes. Default is the number of cpus.
+    archive: bool
+        flag whether to read simulation data from the memory mapped candle archive. Default is False
+    save_output: bool
+        flag whether to export the stitched performance report and trade list to excel. Default is False
+
+    Returns
+    -------
+    report: Dict[str, Dict[str, float]]
+        performance report of the entire backtest
+    '''
+    warmup = pd.Timedelta(warmup)
+    windows = load_simulation_windows(
+        symbols=symbols,
+        start_str=str(pd.Timestamp(start_str) - warmup),
+        end_str=end_str,
+        archive=archive)
+    slices = slice_timestamps(start_str=start_str,
+                              end_str=end_str,
+                              freq=freq,
+                              slice_length=slice_length)
+
+    # every slice ends at the start of the next slice, so that the candle closing at the boundary is simulated once
+    slices = [(start, next_start)
+              for (start, _), (next_start, _) in zip(slices, slices[1:])
+             ] + slices[-1:]
+
+    settings = {
+        'model': model,
+        'symbols': symbols,
+        'account_symbols': account_symbols,
+        'budget': budget,
+        'topics': topics,
+        'topic_mapping': topic_mapping,
+        'model_args': model_args,
+        'model_storage': model_storage,
+        'warmup': warmup
+    }
+    results = _map_shared(func=_run_slice,
+                          tasks=list(enumerate(slices)),
+                          windows=windows,
+                          settings=settings,
+                          processes=processes)
+
+    # stitch executions, wallet changes and model stats of all slices into one account
+    stitched, initial_budget = _stitch(results=results, settings=settings)
+    return stitched.create_performance_report(initial_budget=initial_budget,
+                                              start_str=start_str,
+                                              end_str=end_str,
+                                              save_output=save_output)
+
+
+def independent_tickers(topics: List[str],
+                        topic_mapping: Dict[str, str]) -> List[List[str]]:
+    '''
+    Group the tickers of a backtest into groups that can be backtested independently.
+    Every ticker trades its own wallet pair, i.e. the base coin of the ticker and the base currency.
+    Tickers are grouped if they share a base coin, the base currency is shared by all tickers and merged by its changes.
+
+    Parameters
+    ----------
+    topics: List[str]
+        all topics to store in market data object
+    topic_mapping: Dict[str,str]
+        mapping between bybit websocket topics and binance symbols
+
+    Returns
+    -------
+    groups: List[List[str]]
+        sorted tickers of every group, e.g. [["BTCUSDT"], ["ETHUSDT"]]
+    '''
+    groups = {}
+    for ticker in sorted({topic_mapping[topic] for topic in topics}):
+        groups.setdefault(ticker[:-len(BASE_CUR)], []).append(ticker)
+    return list(groups.values())
+
+
+def _stitch(
+    results: List[Tuple[Dict[str, Dict[int, Dict[str, Any]]],
+                        Dict[str, Dict[str, Any]], Dict[str, Any]]],
+    settings: Dict[str, Any],
+    budgets: List[Dict[str,
+                       float]] = None) -> Tuple[BacktestTradingModel, float]:
+    '''
+    Stitch the executions, wallet changes and model stats of several backtests into one account.
+    Executions are renumbered in the order of the results, the wallet is the initial budget plus the sum of all wallet changes.
+    Wallet changes are measured against the start budget of every backtest, which is the budget of the settings unless budgets are given.
+    Model stats of the same timestamp are merged per trade direction.
+    '''
+    stitched = BacktestTradingModel(model=settings['model'],
+                                    http_session=None,
+                                    symbols=settings['account_symbols'],
+                                    budget=copy.deepcopy(settings['budget']),
+                                    topics=settings['topics'],
+                                    topic_mapping=settings['topic_mapping'],
+                                    backtest_symbols=settings['symbols'],
+                                    model_args=settings['model_args'],
+                                    model_storage=copy.deepcopy(
+                                        settings['model_storage']),
+                                    model_stats={})
+    account = stitched.account
+    initial_budget = account.wallet[BASE_CUR]['available_balance']
+
+    for i, (executions, wallet, model_stats) in enumerate(results):
+        budget = budgets[i] if budgets is not None else settings['budget']
+        for symbol, symbol_executions in executions.items():
+            for execution in symbol_executions.values():
+                order_id = len(account.executions[symbol]) + 1
+                account.update_executions(
+                    [dict(execution, order_id=order_id, exec_id=order_id)])
+        for coin, balance in wallet.items():
+            delta = balance['available_balance'] - budget[coin]
+            account.wallet[coin]['available_balance'] += delta
+            account.wallet[coin]['wallet_balance'] += delta
+        # stats are indexed by statistic, timestamp and trade direction, backtests may record the same timestamp
+        for stat, values in model_stats.items():
+            stitched_stat = stitched.model_stats.setdefault(stat, {})
+            for ts, sides in values.items():
+                stitched_stat.setdefault(ts, {}).update(sides)
+
+    return stitched, initial_budget
+
+
+def _group_budget(budget: Dict[str, float], tickers: List[str],
+                  n_groups: int) -> Dict[str, float]:
+    '''
+    Start budget of one group of tickers, see independent_tickers.
+    The group holds the budget of its base coins and an even share of the base currency, which is shared by all groups.
+    '''
+    group_budget = {
+        ticker[:-len(BASE_CUR)]: budget[ticker[:-len(BASE_CUR)]]
+        for ticker in tickers
+    }
+    group_budget[BASE_CUR] = budget[BASE_CUR] / n_groups
+    return group_budget
+
+
+def _run_tickers(
+    run: Tuple[int, List[str]]
+) -> Tuple[Dict[str, Dict[int, Dict[str, Any]]], Dict[str, Dict[str, Any]],
+           Dict[str, Any]]:
+    '''
+    Run the backtest of one group of tickers on the shared simulation data of the worker, see independent_tickers.
+    '''
+    group_id, tickers = run
+    settings = _worker['settings']
+    budget = _group_budget(budget=settings['budget'],
+                           tickers=tickers,
+                           n_groups=settings['groups'])
+    topics = [
+        topic for topic in settings['topics']
+        if settings['topic_mapping'][topic] in tickers
+    ]
+    symbols = {
+        symbol: topic
+        for symbol, topic in settings['symbols'].items()
+        if settings['topic_mapping'][topic] in tickers
+    }
+
+    # models that trade a list of tickers only see the tickers of the group
+    model_args = copy.deepcopy(settings['model_args'])
+    if 'tickers' in model_args:
+        model_args['tickers'] = [
+            ticker for ticker in model_args['tickers'] if ticker in tickers
+        ]
+
+    model = BacktestTradingModel(
+        model=settings['model'],
+        http_session=None,
+        symbols=[
+            coin for coin in settings['account_symbols'] if coin in budget
+        ],
+        budget=budget,
+        topics=topics,
+        topic_mapping={
+            topic: settings['topic_mapping'][topic] for topic in topics
+        },
+        backtest_symbols=symbols,
+        model_args=model_args,
+        model_storage=copy.deepcopy(settings['model_storage']),
+        model_stats={})
+
+    model.run_backtest(
+        symbols=symbols,
+        start_history=settings['start_history'],
+        start_str=settings['start_str'],
+        end_str=settings['end_str'],
+        direct=True,
+        windows={
+            topic: _worker['windows'][topic] for topic in symbols.values()
+        },
+        create_report=False,
+        warmup=settings['warmup'])
+
+    return model.account.executions, model.account.wallet, model.model_stats
+
+
+def run_per_symbol(model: Any,
+                   symbols: Dict[str, str],
+                   account_symbols: List[str],
+                   budget: Dict[str, Any],
+                   topics: List[str],
+                   topic_mapping: Dict[str, str],
+                   start_history: str,
+                   start_str: str,
+                   end_str: str,
+                   model_args: Dict[str, Any] = {},
+                   model_storage: Dict[str, Any] = {},
+                   processes: int = None,
+                   archive: bool = False,
+                   save_output: bool = False,
+                   warmup: bool = False) -> Dict[str, Dict[str, float]]:
+    '''
+    Run the backtest of several tickers with one worker process per group of independent tickers, see independent_tickers,
+    and merge the results into one performance report.
+    The simulation data is loaded once into shared memory, see run_sweep.
+
+    Rules of the merge:
+        - Every group starts with its own copy of the model arguments and model storage.
+          Models that coordinate several tickers, e.g. through model storage or the shared base currency balance, need a single backtest.
+        - The base currency budget is split evenly between the groups, so that all groups together trade with the budget of a single backtest.
+          Models that size positions from the wallet trade with the share of their group.
+        - Executions keep their order ids, since every symbol is traded by one group only.
+        - The wallet is the initial budget plus the sum of the wallet changes of all groups and the model stats of all groups are merged.
+          Returns are reported against the entire initial budget.
+
+    Parameters
+    ----------
+    model: Any
+        function that holds the trading logic, needs to be importable by the worker processes
+    symbols: Dict[str, str]
+        dictionary of relevant symbols for backtesting
+        keys have format binance_ticker.binance_interval and values are coresponding bybit ws topics.
+    account_symbols: List[str]
+        list of symbols to incorporate into account data
+    budget: Dict[str, float]
+        start budget for all tickers as dictionary with key = symbol, value= budget
+    topics: List[str]
+        all topics to store in market data object
+    topic_mapping: Dict[str,str]
+        mapping between bybit websocket topics and binance symbols
+    start_history: str
+        start of historical data to pull for model in format yyyy-mm-dd hh-mm-ss
+    start_str: str
+        start of simulation in format yyyy-mm-dd hh-mm-ss
+    end_str: str
+        end of simulation in format yyyy-mm-dd hh-mm-ss
+    model_args: Dict[str, Any]
+        optional additional parameters for the trading model
+    model_storage: Dict[str, Any]
+        initial model storage, every group starts with its own copy
+    processes: int
+        number of worker processes. Default is the number of cpus.
+    archive: bool
+        flag whether to read simulation data from the memory mapped candle archive. Default is False
+    save_output: bool
+        flag whether to export the merged performance report and trade list to excel. Default is False
+    warmup: bool
+        flag whether every group warms up market data with the history of its tickers from start_history to start_str.
+        The warm-up snapshots are built once before the groups start, see warmup.load_warmup. Default is False
+
+    Returns
+    -------
+    report: Dict[str, Dict[str, float]]
+        performance report of all tickers
+    '''
+    windows = load_simulation_windows(symbols=symbols,
+                                      start_str=start_str,
+                                      end_str=end_str,
+                                      archive=archive)
+    groups = independent_tickers(topics=topics, topic_mapping=topic_mapping)
+
+    settings = {
+        'model': model,
+        'symbols': symbols,
+        'account_symbols': account_symbols,
+        'budget': budget,
+        'topics': topics,
+        'topic_mapping': topic_mapping,
+        'model_args': model_args,
+        'model_storage': model_storage,
+        'start_history': start_history,
+        'start_str': start_str,
+        'end_str': end_str,
+        'warmup': warmup,
+        'groups': len(groups)
+    }
+
+    # build the warm-up snapshots of all groups once, the groups read them
+    if warmup:
+        for tickers in groups:
+            load_warmup(symbols={
+                symbol: topic
+                for symbol, topic in symbols.items()
+                if topic_mapping[topic] in tickers
+            },
+                        start_history=start_history,
+                        start_str=start_str,
+                        fetch=fetch_kline_ranges)
+    results = _map_shared(func=_run_tickers,
+                          tasks=list(enumerate(groups)),
+                          windows=windows,
+                          settings=settings,
+                          processes=processes)
+
+    # the wallet changes of every group are measured against its share of the budget
+    budgets = [
+        _group_budget(budget=budget, tickers=tickers, n_groups=len(groups))
+        for tickers in groups
+    ]
+    stitched, initial_budget = _stitch(results=results,
+                                       settings=settings,
+                                       budgets=budgets)
+    return stitched.create_performance_report(initial_budget=initial_budget,
+                                              start_str=start_str,
+                                              end_str=end_str,
+                                              save_output=save_output)
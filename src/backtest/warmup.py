@@ -0,0 +1,216 @@
+# !/usr/bin/env python
+# coding: utf-8
+
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+
+import os
+import hashlib
+import tempfile
+import pandas as pd
+import numpy as np
+from typing import Any, Callable, Dict, List, Tuple
+from src.endpoints.binance_functions import format_historical_klines
+from src.endpoints.kline_cache import update_klines, KLINE_CACHE_DIR
+from src.backtest.CandleArchive import ARCHIVE_DTYPES
+import yaml
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CONFIG_DIR = os.getenv('CONFIG_DIR')
+
+# Load variables from the YAML file
+with open(CONFIG_DIR, 'r') as file:
+    config = yaml.safe_load(file)
+
+# Access variables from the loaded data
+WARMUP_DIR = config.get('warmup_dir', '.warmup')
+
+# columns of the warm-up history in the order of format_historical_klines
+WARMUP_COLUMNS = [
+    'start', 'open', 'high', 'low', 'close', 'volume', 'end', 'turnover'
+]
+
+
+def warmup_ranges(symbols: Dict[str, str], start_history: str,
+                  start_str: str) -> Dict[str, Tuple[str, str, int, int]]:
+    '''
+    Ranges of the klines before the simulation, i.e. all klines that start at or after start_history and close at or before start_str.
+
+    Parameters
+    ----------
+    symbols: Dict[str, str]
+        dictionary of relevant symbols for backtesting
+        keys have format binance_ticker.binance_interval and values are coresponding bybit ws topics.
+    start_history: str
+        start of the history in format yyyy-mm-dd hh-mm-ss
+    start_str: str
+        start of simulation in format yyyy-mm-dd hh-mm-ss
+
+    Returns
+    -------
+    ranges: Dict[str, Tuple[str, str, int, int]]
+        ticker, interval and inclusive range of kline start timestamps in epoch milliseconds, indexed by symbol, see kline_cache.load_klines
+    '''
+    # without a start the range would reach back to the first kline of every ticker
+    if pd.isna(pd.Timestamp(start_history)):
+        raise ValueError(
+            'Missing start of the warm-up history: {}'.format(start_history))
+    ranges = {}
+    for symbol in symbols:
+        ticker, interval = symbol.split('.')
+        ranges[symbol] = (
+            ticker, interval, int(pd.Timestamp(start_history).value / 1000000),
+            int((pd.Timestamp(start_str) - pd.Timedelta(interval)).value /
+                1000000))
+    return ranges
+
+
+def snapshot_path(ranges: Dict[str, Tuple[str, str, int, int]],
+                  exchange: str = 'bybit',
+                  root: str = WARMUP_DIR) -> str:
+    '''
+    Path of the warm-up snapshot of a set of ranges. Backtests with the same symbols and the same history share the snapshot.
+
+    Parameters
+    ----------
+    ranges: Dict[str, Tuple[str, str, int, int]]
+        ranges of the warm-up history, see warmup_ranges
+    exchange: str
+        exchange the klines are downloaded from
+    root: str
+        root directory of the snapshots
+
+    Returns
+    -------
+    path: str
+        path of the snapshot file
+    '''
+    key = repr(sorted(ranges.items())).encode()
+    return os.path.join(root, exchange,
+                        'warmup_{}.npz'.format(hashlib.sha1(key).hexdigest()))
+
+
+def write_snapshot(path: str, history: Dict[str, pd.DataFrame]):
+    '''
+    Write warm-up history to a snapshot file of uncompressed numpy arrays, one array per topic and column.
+    The file is replaced atomically, so that parallel backtests can read it while it is written.
+
+    Parameters
+    ----------
+    path: str
+        path of the snapshot file
+    history: Dict[str, pandas.DataFrame]
+        warm-up history indexed by topic, see load_warmup
+    '''
+    arrays = {}
+    for topic, data in history.items():
+        for col in WARMUP_COLUMNS:
+            values = data[col] if col in data.columns else pd.Series(
+                [], dtype=ARCHIVE_DTYPES[col])
+            if col in ['start', 'end']:
+                values = pd.to_datetime(values)
+            arrays['{}:{}'.format(
+                topic, col)] = values.to_numpy(dtype=ARCHIVE_DTYPES[col])
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def read_snapshot(path: str, topics: List[str]) -> Dict[str, pd.DataFrame]:
+    '''
+    Read warm-up history from a snapshot file, see write_snapshot.
+
+    Parameters
+    ----------
+    path: str
+        path of the snapshot file
+    topics: List[str]
+        topics to read
+
+    Returns
+    -------
+    history: Dict[str, pandas.DataFrame]
+        warm-up history indexed by topic, in the format of binance_functions.format_historical_klines
+    '''
+    history = {}
+    with np.load(path) as data:
+        for topic in topics:
+            columns = {
+                col: data['{}:{}'.format(topic, col)] for col in WARMUP_COLUMNS
+            }
+            for col in ['start', 'end']:
+                columns[col] = columns[col].view('datetime64[ns]')
+            history[topic] = pd.DataFrame(columns,
+                                          index=pd.DatetimeIndex(columns['end'],
+                                                                 name='end'))
+    return history
+
+
+def load_warmup(symbols: Dict[str, str],
+                start_history: str,
+                start_str: str,
+                fetch: Callable[[Dict[Any, Tuple[str, str, int, int]]],
+                                Dict[Any, List[List[Any]]]],
+                exchange: str = 'bybit',
+                root: str = WARMUP_DIR,
+                cache_dir: str = KLINE_CACHE_DIR) -> Dict[str, pd.DataFrame]:
+    '''
+    Load the history before a backtest to warm up market data, see MarketData.load_history.
+    If a warm-up snapshot of the same symbols and history exists, it is read directly.
+    Otherwise the klines are loaded through the local kline cache, only missing ranges are downloaded and written back to the cache,
+    and a snapshot is written for the next backtest with the same start. No snapshot is written if the history contains klines that are not closed yet.
+
+    Parameters
+    ----------
+    symbols: Dict[str, str]
+        dictionary of relevant symbols for backtesting
+        keys have format binance_ticker.binance_interval and values are coresponding bybit ws topics.
+    start_history: str
+        start of the history in format yyyy-mm-dd hh-mm-ss
+    start_str: str
+        start of simulation in format yyyy-mm-dd hh-mm-ss, the history ends with the last candle that closes at or before it
+    fetch: Callable
+        function that downloads klines of missing ranges, e.g. bybit_functions.fetch_kline_ranges
+    exchange: str
+        exchange the klines are downloaded from
+    root: str
+        root directory of the snapshots
+    cache_dir: str
+        root directory of the kline cache
+
+    Returns
+    -------
+    history: Dict[str, pandas.DataFrame]
+        warm-up history indexed by topic, in the format of binance_functions.format_historical_klines
+    '''
+    ranges = warmup_ranges(symbols=symbols,
+                           start_history=start_history,
+                           start_str=start_str)
+    path = snapshot_path(ranges=ranges, exchange=exchange, root=root)
+    if os.path.exists(path):
+        return read_snapshot(path=path, topics=list(symbols.values()))
+
+    caches, pending = update_klines(ranges=ranges,
+                                    fetch=fetch,
+                                    exchange=exchange,
+                                    cache_dir=cache_dir)
+    history = {}
+    for symbol, (_, _, start_ts, end_ts) in ranges.items():
+        klines = sorted(caches[symbol].read(start_ts, end_ts) +
+                        list(pending[symbol].values()))
+        history[symbols[symbol]] = format_historical_klines(
+            klines).drop_duplicates()
+
+    if not any(pending.values()):
+        write_snapshot(path=path, history=history)
+    return history
@@ -0,0 +1,104 @@
+import sys
+
+sys.path.append('../')
+
+import json
+import time
+import argparse
+from typing import Any, Callable, Dict, List
+from src.endpoints.bybit_functions import format_klines
+from src.endpoints.bybit_decoders import JSON_BACKENDS, decode_message
+
+KLINE_MESSAGE = json.dumps({
+    "topic": "candle.1.BTCUSDT",
+    "data": [{
+        "start": 1667461800,
+        "end": 1667461860,
+        "period": "1",
+        "open": 20282,
+        "close": 20280.5,
+        "high": 20282.5,
+        "low": 20280,
+        "volume": "20.753",
+        "turnover": "420912.939",
+        "confirm": True,
+        "cross_seq": 19909786084,
+        "timestamp": 1667461837466318
+    }],
+    "timestamp_e6": 1667461837466318
+})
+
+EXECUTION_MESSAGE = json.dumps({
+    "topic":
+        "execution",
+    "data": [{
+        "symbol": "BTCUSDT",
+        "side": "Sell",
+        "order_id": "xxxxxxxx-xxxx-xxxx-9a8f-4a973eb5c418",
+        "exec_id": "xxxxxxxx-xxxx-xxxx-8b66-c3d2fcd352f6",
+        "order_link_id": "",
+        "price": 11527.5,
+        "order_qty": 0.001,
+        "exec_type": "Trade",
+        "exec_qty": 0.001,
+        "exec_fee": 0.00864563,
+        "leaves_qty": 0,
+        "is_maker": False,
+        "trade_time": "2020-08-12T21:16:18.142746Z"
+    }]
+})
+
+
+def current_path(message: str) -> Dict[str, Any]:
+    '''
+    Decoding path before the decoder layer: json.loads in TradingModel and MarketData, then format_klines.
+    '''
+    json.loads(message)
+    return format_klines(msg=json.loads(message))
+
+
+def measure(decode: Callable[[str], Any], messages: List[str]) -> float:
+    '''
+    Return decoded messages per second.
+    '''
+    start = time.perf_counter()
+    for message in messages:
+        decode(message)
+    return len(messages) / (time.perf_counter() - start)
+
+
+def main():
+
+    # parse arguments
+    parser = argparse.ArgumentParser(
+        description="Benchmark decode throughput of bybit websocket messages.")
+    parser.add_argument('--n',
+                        type=int,
+                        default=100000,
+                        help="number of messages to decode per run")
+    args = vars(parser.parse_args())
+
+    klines = [KLINE_MESSAGE] * args['n']
+    executions = [EXECUTION_MESSAGE] * args['n']
+
+    baseline = measure(current_path, klines)
+    print('{:<40}{:>15,.0f} msg/s'.format(
+        'kline: json.loads x2 + format_klines', baseline))
+
+    for backend in JSON_BACKENDS:
+        throughput = measure(
+            lambda message: decode_message(message, backend=backend), klines)
+        print('{:<40}{:>15,.0f} msg/s  ({:.1f}x)'.format(
+            'kline: decode_message[{}]'.format(backend), throughput,
+            throughput / baseline))
+
+    for backend in JSON_BACKENDS:
+        throughput = measure(
+            lambda message: decode_message(message, backend=backend),
+            executions)
+        print('{:<40}{:>15,.0f} msg/s'.format(
+            'execution: decode_message[{}]'.format(backend), throughput))
+
+
+if __name__ == "__main__":
+    main()
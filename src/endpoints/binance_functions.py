@@ -7,6 +7,8 @@ from dotenv import load_dotenv
 import os
 import json
 from binance.client import Client
+from binance.helpers import date_to_milliseconds
+from src.endpoints.kline_cache import load_klines
 import yaml
 
 load_dotenv()
@@ -66,6 +68,34 @@ def format_historical_klines(msg: List[List[Any]]) -> pd.DataFrame:
     return df
 
 
+def format_simulation_data(klines: List[List[Any]],
+                           topics: List[str]) -> pd.DataFrame:
+    '''
+    Format historical klines of several topics into simulation data for backtesting.
+
+    Parameters
+    ----------
+    klines: List[List[Any]]
+        historical binance candlesticks
+    topics: List[str]
+        respective bybit topics of the candlesticks
+
+    Returns
+    -------
+    formatted_klines: pandas.DataFrame
+        formatted klines without duplicates, indexed and sorted by end timestamp and topic
+    '''
+    # format klines and add topics
+    formatted_klines = format_historical_klines(klines)
+    formatted_klines['topic'] = topics
+
+    formatted_klines = formatted_klines.reset_index(drop=True).set_index(
+        ['end', 'topic'], drop=False)
+
+    # sort klines by index
+    return formatted_klines.sort_index().drop_duplicates()
+
+
 def binance_to_bybit(klines: List[List[Any]],
                      topics: List[str]) -> Tuple[List[str], pd.DataFrame]:
     '''
@@ -87,15 +117,8 @@ def binance_to_bybit(klines: List[List[Any]],
     # initialize empty list of messages
     messages = []
 
-    # format klines and add topics
-    formatted_klines = format_historical_klines(klines)
-    formatted_klines['topic'] = topics
-
-    formatted_klines = formatted_klines.reset_index(drop=True).set_index(
-        ['end', 'topic'], drop=False)
-
-    # sort klines by index
-    formatted_klines = formatted_klines.sort_index().drop_duplicates()
+    # format and sort klines
+    formatted_klines = format_simulation_data(klines, topics=topics)
 
     # iterate through all lines and format candles
     for idx in formatted_klines.index:
@@ -128,9 +151,12 @@ def binance_to_bybit(klines: List[List[Any]],
     return messages, formatted_klines
 
 
-def create_simulation_data(session: Client, symbols: Dict[str,
-                                                          str], start_str: str,
-                           end_str: str) -> Tuple[List[List[Any]], List[str]]:
+def create_simulation_data(
+        session: Client,
+        symbols: Dict[str, str],
+        start_str: str,
+        end_str: str,
+        cache: bool = True) -> Tuple[List[List[Any]], List[str]]:
     '''
     Create simulation data.
     Pull all relevant candles from binance and add them to a single list.
@@ -148,6 +174,8 @@ def create_simulation_data(session: Client, symbols: Dict[str,
         start of simulation in format yyyy-mm-dd hh-mm-ss
     end_str: str
         end of simulation in format yyyy-mm-dd hh-mm-ss
+    cache: bool
+        if True, candles are loaded through the local kline cache and only missing ranges are downloaded
 
     Returns
     --------
@@ -157,24 +185,46 @@ def create_simulation_data(session: Client, symbols: Dict[str,
     topics: List[str]
         list of respective websocket topics
     '''
-    klines = []
-    topics = []
+
+    def fetch(ranges: Dict[Any, Tuple[Any, ...]]) -> Dict[Any, List[List[Any]]]:
+        nonlocal session
+        bnc_data = {}
+        for key, (ticker, interval, start, end) in ranges.items():
+            while key not in bnc_data:
+                try:
+                    bnc_data[key] = session.get_historical_klines(
+                        ticker, start_str=start, end_str=end, interval=interval)
+                except:
+                    session = Client(api_key=BINANCE_KEY,
+                                     api_secret=BINANCE_SECRET)
+        return bnc_data
+
+    ranges = {}
     for symbol in symbols:
         ticker, interval = symbol.split('.')
 
         # extend data by one interval to close trades in the last timestamp
         actual_end_str = str(pd.Timestamp(end_str) + pd.Timedelta(interval))
 
-        bnc_data = None
-        while bnc_data == None:
-            try:
-                bnc_data = session.get_historical_klines(ticker,
-                                                         start_str=start_str,
-                                                         end_str=actual_end_str,
-                                                         interval=interval)
-            except:
-                session = Client(api_key=BINANCE_KEY, api_secret=BINANCE_SECRET)
-        klines.extend(bnc_data)
-        topics.extend([symbols[symbol]] * len(bnc_data))
+        ranges[symbol] = (ticker, interval, start_str, actual_end_str)
+
+    if cache:
+        # the cache expects ranges in epoch milliseconds
+        ms_ranges = {
+            symbol: (ticker, interval, int(date_to_milliseconds(start)),
+                     int(date_to_milliseconds(end)))
+            for symbol, (ticker, interval, start, end) in ranges.items()
+        }
+        bnc_data = load_klines(ranges=ms_ranges,
+                               fetch=fetch,
+                               exchange='binance')
+    else:
+        bnc_data = fetch(ranges)
+
+    klines = []
+    topics = []
+    for symbol in symbols:
+        klines.extend(bnc_data[symbol])
+        topics.extend([symbols[symbol]] * len(bnc_data[symbol]))
 
     return klines, topics
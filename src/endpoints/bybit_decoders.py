@@ -0,0 +1,389 @@
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+import json
+import time
+import calendar
+from typing import Any, Callable, Dict, List, NamedTuple, Tuple
+
+# json backends, accelerated backends are used if they are installed
+# orjson and msgspec are optional dependencies, the stdlib json module is always available
+JSON_BACKENDS = {'json': json.loads}
+
+try:
+    import orjson
+    JSON_BACKENDS['orjson'] = orjson.loads
+except ImportError:
+    pass
+
+try:
+    import msgspec
+    JSON_BACKENDS['msgspec'] = msgspec.json.decode
+except ImportError:
+    pass
+
+# fastest available backend
+DEFAULT_BACKEND = [
+    backend for backend in ['orjson', 'msgspec', 'json']
+    if backend in JSON_BACKENDS
+][0]
+
+
+def _getitem(self, key: Any) -> Any:
+    if isinstance(key, str):
+        return getattr(self, key)
+    return tuple.__getitem__(self, key)
+
+
+def _get(self, key: str, default: Any = None) -> Any:
+    return getattr(self, key, default)
+
+
+def _keys(self) -> Tuple[str]:
+    return self._fields
+
+
+def record(cls: type) -> type:
+    '''
+    Class decorator for typed records that allows dictionary style access by field name,
+    so that records can be used wherever formatted dictionaries were used before.
+    '''
+    cls.__getitem__ = _getitem
+    cls.get = _get
+    cls.keys = _keys
+    return cls
+
+
+@record
+class Candle(NamedTuple):
+    '''
+    Candlestick of a public kline topic. Timestamps are int64 epoch nanoseconds.
+    '''
+    start: int
+    end: int
+    period: str
+    open: float
+    close: float
+    high: float
+    low: float
+    volume: float
+    turnover: float
+    confirm: bool
+    cross_seq: int
+    timestamp: int
+
+
+@record
+class Position(NamedTuple):
+    '''
+    Position update of the private position topic.
+    '''
+    symbol: str
+    side: str
+    size: float
+    position_value: float
+    entry_price: float
+    liq_price: float
+    leverage: float
+    take_profit: float
+    stop_loss: float
+    realised_pnl: float
+    cum_realised_pnl: float
+    position_idx: int
+
+
+@record
+class Execution(NamedTuple):
+    '''
+    Execution of the private execution topic. trade_time is an int64 epoch in nanoseconds.
+    '''
+    symbol: str
+    side: str
+    order_id: str
+    exec_id: str
+    order_link_id: str
+    price: float
+    order_qty: float
+    exec_type: str
+    exec_qty: float
+    exec_fee: float
+    leaves_qty: float
+    is_maker: bool
+    trade_time: int
+
+
+@record
+class Order(NamedTuple):
+    '''
+    Order update of the private order topic. create_time and update_time are int64 epochs in nanoseconds.
+    '''
+    order_id: str
+    order_link_id: str
+    symbol: str
+    side: str
+    order_type: str
+    price: float
+    qty: float
+    leaves_qty: float
+    last_exec_price: float
+    cum_exec_qty: float
+    cum_exec_value: float
+    cum_exec_fee: float
+    time_in_force: str
+    order_status: str
+    take_profit: float
+    stop_loss: float
+    create_time: int
+    update_time: int
+    reduce_only: bool
+    close_on_trigger: bool
+
+
+@record
+class StopOrder(NamedTuple):
+    '''
+    Stop order update of the private stop_order topic. create_time and update_time are int64 epochs in nanoseconds.
+    '''
+    stop_order_id: str
+    order_link_id: str
+    symbol: str
+    side: str
+    order_type: str
+    price: float
+    qty: float
+    order_status: str
+    stop_order_type: str
+    trigger_price: float
+    take_profit: float
+    stop_loss: float
+    create_time: int
+    update_time: int
+    reduce_only: bool
+    close_on_trigger: bool
+
+
+@record
+class Wallet(NamedTuple):
+    '''
+    Wallet update of the private wallet topic.
+    '''
+    coin: str
+    wallet_balance: float
+    available_balance: float
+
+
+def get_loads(backend: str = None) -> Callable[[Any], Any]:
+    '''
+    Return the json decoding function of a backend.
+
+    Parameters
+    ----------
+    backend: str
+        name of the backend, one of "orjson", "msgspec" or "json". Default is the fastest installed backend.
+
+    Returns
+    -------
+    loads: Callable[[Any], Any]
+        json decoding function
+    '''
+    return JSON_BACKENDS[backend or DEFAULT_BACKEND]
+
+
+def seconds_to_ns(value: Any) -> int:
+    '''
+    Convert an epoch in seconds (int, float or numeric string) to int64 epoch nanoseconds.
+    '''
+    if isinstance(value, int):
+        return value * 1000000000
+    return int(round(float(value) * 1000000000))
+
+
+def iso_to_ns(value: Any) -> int:
+    '''
+    Convert an ISO 8601 UTC timestamp, e.g. "2022-11-03T07:51:00.123456Z", to int64 epoch nanoseconds.
+    Numeric values are interpreted as epoch milliseconds. Missing values are returned as 0.
+    '''
+    if not value:
+        return 0
+    if isinstance(value, (int, float)):
+        return int(value) * 1000000
+    base, _, fraction = value.rstrip('Z').partition('.')
+    seconds = calendar.timegm(time.strptime(base, '%Y-%m-%dT%H:%M:%S'))
+    return seconds * 1000000000 + int((fraction + '000000000')[:9])
+
+
+def _float(value: Any) -> float:
+    '''
+    Convert numeric values and numeric strings to float. Missing values are returned as 0.0.
+    '''
+    if value is None or value == '':
+        return 0.0
+    return float(value)
+
+
+def decode_candle(data: Dict[str, Any]) -> Candle:
+    '''
+    Decode the candlestick payload of a bybit kline message.
+
+    Parameters
+    ----------
+    data: Dict[str, Any]
+        first element of the "data" list of a kline message
+
+    Returns
+    -------
+    candle: Candle
+        typed candle with epoch nanosecond timestamps
+    '''
+    return Candle(start=seconds_to_ns(data['start']),
+                  end=seconds_to_ns(data['end']),
+                  period=str(data.get('period', '')),
+                  open=float(data['open']),
+                  close=float(data['close']),
+                  high=float(data['high']),
+                  low=float(data['low']),
+                  volume=float(data['volume']),
+                  turnover=float(data['turnover']),
+                  confirm=bool(data.get('confirm', True)),
+                  cross_seq=int(data.get('cross_seq', 0)),
+                  timestamp=int(data.get('timestamp', 0)))
+
+
+def decode_position(data: Dict[str, Any]) -> Position:
+    '''
+    Decode a single position of a bybit position message.
+    '''
+    return Position(symbol=data['symbol'],
+                    side=data['side'],
+                    size=_float(data.get('size')),
+                    position_value=_float(data.get('position_value')),
+                    entry_price=_float(data.get('entry_price')),
+                    liq_price=_float(data.get('liq_price')),
+                    leverage=_float(data.get('leverage')),
+                    take_profit=_float(data.get('take_profit')),
+                    stop_loss=_float(data.get('stop_loss')),
+                    realised_pnl=_float(data.get('realised_pnl')),
+                    cum_realised_pnl=_float(data.get('cum_realised_pnl')),
+                    position_idx=int(data.get('position_idx') or 0))
+
+
+def decode_execution(data: Dict[str, Any]) -> Execution:
+    '''
+    Decode a single execution of a bybit execution message.
+    '''
+    return Execution(symbol=data['symbol'],
+                     side=data['side'],
+                     order_id=data.get('order_id'),
+                     exec_id=data.get('exec_id'),
+                     order_link_id=data.get('order_link_id', ''),
+                     price=_float(data.get('price')),
+                     order_qty=_float(data.get('order_qty')),
+                     exec_type=data.get('exec_type', ''),
+                     exec_qty=_float(data.get('exec_qty')),
+                     exec_fee=_float(data.get('exec_fee')),
+                     leaves_qty=_float(data.get('leaves_qty')),
+                     is_maker=bool(data.get('is_maker', False)),
+                     trade_time=iso_to_ns(data.get('trade_time')))
+
+
+def decode_order(data: Dict[str, Any]) -> Order:
+    '''
+    Decode a single order of a bybit order message.
+    '''
+    return Order(order_id=data.get('order_id'),
+                 order_link_id=data.get('order_link_id', ''),
+                 symbol=data['symbol'],
+                 side=data['side'],
+                 order_type=data.get('order_type', ''),
+                 price=_float(data.get('price')),
+                 qty=_float(data.get('qty')),
+                 leaves_qty=_float(data.get('leaves_qty')),
+                 last_exec_price=_float(data.get('last_exec_price')),
+                 cum_exec_qty=_float(data.get('cum_exec_qty')),
+                 cum_exec_value=_float(data.get('cum_exec_value')),
+                 cum_exec_fee=_float(data.get('cum_exec_fee')),
+                 time_in_force=data.get('time_in_force', ''),
+                 order_status=data.get('order_status', ''),
+                 take_profit=_float(data.get('take_profit')),
+                 stop_loss=_float(data.get('stop_loss')),
+                 create_time=iso_to_ns(data.get('create_time')),
+                 update_time=iso_to_ns(data.get('update_time')),
+                 reduce_only=bool(data.get('reduce_only', False)),
+                 close_on_trigger=bool(data.get('close_on_trigger', False)))
+
+
+def decode_stop_order(data: Dict[str, Any]) -> StopOrder:
+    '''
+    Decode a single stop order of a bybit stop_order message.
+    '''
+    return StopOrder(stop_order_id=data.get('stop_order_id'),
+                     order_link_id=data.get('order_link_id', ''),
+                     symbol=data['symbol'],
+                     side=data['side'],
+                     order_type=data.get('order_type', ''),
+                     price=_float(data.get('price')),
+                     qty=_float(data.get('qty')),
+                     order_status=data.get('order_status', ''),
+                     stop_order_type=data.get('stop_order_type', ''),
+                     trigger_price=_float(data.get('trigger_price')),
+                     take_profit=_float(data.get('take_profit')),
+                     stop_loss=_float(data.get('stop_loss')),
+                     create_time=iso_to_ns(data.get('create_time')),
+                     update_time=iso_to_ns(data.get('update_time')),
+                     reduce_only=bool(data.get('reduce_only', False)),
+                     close_on_trigger=bool(data.get('close_on_trigger', False)))
+
+
+def decode_wallet(data: Dict[str, Any]) -> Wallet:
+    '''
+    Decode a single wallet balance of a bybit wallet message. If no coin is propagated, coin is None.
+    '''
+    return Wallet(coin=data.get('coin'),
+                  wallet_balance=_float(data.get('wallet_balance')),
+                  available_balance=_float(data.get('available_balance')))
+
+
+# decoders of private topics, indexed by topic
+PRIVATE_DECODERS = {
+    'position': decode_position,
+    'execution': decode_execution,
+    'order': decode_order,
+    'stop_order': decode_stop_order,
+    'wallet': decode_wallet
+}
+
+
+def decode_message(message: Any,
+                   backend: str = None) -> Tuple[str, List[NamedTuple]]:
+    '''
+    Decode a raw bybit websocket message into its topic and a list of typed records.
+    Kline topics ("candle.<interval>.<symbol>") are decoded to Candle records,
+    private topics to Position, Execution, Order, StopOrder or Wallet records.
+
+    Parameters
+    ----------
+    message: Any
+        raw json message (str or bytes) or already decoded message
+    backend: str
+        json backend to use for raw messages. Default is the fastest installed backend.
+
+    Returns
+    -------
+    topic: str
+        topic of the message, None for operational messages
+    records: List[NamedTuple]
+        decoded records, empty if the topic is unknown
+    '''
+    if isinstance(message, (str, bytes)):
+        message = get_loads(backend)(message)
+
+    topic = message.get('topic')
+    data = message.get('data') or []
+
+    if topic is None:
+        return None, []
+    if topic.startswith('candle.'):
+        return topic, [decode_candle(candle) for candle in data]
+    if topic in PRIVATE_DECODERS:
+        return topic, [PRIVATE_DECODERS[topic](item) for item in data]
+    return topic, []
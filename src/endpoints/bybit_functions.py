@@ -10,8 +10,13 @@ import os
 import itertools
 
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from tqdm import tqdm
 import src.endpoints.bybit_ws as bb
+from src.endpoints.rate_limiter import RateLimiter
+from src.endpoints.kline_cache import load_klines
 import yaml
 
 load_dotenv()
@@ -104,22 +109,9 @@ def get_historical_klines(symbol: str,
             symbol_existed = True
 
         if symbol_existed:
-            # extract data and convert to list
-            # temp_data = [list(i.values())[2:] for i in temp_dict['result']]
-            temp_data = temp_dict['result']['list']
-            # temp_data.sort()
-
-            # format temp_data to fit binance format
-            # add 4 0s in the end
-            list(map(lambda x: x.extend([0, 0, 0, 0]), temp_data))
-
-            # insert end timestamp of candle
-            list(
-                map(
-                    lambda x: x.insert(
-                        6,
-                        int(x[0]) + int(pd.Timedelta(interval).value / 1000000)
-                    ), temp_data))
+            # extract data and format to fit binance format
+            temp_data = format_kline_page(temp_dict=temp_dict,
+                                          interval=interval)
 
             # append this loops data to our output data
             output_data += temp_data
@@ -151,6 +143,179 @@ def get_historical_klines(symbol: str,
     return output_data
 
 
+def format_kline_page(temp_dict: Dict[str, Any],
+                      interval: str) -> List[List[Any]]:
+    '''
+    Format one page of bybit klines to fit the binance format of historical klines.
+
+    Parameters
+    ----------
+    temp_dict: Dict[str, Any]
+        response of the bybit kline endpoint
+    interval: str
+        Bybit Kline interval, e.g. "1m"
+
+    Returns
+    -------
+    temp_data: List[List[Any]]
+        klines with the end timestamp inserted and 4 trailing 0s
+    '''
+    # extract data and convert to list
+    temp_data = temp_dict['result']['list']
+
+    # format temp_data to fit binance format
+    # add 4 0s in the end
+    list(map(lambda x: x.extend([0, 0, 0, 0]), temp_data))
+
+    # insert end timestamp of candle
+    list(
+        map(
+            lambda x: x.insert(
+                6,
+                int(x[0]) + int(pd.Timedelta(interval).value / 1000000)),
+            temp_data))
+
+    return temp_data
+
+
+def get_historical_klines_concurrent(
+        symbols: Dict[str, Tuple[str, str]],
+        start_str: str,
+        end_str: str = None,
+        max_workers: int = 8,
+        calls_per_second: float = 10,
+        progress: bool = True) -> Dict[str, List[List[Any]]]:
+    '''
+    Get historical klines of several symbols and intervals from Bybit concurrently.
+    The requested range of every symbol is split into non-overlapping pages of 200 klines,
+    all pages are fetched in a thread pool that shares one rate budget.
+    The result is identical to calling get_historical_klines for every symbol one after another,
+    since both return every kline that starts within the requested range.
+
+    Parameter
+    ----------
+    symbols: Dict[str, Tuple[str, str]]
+        symbol and Bybit Kline interval, e.g. ("BTCUSDT", "5m"), indexed by an arbitrary key
+    start_str: str
+        Start date string in UTC format
+    end_str: str
+        optional - end date string in UTC format
+    max_workers: int
+        number of concurrent requests
+    calls_per_second: float
+        maximum number of requests per second across all workers
+    progress: bool
+        show a progress bar of the fetched pages
+
+    Return
+    --------
+    output_data: Dict[str, List[List[Any]]]
+        list of OHLCV values of every symbol, indexed by the keys of symbols
+    '''
+    start_ts = int(date_to_milliseconds(start_str))
+    if end_str:
+        end_ts = int(date_to_milliseconds(end_str))
+    else:
+        end_ts = int(date_to_milliseconds('now'))
+
+    ranges = {
+        key: (symbol, interval, start_ts, end_ts)
+        for key, (symbol, interval) in symbols.items()
+    }
+    return fetch_kline_ranges(ranges=ranges,
+                              max_workers=max_workers,
+                              calls_per_second=calls_per_second,
+                              progress=progress)
+
+
+def fetch_kline_ranges(ranges: Dict[Any, Tuple[str, str, int, int]],
+                       max_workers: int = 8,
+                       calls_per_second: float = 10,
+                       progress: bool = True) -> Dict[Any, List[List[Any]]]:
+    '''
+    Fetch klines of several symbol ranges from Bybit concurrently, see get_historical_klines_concurrent.
+
+    Parameter
+    ----------
+    ranges: Dict[Any, Tuple[str, str, int, int]]
+        symbol, Bybit Kline interval and inclusive range of kline start timestamps in epoch milliseconds,
+        e.g. ("BTCUSDT", "5m", 1668988800000, 1669075200000), indexed by an arbitrary key
+    max_workers: int
+        number of concurrent requests
+    calls_per_second: float
+        maximum number of requests per second across all workers
+    progress: bool
+        show a progress bar of the fetched pages
+
+    Return
+    --------
+    output_data: Dict[Any, List[List[Any]]]
+        sorted list of OHLCV values of every range, indexed by the keys of ranges
+    '''
+    limit = 200
+
+    # split every range into non-overlapping pages of at most limit klines, newest page first
+    pages = []
+    for key, (symbol, interval, start_ts, end_ts) in ranges.items():
+        page_ms = limit * int(pd.Timedelta(interval).value / 1000000)
+        page_end = end_ts
+        idx = 0
+        while page_end >= start_ts:
+            pages.append((key, idx, symbol, interval,
+                          max(start_ts, page_end - page_ms + 1), page_end))
+            page_end -= page_ms
+            idx += 1
+
+    # one http session per worker thread
+    local = threading.local()
+    rate_limiter = RateLimiter(calls_per_second=calls_per_second)
+
+    def fetch(page: Tuple[Any, ...]) -> List[List[Any]]:
+        _, _, symbol, interval, page_start, page_end = page
+        if not hasattr(local, 'bybit'):
+            local.bybit = bb.Bybit(api_key=BYBIT_TEST_KEY,
+                                   secret=BYBIT_TEST_SECRET,
+                                   symbol=symbol,
+                                   test=True,
+                                   ws=False)
+
+        # set parameters for kline()
+        if interval[-1] == 'm':
+            timeframe = str(interval[:-1])
+        else:
+            timeframe = str(interval)
+
+        rate_limiter.wait()
+        temp_dict = local.bybit.kline(symbol=symbol,
+                                      interval=timeframe,
+                                      _start=page_start,
+                                      _end=page_end,
+                                      limit=limit)
+        return format_kline_page(temp_dict=temp_dict, interval=interval)
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(fetch, page): page for page in pages}
+        for future in tqdm(as_completed(futures),
+                           total=len(futures),
+                           desc='Load history',
+                           disable=not progress):
+            key, idx = futures[future][:2]
+            results[(key, idx)] = future.result()
+
+    # stitch pages, every page covers a distinct range, so no kline is duplicated
+    output_data = {}
+    for key in ranges:
+        output_data[key] = []
+        idx = 0
+        while (key, idx) in results:
+            output_data[key] += results[(key, idx)]
+            idx += 1
+        output_data[key].sort()
+
+    return output_data
+
+
 def get_historical_klines_pd(symbol: str,
                              interval: str,
                              start_str: str,
@@ -309,8 +474,11 @@ def format_klines(msg: Dict[str, Any]) -> Dict[str, Any]:
     return data
 
 
-def create_simulation_data(symbols: Dict[str, str], start_str: str,
-                           end_str: str) -> Tuple[List[List[Any]], List[str]]:
+def create_simulation_data(
+        symbols: Dict[str, str],
+        start_str: str,
+        end_str: str,
+        cache: bool = True) -> Tuple[List[List[Any]], List[str]]:
     '''
     Create simulation data.
     Pull all relevant candles from bybit and add them to a single list.
@@ -326,6 +494,8 @@ def create_simulation_data(symbols: Dict[str, str], start_str: str,
         start of simulation in format yyyy-mm-dd hh-mm-ss
     end_str: str
         end of simulation in format yyyy-mm-dd hh-mm-ss
+    cache: bool
+        if True, candles are loaded through the local kline cache and only missing ranges are downloaded
 
     Returns
     --------
@@ -335,20 +505,37 @@ def create_simulation_data(symbols: Dict[str, str], start_str: str,
     topics: List[str]
         list of respective websocket topics
     '''
-    klines = []
-    topics = []
+    ranges = {}
+    end_strs = {}
     for symbol in symbols:
         ticker, interval = symbol.split('.')
 
         # extend data by one interval to close trades in the last timestamp
         actual_end_str = str(pd.Timestamp(end_str) + pd.Timedelta(interval))
+        end_strs[symbol] = actual_end_str
+
+        ranges[symbol] = (ticker, interval,
+                          int(date_to_milliseconds(start_str)),
+                          int(date_to_milliseconds(actual_end_str)))
+
+    if cache:
+        bybit_data = load_klines(ranges=ranges,
+                                 fetch=fetch_kline_ranges,
+                                 exchange='bybit')
+    else:
+        bybit_data = {
+            symbol: get_historical_klines(ticker,
+                                          start_str=start_str,
+                                          end_str=end_strs[symbol],
+                                          interval=interval)
+            for symbol, (ticker, interval, _, _) in ranges.items()
+        }
 
-        bybit_data = get_historical_klines(ticker,
-                                           start_str=start_str,
-                                           end_str=actual_end_str,
-                                           interval=interval)
-        klines.extend(bybit_data)
-        topics.extend([symbols[symbol]] * len(bybit_data))
+    klines = []
+    topics = []
+    for symbol in symbols:
+        klines.extend(bybit_data[symbol])
+        topics.extend([symbols[symbol]] * len(bybit_data[symbol]))
 
     return klines, topics
 
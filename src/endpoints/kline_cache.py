@@ -0,0 +1,397 @@
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+import os
+import time
+import tempfile
+import contextlib
+import pandas as pd
+import numpy as np
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+from dotenv import load_dotenv
+import yaml
+
+# file locks are only available on posix systems, concurrent writers are not synchronized otherwise
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+load_dotenv()
+
+CONFIG_DIR = os.getenv('CONFIG_DIR')
+
+# Load variables from the YAML file
+with open(CONFIG_DIR, 'r') as file:
+    config = yaml.safe_load(file)
+
+# Access variables from the loaded data
+HIST_COLUMNS = config.get('hist_columns')
+KLINE_CACHE_DIR = config.get('kline_cache_dir', '.kline_cache')
+
+# integer columns of cached klines, all other columns are stored as float64
+INT_COLUMNS = ['start', 'end']
+
+
+def merge_ranges(ranges: np.ndarray, step: int = 1) -> np.ndarray:
+    '''
+    Merge overlapping and adjacent inclusive ranges.
+
+    Parameters
+    ----------
+    ranges: numpy.ndarray
+        int64 array of shape (n, 2) with inclusive [start, end] ranges
+    step: int
+        distance of adjacent timestamps, e.g. the kline interval in milliseconds
+
+    Returns
+    -------
+    merged: numpy.ndarray
+        sorted, disjoint ranges covering the same timestamps
+    '''
+    merged = []
+    for lo, hi in sorted(ranges.tolist()):
+        if merged and lo <= merged[-1][1] + step:
+            merged[-1][1] = max(merged[-1][1], hi)
+        else:
+            merged.append([lo, hi])
+    return np.array(merged, dtype=np.int64).reshape(-1, 2)
+
+
+@contextlib.contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    '''
+    Exclusive lock of a lock file that serializes writers across processes. Readers never need the lock.
+
+    Parameters
+    ----------
+    path: str
+        path of the lock file, it is created if it does not exist
+    '''
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+class KlineCache:
+    '''
+    Persistent columnar kline cache of one (exchange, symbol, interval).
+    Klines are stored as one numpy array per column together with an index of the covered time ranges,
+    so that only missing gaps need to be downloaded.
+    Files are replaced atomically, so that any number of processes can read the cache while it is extended.
+    '''
+
+    def __init__(self,
+                 exchange: str,
+                 symbol: str,
+                 interval: str,
+                 cache_dir: str = KLINE_CACHE_DIR):
+        '''
+        Parameters
+        ----------
+        exchange: str
+            exchange the klines are downloaded from, e.g. "bybit" or "binance"
+        symbol: str
+            ticker of the klines, e.g. "BTCUSDT"
+        interval: str
+            interval of the klines, e.g. "1m"
+        cache_dir: str
+            root directory of the cache
+
+        Attributes
+        ----------
+        self.path: str
+            path of the cache file
+        self.interval_ms: int
+            interval of the klines in milliseconds
+        '''
+        self.exchange = exchange
+        self.symbol = symbol
+        self.interval = interval
+        self.interval_ms = int(pd.Timedelta(interval).value / 1000000)
+        self.path = os.path.join(cache_dir, exchange,
+                                 '{}_{}.npz'.format(symbol, interval))
+
+    def load(self) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        '''
+        Load the cached klines and the covered ranges.
+
+        Returns
+        -------
+        columns: Dict[str, numpy.ndarray]
+            cached klines sorted by start timestamp, indexed by column (see HIST_COLUMNS)
+        ranges: numpy.ndarray
+            sorted, disjoint inclusive ranges of kline start timestamps in epoch milliseconds that are cached
+        '''
+        if not os.path.exists(self.path):
+            columns = {
+                col: np.empty(0,
+                              dtype=np.int64 if col in INT_COLUMNS else float)
+                for col in HIST_COLUMNS
+            }
+            return columns, np.empty((0, 2), dtype=np.int64)
+
+        with np.load(self.path) as data:
+            columns = {col: data[col] for col in HIST_COLUMNS}
+            ranges = data['ranges']
+        return columns, ranges
+
+    def ranges(self) -> np.ndarray:
+        '''
+        Load only the covered ranges, without reading the cached klines.
+
+        Returns
+        -------
+        ranges: numpy.ndarray
+            sorted, disjoint inclusive ranges of kline start timestamps in epoch milliseconds that are cached
+        '''
+        if not os.path.exists(self.path):
+            return np.empty((0, 2), dtype=np.int64)
+        with np.load(self.path) as data:
+            return data['ranges']
+
+    def load_after(
+            self,
+            after_ts: int = None) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        '''
+        Load the cached klines that start after a timestamp and the covered ranges.
+        Columns are read one at a time and only their tail is kept, so that reading a short tail holds at most one full column in memory.
+
+        Parameters
+        ----------
+        after_ts: int
+            kline start timestamp in epoch milliseconds, only later klines are returned. None for all klines
+
+        Returns
+        -------
+        columns: Dict[str, numpy.ndarray]
+            cached klines sorted by start timestamp, indexed by column (see HIST_COLUMNS)
+        ranges: numpy.ndarray
+            sorted, disjoint inclusive ranges of kline start timestamps in epoch milliseconds that are cached
+        '''
+        if not os.path.exists(self.path):
+            return self.load()
+
+        # the cache file is replaced atomically, so all columns are read from the same version
+        with np.load(self.path) as data:
+            starts = data['start']
+            first = 0 if after_ts is None else int(
+                np.searchsorted(starts, after_ts, side='right'))
+            columns = {'start': starts[first:].copy() if first else starts}
+            del starts
+            for col in HIST_COLUMNS:
+                if col != 'start':
+                    values = data[col]
+                    columns[col] = values[first:].copy() if first else values
+                    del values
+            ranges = data['ranges']
+        return columns, ranges
+
+    def missing(self, start_ts: int, end_ts: int) -> List[Tuple[int, int]]:
+        '''
+        Return the gaps of a requested range that are not cached yet.
+
+        Parameters
+        ----------
+        start_ts: int
+            first kline start timestamp in epoch milliseconds
+        end_ts: int
+            last kline start timestamp in epoch milliseconds
+
+        Returns
+        -------
+        gaps: List[Tuple[int, int]]
+            inclusive ranges of kline start timestamps that need to be downloaded
+        '''
+        ranges = self.ranges()
+
+        gaps = []
+        lo = start_ts
+        for cached_lo, cached_hi in ranges.tolist():
+            if cached_hi < lo:
+                continue
+            if cached_lo > end_ts:
+                break
+            if cached_lo > lo:
+                gaps.append((lo, cached_lo - 1))
+            lo = max(lo, cached_hi + 1)
+        if lo <= end_ts:
+            gaps.append((lo, end_ts))
+
+        # align gaps to kline start timestamps and drop gaps without any kline
+        gaps = [(lo + (-lo) % self.interval_ms, hi - hi % self.interval_ms)
+                for lo, hi in gaps]
+        return [(lo, hi) for lo, hi in gaps if lo <= hi]
+
+    def read(self, start_ts: int, end_ts: int) -> List[List[Any]]:
+        '''
+        Read cached klines with a start timestamp in an inclusive range.
+
+        Returns
+        -------
+        klines: List[List[Any]]
+            klines in the column order of HIST_COLUMNS, sorted by start timestamp
+        '''
+        columns, _ = self.load()
+        first = np.searchsorted(columns['start'], start_ts, side='left')
+        last = np.searchsorted(columns['start'], end_ts, side='right')
+        return [
+            list(row) for row in zip(
+                *[columns[col][first:last].tolist() for col in HIST_COLUMNS])
+        ]
+
+    def _lock(self) -> contextlib.AbstractContextManager:
+        '''
+        Exclusive lock of the cache file for writers. Readers never need the lock.
+        '''
+        return file_lock(self.path + '.lock')
+
+    def write(self, klines: List[List[Any]], start_ts: int, end_ts: int):
+        '''
+        Merge downloaded klines of a range into the cache. Klines that are not closed yet are not cached,
+        and the range is only marked as covered up to the last closed kline.
+
+        Parameters
+        ----------
+        klines: List[List[Any]]
+            downloaded klines in the column order of HIST_COLUMNS
+        start_ts: int
+            first kline start timestamp of the downloaded range in epoch milliseconds
+        end_ts: int
+            last kline start timestamp of the downloaded range in epoch milliseconds
+        '''
+        # start of the last closed kline, later klines may still change
+        now = int(time.time() * 1000)
+        closed_ts = now - now % self.interval_ms - self.interval_ms
+        end_ts = min(end_ts, closed_ts)
+        if end_ts < start_ts:
+            return
+
+        new = pd.DataFrame(klines, columns=HIST_COLUMNS)
+        new = new.apply(pd.to_numeric, errors='coerce')
+        new = new[(new['start'] >= start_ts) & (new['start'] <= end_ts)]
+
+        with self._lock():
+            # reload the cache, another process may have extended it in the meantime
+            columns, ranges = self.load()
+            merged = pd.concat([pd.DataFrame(columns), new])
+            merged = merged.drop_duplicates(subset='start',
+                                            keep='last').sort_values('start')
+
+            arrays = {
+                col: merged[col].to_numpy(
+                    dtype=np.int64 if col in INT_COLUMNS else float)
+                for col in HIST_COLUMNS
+            }
+            ranges = np.vstack([ranges, [[start_ts, end_ts]]])
+            arrays['ranges'] = merge_ranges(ranges, step=self.interval_ms)
+
+            # write to a temporary file and replace the cache atomically
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path),
+                                            suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    np.savez(f, **arrays)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+
+
+def update_klines(
+    ranges: Dict[Any, Tuple[str, str, int, int]],
+    fetch: Callable[[Dict[Any, Tuple[str, str, int, int]]],
+                    Dict[Any, List[List[Any]]]],
+    exchange: str = 'bybit',
+    cache_dir: str = KLINE_CACHE_DIR
+) -> Tuple[Dict[Any, KlineCache], Dict[Any, Dict[int, List[Any]]]]:
+    '''
+    Download all gaps of several symbol ranges that are not cached yet and merge them into the kline cache.
+    See load_klines for the parameters.
+
+    Returns
+    -------
+    caches: Dict[Any, KlineCache]
+        kline cache of every range, indexed by the keys of ranges
+    pending: Dict[Any, Dict[int, List[Any]]]
+        downloaded klines that are not cached, since they are not closed yet, indexed by the keys of ranges and the start timestamp
+    '''
+    caches = {
+        key: KlineCache(exchange=exchange,
+                        symbol=symbol,
+                        interval=interval,
+                        cache_dir=cache_dir)
+        for key, (symbol, interval, _, _) in ranges.items()
+    }
+
+    # download all missing gaps at once
+    gaps = {}
+    for key, (symbol, interval, start_ts, end_ts) in ranges.items():
+        for idx, (lo, hi) in enumerate(caches[key].missing(start_ts, end_ts)):
+            gaps[(key, idx)] = (symbol, interval, lo, hi)
+    downloaded = fetch(gaps) if gaps else {}
+
+    pending = {key: {} for key in ranges}
+    for (key, idx), (_, _, lo, hi) in gaps.items():
+        caches[key].write(downloaded[(key, idx)], lo, hi)
+        for kline in downloaded[(key, idx)]:
+            pending[key][int(kline[0])] = [
+                int(value) if col in INT_COLUMNS else float(value)
+                for col, value in zip(HIST_COLUMNS, kline)
+            ]
+
+    # klines that made it into the cache are not pending
+    for key in ranges:
+        ranges_cached = caches[key].ranges()
+        for start in list(pending[key]):
+            if ((ranges_cached[:, 0] <= start) &
+                (start <= ranges_cached[:, 1])).any():
+                del pending[key][start]
+
+    return caches, pending
+
+
+def load_klines(ranges: Dict[Any, Tuple[str, str, int, int]],
+                fetch: Callable[[Dict[Any, Tuple[str, str, int, int]]],
+                                Dict[Any, List[List[Any]]]],
+                exchange: str = 'bybit',
+                cache_dir: str = KLINE_CACHE_DIR) -> Dict[Any, List[List[Any]]]:
+    '''
+    Load klines of several symbol ranges through the kline cache. Only gaps that are not cached yet are downloaded.
+
+    Parameters
+    ----------
+    ranges: Dict[Any, Tuple[str, str, int, int]]
+        symbol, interval and inclusive range of kline start timestamps in epoch milliseconds,
+        e.g. ("BTCUSDT", "5m", 1668988800000, 1669075200000), indexed by an arbitrary key
+    fetch: Callable
+        function that downloads klines of ranges of the same format and returns sorted klines in the column order of HIST_COLUMNS,
+        indexed by the keys of the ranges, e.g. bybit_functions.fetch_kline_ranges
+    exchange: str
+        exchange the klines are downloaded from
+    cache_dir: str
+        root directory of the cache
+
+    Returns
+    -------
+    klines: Dict[Any, List[List[Any]]]
+        klines of every range sorted by start timestamp, indexed by the keys of ranges.
+        Klines that are not closed yet are included, but not cached.
+    '''
+    caches, pending = update_klines(ranges=ranges,
+                                    fetch=fetch,
+                                    exchange=exchange,
+                                    cache_dir=cache_dir)
+
+    klines = {}
+    for key, (_, _, start_ts, end_ts) in ranges.items():
+        klines[key] = sorted(caches[key].read(start_ts, end_ts) +
+                             list(pending[key].values()))
+
+    return klines
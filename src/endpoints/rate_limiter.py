@@ -0,0 +1,39 @@
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+import time
+import threading
+
+
+class RateLimiter:
+    '''
+    Thread safe rate limiter that spaces out api calls, so that concurrent requests share one rate budget.
+    '''
+
+    def __init__(self, calls_per_second: float = 10):
+        '''
+        Parameters
+        ----------
+        calls_per_second: float
+            maximum number of calls per second across all threads
+
+        Attributes
+        ----------
+        self.interval: float
+            minimum time in seconds between two calls
+        '''
+        self.interval = 1 / calls_per_second
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        '''
+        Block until the next call is allowed and reserve the slot of the call.
+        '''
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now)
+            self._next = slot + self.interval
+
+        if slot > now:
+            time.sleep(slot - now)
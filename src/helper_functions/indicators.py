@@ -0,0 +1,289 @@
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+import re
+import abc
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Tuple
+from src.CandleStore import CandleStore, HISTORY_CAPACITY, to_ns
+
+
+class Indicator(abc.ABC):
+    '''
+    Streaming indicator that is updated in O(1) with every confirmed candle of its topic.
+    Each indicator keeps its own rolling state and a ring buffer of its past values.
+    '''
+
+    def __init__(self,
+                 topic: str,
+                 column: str = None,
+                 capacity: int = HISTORY_CAPACITY):
+        '''
+        Parameters
+        ----------
+        topic: str
+            public topic the indicator is computed on
+        column: str
+            candle column the indicator is computed on. Not needed for range based indicators.
+        capacity: int
+            number of past indicator values to keep
+
+        Attributes
+        ----------
+        self.spec: str
+            specification the indicator was created from, see create_indicator
+        self.value: float
+            latest value of the indicator, numpy.nan until enough candles are available
+        self.history: CandleStore
+            ring buffer of past values, indexed by the close timestamp of the candle
+        '''
+        self.topic = topic
+        self.column = column
+        self.spec = None
+        self.value = np.nan
+        self.history = CandleStore(columns=['end', 'value'], capacity=capacity)
+
+        # close timestamp of the last processed candle to ignore repeated candles
+        self._last_end = None
+
+    def update(self, data: Dict[str, Any]) -> float:
+        '''
+        Update the indicator with a new confirmed candle.
+
+        Parameters
+        ----------
+        data: Dict[str, Any]
+            confirmed candle, either a dictionary or a typed record (see bybit_decoders.Candle)
+
+        Returns
+        -------
+        self.value: float
+            latest value of the indicator
+        '''
+        end = to_ns(data['end'])
+        if self._last_end is not None and end <= self._last_end:
+            return self.value
+        self._last_end = end
+
+        self.value = self._step(data)
+        self.history.append({'end': end, 'value': self.value})
+        return self.value
+
+    @abc.abstractmethod
+    def _step(self, data: Dict[str, Any]) -> float:
+        '''
+        Advance the rolling state by one candle and return the new value.
+        '''
+
+    def values(self) -> np.ndarray:
+        '''
+        Return past values of the indicator as read-only numpy array, oldest value first.
+        '''
+        return self.history.column('value')
+
+    def to_series(self) -> pd.Series:
+        '''
+        Return past values of the indicator as pandas Series, indexed by the close timestamp of the candles.
+        '''
+        return self.history.to_frame()['value']
+
+
+class SMA(Indicator):
+    '''
+    Simple moving average, based on a running sum over a ring buffer of the last window values.
+    Equivalent to statistics.sma.
+    '''
+
+    def __init__(self,
+                 topic: str,
+                 column: str,
+                 window: int,
+                 capacity: int = HISTORY_CAPACITY):
+        super().__init__(topic=topic, column=column, capacity=capacity)
+        self.window = window
+        self._buffer = np.zeros(window)
+        self._count = 0
+        self._sum = 0.0
+
+    def _step(self, data: Dict[str, Any]) -> float:
+        return self._push(float(data[self.column]))
+
+    def _push(self, x: float) -> float:
+        idx = self._count % self.window
+        self._sum += x - self._buffer[idx]
+        self._buffer[idx] = x
+        self._count += 1
+
+        if self._count < self.window:
+            return np.nan
+
+        # recompute the sum once per window to avoid accumulating rounding errors
+        if idx == self.window - 1:
+            self._sum = self._buffer.sum()
+        return self._sum / self.window
+
+
+class EMA(Indicator):
+    '''
+    Exponential moving average with alpha = 2 / (window + 1), seeded with the first value.
+    Equivalent to pandas.Series.ewm(span=window, adjust=False).mean().
+    '''
+
+    def __init__(self,
+                 topic: str,
+                 column: str,
+                 window: int,
+                 capacity: int = HISTORY_CAPACITY):
+        super().__init__(topic=topic, column=column, capacity=capacity)
+        self.window = window
+        self.alpha = 2 / (window + 1)
+
+    def _step(self, data: Dict[str, Any]) -> float:
+        x = float(data[self.column])
+        if np.isnan(self.value):
+            return x
+        return self.value + self.alpha * (x - self.value)
+
+
+class TrueRange(Indicator):
+    '''
+    True range of candles. The first candle uses high - low.
+    Equivalent to statistics.true_range.
+    '''
+
+    def __init__(self,
+                 topic: str,
+                 column: str = None,
+                 capacity: int = HISTORY_CAPACITY):
+        super().__init__(topic=topic, column=column, capacity=capacity)
+        self._prev_close = np.nan
+
+    def _step(self, data: Dict[str, Any]) -> float:
+        return self._true_range(data)
+
+    def _true_range(self, data: Dict[str, Any]) -> float:
+        high = float(data['high'])
+        low = float(data['low'])
+        tr = high - low
+        if not np.isnan(self._prev_close):
+            tr = max(tr, abs(high - self._prev_close),
+                     abs(low - self._prev_close))
+        self._prev_close = float(data['close'])
+        return tr
+
+
+class AvgTrueRange(TrueRange):
+    '''
+    Average true range as rolling mean of the true range.
+    Equivalent to statistics.avg_true_range(statistics.true_range(data), window).
+    '''
+
+    def __init__(self,
+                 topic: str,
+                 window: int,
+                 column: str = None,
+                 capacity: int = HISTORY_CAPACITY):
+        super().__init__(topic=topic, column=column, capacity=capacity)
+        self.window = window
+        self._sma = SMA(topic=topic, column=None, window=window, capacity=1)
+
+    def _step(self, data: Dict[str, Any]) -> float:
+        return self._sma._push(self._true_range(data))
+
+
+class WilderATR(TrueRange):
+    '''
+    Average true range with Wilder smoothing: atr = (atr_prev * (window - 1) + tr) / window,
+    seeded with the mean of the first window true ranges.
+    '''
+
+    def __init__(self,
+                 topic: str,
+                 window: int,
+                 column: str = None,
+                 capacity: int = HISTORY_CAPACITY):
+        super().__init__(topic=topic, column=column, capacity=capacity)
+        self.window = window
+        self._count = 0
+        self._sum = 0.0
+
+    def _step(self, data: Dict[str, Any]) -> float:
+        tr = self._true_range(data)
+        self._count += 1
+
+        if self._count < self.window:
+            self._sum += tr
+            return np.nan
+        if self._count == self.window:
+            return (self._sum + tr) / self.window
+        return (self.value * (self.window - 1) + tr) / self.window
+
+
+# available indicators, indexed by the name used in indicator specifications
+INDICATORS = {
+    'sma': SMA,
+    'ema': EMA,
+    'tr': TrueRange,
+    'atr': AvgTrueRange,
+    'wilder_atr': WilderATR
+}
+
+
+def parse_indicator(spec: str,
+                    topics: List[str]) -> Tuple[str, str, str, List[int]]:
+    '''
+    Parse an indicator specification like "sma(candle.5.BTCUSDT.close, 24)" or "atr(candle.5.BTCUSDT, 14)".
+
+    Parameters
+    ----------
+    spec: str
+        indicator specification of the form name(topic[.column], parameters...)
+    topics: List[str]
+        known public topics, used to split the source into topic and column
+
+    Returns
+    -------
+    name: str
+        name of the indicator
+    topic: str
+        public topic of the indicator
+    column: str
+        candle column of the indicator, None if the source is a topic
+    params: List[int]
+        additional integer parameters, e.g. the window
+    '''
+    match = re.fullmatch(r'\s*(\w+)\s*\((.*)\)\s*', spec)
+    if not match or match.group(1) not in INDICATORS:
+        raise ValueError('Unknown indicator specification: {}'.format(spec))
+
+    args = [arg.strip() for arg in match.group(2).split(',')]
+    source = args[0]
+    if source in topics:
+        topic, column = source, None
+    else:
+        topic, column = source.rsplit('.', 1)
+    if topic not in topics:
+        raise ValueError(
+            'Unknown topic {} in indicator specification: {}'.format(
+                topic, spec))
+
+    return match.group(1), topic, column, [int(arg) for arg in args[1:]]
+
+
+def create_indicator(spec: str,
+                     topics: List[str],
+                     capacity: int = HISTORY_CAPACITY) -> Indicator:
+    '''
+    Create an indicator from its specification, see parse_indicator.
+    '''
+    name, topic, column, params = parse_indicator(spec=spec, topics=topics)
+
+    # the first parameter is the window of the indicator
+    kwargs = {'window': params[0]} if params else {}
+    indicator = INDICATORS[name](topic=topic,
+                                 column=column,
+                                 capacity=capacity,
+                                 **kwargs)
+    indicator.spec = spec
+    return indicator
@@ -0,0 +1,115 @@
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+import pandas as pd
+import numpy as np
+import unittest
+from src.MarketData import MarketData
+from src.CandleAggregator import aggregate_candles, parse_topic, plan_aggregation
+
+TOPICS = [
+    "candle.1.BTCUSDT", "candle.2.BTCUSDT", "candle.3.BTCUSDT",
+    "candle.5.BTCUSDT", "candle.15.BTCUSDT"
+]
+COLUMNS = ['open', 'high', 'low', 'close', 'volume', 'turnover', 'confirm']
+
+
+class TestCandleAggregator(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        close = 20000 + rng.normal(0, 5, 93).cumsum()
+        end = pd.date_range('2022-11-03 07:01:00', periods=93, freq='1min')
+        self.candles = pd.DataFrame(
+            {
+                'start': end - pd.Timedelta('1min'),
+                'end': end,
+                'open': close + rng.normal(0, 2, 93),
+                'close': close,
+                'high': close + rng.uniform(5, 10, 93),
+                'low': close - rng.uniform(5, 10, 93),
+                'volume': rng.uniform(1, 2, 93),
+                'turnover': rng.uniform(1, 2, 93),
+                'confirm': True
+            },
+            index=end)
+
+    def message(self, candle: pd.Series, confirm: bool = True) -> dict:
+        return {
+            'topic':
+                TOPICS[0],
+            'data': [{
+                'start': candle['start'].timestamp(),
+                'end': candle['end'].timestamp(),
+                'period': '1',
+                'open': candle['open'],
+                'close': candle['close'],
+                'high': candle['high'],
+                'low': candle['low'],
+                'volume': candle['volume'],
+                'turnover': candle['turnover'],
+                'confirm': confirm
+            }]
+        }
+
+    def test_plan_aggregation(self):
+        self.assertDictEqual(
+            plan_aggregation(TOPICS + ["candle.4.ETHUSDT", "candle.6.ETHUSDT"]),
+            {TOPICS[0]: TOPICS[1:]})
+
+        # daily, weekly and monthly candles are always received
+        self.assertIsNone(parse_topic("candle.D.BTCUSDT"))
+        self.assertDictEqual(
+            plan_aggregation(TOPICS + ["candle.D.BTCUSDT", "candle.W.BTCUSDT"]),
+            {TOPICS[0]: TOPICS[1:]})
+
+    def test_aggregate_candles(self):
+        candles = aggregate_candles(self.candles, interval=15)
+        self.assertEqual(candles.index[0], pd.Timestamp('2022-11-03 07:15:00'))
+        self.assertEqual(candles.index[-1], pd.Timestamp('2022-11-03 08:45:00'))
+        self.assertListEqual(list(candles['confirm']), [True] * 6 + [False])
+        self.assertAlmostEqual(candles['volume'].iloc[1],
+                               self.candles['volume'].iloc[15:30].sum())
+        self.assertEqual(candles['open'].iloc[1], self.candles['open'].iloc[15])
+        self.assertEqual(candles['close'].iloc[1],
+                         self.candles['close'].iloc[29])
+
+    def test_on_message(self):
+        market_data = MarketData(client=None, topics=TOPICS, synthesize=True)
+        self.assertListEqual(market_data.source_topics, TOPICS[:1])
+
+        for _, candle in self.candles.iterrows():
+            # intra candle updates are applied in place before the candle is confirmed
+            market_data.on_message(self.message(candle, confirm=False))
+            market_data.on_message(self.message(candle))
+
+        for topic in TOPICS[1:]:
+            interval = int(topic.split('.')[1])
+            expected = aggregate_candles(self.candles, interval=interval)
+            pd.testing.assert_frame_equal(market_data.history[topic][COLUMNS],
+                                          expected[COLUMNS],
+                                          check_names=False,
+                                          check_freq=False)
+
+    def test_on_message_after_history(self):
+        market_data = MarketData(client=None, topics=TOPICS, synthesize=True)
+
+        # history ends within a 15 minute bucket, the bucket is completed from the stream
+        market_data.add_history(topic=TOPICS[0], data=self.candles.iloc[:40])
+        for topic in TOPICS[1:]:
+            interval = int(topic.split('.')[1])
+            market_data.add_history(topic=topic,
+                                    data=aggregate_candles(
+                                        self.candles.iloc[:40],
+                                        interval=interval))
+
+        for _, candle in self.candles.iloc[40:].iterrows():
+            market_data.on_message(self.message(candle))
+
+        for topic in TOPICS[1:]:
+            interval = int(topic.split('.')[1])
+            expected = aggregate_candles(self.candles, interval=interval)
+            pd.testing.assert_frame_equal(market_data.history[topic][COLUMNS],
+                                          expected[COLUMNS],
+                                          check_names=False,
+                                          check_freq=False)
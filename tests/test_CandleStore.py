@@ -0,0 +1,124 @@
+# !/usr/bin/env python
+# coding: utf-8
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+import pandas as pd
+import numpy as np
+import unittest
+from src.CandleStore import CandleStore, CandleHistory
+
+PUBLIC_TOPICS = ["candle.1.BTCUSDT"]
+PUBLIC_TOPICS_COLUMNS = [
+    "start", "end", "period", "open", "close", "high", "low", "volume",
+    "turnover", "confirm", "cross_seq", "timestamp"
+]
+
+
+def candle(minute: int, close: float, confirm: bool = True):
+    start = pd.Timestamp('2022-11-03 07:00:00') + pd.Timedelta(minutes=minute)
+    return {
+        "start": start,
+        "end": start + pd.Timedelta(minutes=1),
+        "period": "1",
+        "open": close - 1,
+        "close": close,
+        "high": close + 1,
+        "low": close - 2,
+        "volume": 1.0,
+        "turnover": close,
+        "confirm": confirm,
+        "cross_seq": 19909786084,
+        "timestamp": 1667461837466318
+    }
+
+
+class TestCandleStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store = CandleStore(columns=PUBLIC_TOPICS_COLUMNS, capacity=3)
+
+    def test_append(self):
+        self.store.append(candle(0, 100.0, confirm=False))
+        self.store.append(candle(0, 101.0))
+        self.store.append(candle(1, 102.0))
+
+        self.assertEqual(len(self.store), 2)
+        np.testing.assert_array_equal(self.store.column('close'),
+                                      [101.0, 102.0])
+        self.assertTrue(self.store.last()['confirm'])
+
+    def test_capacity(self):
+        for minute in range(5):
+            self.store.append(candle(minute, 100.0 + minute))
+
+        self.assertEqual(len(self.store), 3)
+        np.testing.assert_array_equal(self.store.column('close'),
+                                      [102.0, 103.0, 104.0])
+        self.assertEqual(self.store.to_frame().index[-1],
+                         pd.Timestamp('2022-11-03 07:05:00'))
+
+    def test_to_frame(self):
+        history = pd.DataFrame([candle(0, 100.0),
+                                candle(1, 101.0)]).set_index('end', drop=False)
+        history.index.name = None
+
+        self.store.append(candle(0, 100.0))
+        self.store.append(candle(1, 101.0))
+        frame = self.store.to_frame()
+
+        pd.testing.assert_frame_equal(frame, history)
+        self.assertIs(frame, self.store.to_frame())
+
+        self.store.update_last(candle(1, 105.0))
+        self.assertEqual(frame['close'].iloc[-1], 101.0)
+        self.assertEqual(self.store.to_frame()['close'].iloc[-1], 105.0)
+
+    def test_load(self):
+        data = pd.DataFrame([
+            candle(minute, 100.0 + minute) for minute in range(4)
+        ]).set_index('end', drop=False)
+        data = data.drop(columns=['confirm', 'period'])
+
+        self.store.load(data)
+        self.store.append(candle(4, 104.0))
+
+        np.testing.assert_array_equal(self.store.column('close'),
+                                      [102.0, 103.0, 104.0])
+        self.assertTrue(self.store.column('confirm').all())
+
+    def test_extend(self):
+        self.store.append(candle(0, 100.0))
+        candles = pd.DataFrame(
+            [candle(minute, 100.0 + minute) for minute in range(1, 5)])
+        columns = {
+            col: candles[col].to_numpy() for col in ['start', 'end', 'close']
+        }
+        columns['end'] = columns['end'].astype('datetime64[ns]').view(np.int64)
+        columns['period'] = '1'
+
+        self.assertEqual(self.store.extend(columns), 4)
+        self.store.append(candle(5, 105.0))
+
+        np.testing.assert_array_equal(self.store.column('close'),
+                                      [103.0, 104.0, 105.0])
+        self.assertEqual(self.store.to_frame().index[0],
+                         pd.Timestamp('2022-11-03 07:04:00'))
+        self.assertListEqual(
+            self.store.column('period').tolist(), ['1', '1', '1'])
+        self.assertTrue(np.isnan(self.store.column('volume')[0]))
+
+
+class TestCandleHistory(unittest.TestCase):
+
+    def test_history(self):
+        history = CandleHistory(topics=PUBLIC_TOPICS,
+                                columns=PUBLIC_TOPICS_COLUMNS)
+        history.stores[PUBLIC_TOPICS[0]].append(candle(0, 100.0))
+
+        data = pd.DataFrame([candle(-1, 99.0)]).set_index('end', drop=False)
+        history[PUBLIC_TOPICS[0]] = pd.concat([data, history[PUBLIC_TOPICS[0]]])
+
+        self.assertListEqual(list(history.keys()), PUBLIC_TOPICS)
+        self.assertListEqual(list(history[PUBLIC_TOPICS[0]]['close']),
+                             [99.0, 100.0])
@@ -7,6 +7,8 @@ import pandas as pd
 import os
 import unittest
 from src.MarketData import MarketData
+from src.Message import Message
+from src.endpoints.bybit_decoders import Candle
 from binance.client import Client
 from dotenv import load_dotenv
 import numpy as np
@@ -51,6 +53,35 @@ class TestMarketData(unittest.TestCase):
             "timestamp_e6": 1667461837466318
         }
 
+        self.success_3 = {
+            "start": pd.Timestamp('2022-11-03 07:51:00'),
+            "end": pd.Timestamp('2022-11-03 07:52:00'),
+            "period": "1",
+            "open": 20280.5,
+            "close": 20281.7,
+            "high": 20283.2,
+            "low": 20279.8,
+            "volume": 21.853,
+            "turnover": 421912.939,
+            "confirm": False,
+            "cross_seq": 19909786084,
+            "timestamp": 1667461837466318
+        }
+
+        # decoded candle of success_message with epoch nanosecond timestamps
+        self.success_record = Candle(start=1667461800000000000,
+                                     end=1667461860000000000,
+                                     period="1",
+                                     open=20282.0,
+                                     close=20280.5,
+                                     high=20282.5,
+                                     low=20280.0,
+                                     volume=20.753,
+                                     turnover=420912.939,
+                                     confirm=False,
+                                     cross_seq=19909786084,
+                                     timestamp=1667461837466318)
+
         self.success_2 = {
             "topic": PUBLIC_TOPICS[0],
             "data": [{
@@ -89,14 +120,26 @@ class TestMarketData(unittest.TestCase):
 
         data_3 = self.market_data.on_message(self.success_message_3)
         history_3 = history_1.copy()
-        history_3.loc[data_3['end']] = data_3
+        history_3.loc[self.success_3['end']] = self.success_3
 
-        self.assertDictEqual(data, self.success['data'][0])
+        self.assertEqual(data, self.success_record)
         self.assertFalse(failure_1)
         self.assertFalse(failure_2)
         pd.testing.assert_frame_equal(
             self.market_data.history[PUBLIC_TOPICS[0]], history_3)
 
+    def test_on_message_envelope(self):
+
+        data = self.market_data.on_message(Message.parse(self.success_message))
+        failure_1 = self.market_data.on_message(
+            Message.parse(self.failure_message_1))
+
+        self.assertEqual(data, self.success_record)
+        self.assertFalse(failure_1)
+        self.assertListEqual(
+            list(self.market_data.history[PUBLIC_TOPICS[0]].index),
+            [pd.Timestamp('2022-11-03 07:51:00')])
+
     def test_add_history(self):
 
         self.market_data.on_message(self.success_message)
@@ -177,26 +220,24 @@ class TestMarketData(unittest.TestCase):
                 pd.Timestamp('2022-11-21 00:02:00'): 2264108.0740263
             },
             'period': {
-                pd.Timestamp('2022-11-21 00:01:00'): np.nan,
-                pd.Timestamp('2022-11-21 00:02:00'): np.nan
+                pd.Timestamp('2022-11-21 00:01:00'): None,
+                pd.Timestamp('2022-11-21 00:02:00'): None
             },
             'confirm': {
-                pd.Timestamp('2022-11-21 00:01:00'): np.nan,
-                pd.Timestamp('2022-11-21 00:02:00'): np.nan
+                pd.Timestamp('2022-11-21 00:01:00'): True,
+                pd.Timestamp('2022-11-21 00:02:00'): True
             },
             'cross_seq': {
-                pd.Timestamp('2022-11-21 00:01:00'): np.nan,
-                pd.Timestamp('2022-11-21 00:02:00'): np.nan
+                pd.Timestamp('2022-11-21 00:01:00'): 0,
+                pd.Timestamp('2022-11-21 00:02:00'): 0
             },
             'timestamp': {
-                pd.Timestamp('2022-11-21 00:01:00'): np.nan,
-                pd.Timestamp('2022-11-21 00:02:00'): np.nan
+                pd.Timestamp('2022-11-21 00:01:00'): 0,
+                pd.Timestamp('2022-11-21 00:02:00'): 0
             }
         })
 
-        history_1m[['period', 'confirm', 'cross_seq',
-                    'timestamp']] = history_1m[[
-                        'period', 'confirm', 'cross_seq', 'timestamp'
-                    ]].astype('object')
+        # candle stores return all public topic columns in config order
+        history_1m = history_1m[PUBLIC_TOPICS_COLUMNS]
         pd.testing.assert_frame_equal(
             history_1m, self.market_data.history['candle.1.BTCUSDT'])
@@ -0,0 +1,48 @@
+# !/usr/bin/env python
+# coding: utf-8
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+import json
+import unittest
+from src.Message import Message
+
+
+class TestMessage(unittest.TestCase):
+
+    def setUp(self):
+        self.body = {
+            "topic": "candle.1.BTCUSDT",
+            "data": [{
+                "start": 1667461800,
+                "end": 1667461860,
+                "confirm": False
+            }],
+            "timestamp_e6": 1667461837466318
+        }
+        self.failure_body = {
+            "success": True,
+            "ret_msg": "",
+            "request": {
+                "op": "subscribe",
+                "args": ["candle.1.BTCUSDT"]
+            }
+        }
+
+    def test_parse(self):
+        msg = Message.parse(json.dumps(self.body))
+
+        self.assertEqual(msg.topic, "candle.1.BTCUSDT")
+        self.assertIsNone(msg.type)
+        self.assertListEqual(msg.data, self.body['data'])
+        self.assertDictEqual(msg.body, self.body)
+
+        # already decoded messages are passed through without copying
+        self.assertIs(Message.parse(msg), msg)
+        self.assertIs(Message.parse(self.body).body, self.body)
+
+    def test_parse_operational(self):
+        msg = Message.parse(json.dumps(self.failure_body))
+
+        self.assertIsNone(msg.topic)
+        self.assertIsNone(msg.data)
@@ -0,0 +1,100 @@
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+import pandas as pd
+import unittest
+from src.ModelCoalescer import ModelCoalescer
+
+TOPICS = [
+    'candle.1.BTCUSDT', 'candle.5.BTCUSDT', 'candle.15.BTCUSDT',
+    'candle.1.ETHUSDT'
+]
+
+
+def candle(end, confirm=True):
+    return {'end': pd.Timestamp(end).value, 'close': 1.0, 'confirm': confirm}
+
+
+class TestModelCoalescer(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0
+        self.coalescer = ModelCoalescer(topics=TOPICS,
+                                        timeout_ms=1000,
+                                        clock=lambda: self.now)
+
+    def test_boundary(self):
+        self.assertSetEqual(
+            self.coalescer.expected('BTCUSDT',
+                                    pd.Timestamp('2022-11-21 00:15').value),
+            {'candle.1.BTCUSDT', 'candle.5.BTCUSDT', 'candle.15.BTCUSDT'})
+
+        # the model is triggered once after all topics of the boundary arrived
+        end = '2022-11-21 00:15'
+        self.assertListEqual(
+            self.coalescer.add('candle.1.BTCUSDT', 'BTCUSDT', candle(end)), [])
+        self.assertListEqual(
+            self.coalescer.add('candle.1.ETHUSDT', 'ETHUSDT', candle(end)),
+            ['ETHUSDT'])
+        self.assertListEqual(
+            self.coalescer.add('candle.15.BTCUSDT', 'BTCUSDT', candle(end)), [])
+        self.assertListEqual(
+            self.coalescer.add('candle.5.BTCUSDT', 'BTCUSDT', candle(end)),
+            ['BTCUSDT'])
+
+        # candles that are not at a boundary trigger the model immediately
+        self.assertListEqual(
+            self.coalescer.add('candle.1.BTCUSDT', 'BTCUSDT',
+                               candle('2022-11-21 00:16')), ['BTCUSDT'])
+
+    def test_missing_topics(self):
+        self.assertListEqual(
+            self.coalescer.add('candle.1.BTCUSDT', 'BTCUSDT',
+                               candle('2022-11-21 00:05')), [])
+
+        # a later candle releases the incomplete boundary
+        self.assertListEqual(
+            self.coalescer.add('candle.1.BTCUSDT', 'BTCUSDT',
+                               candle('2022-11-21 00:06', confirm=False)),
+            ['BTCUSDT', 'BTCUSDT'])
+        self.assertListEqual(
+            self.coalescer.add('candle.1.BTCUSDT', 'BTCUSDT',
+                               candle('2022-11-21 00:10')), [])
+
+        # the timeout releases the incomplete boundary
+        self.now = 999
+        self.assertListEqual(self.coalescer.expire(), [])
+        self.now = 1000
+        self.assertListEqual(self.coalescer.expire(), ['BTCUSDT'])
+        self.assertDictEqual(self.coalescer.pending, {})
+
+        # intra candle updates respect the throttle decision
+        self.assertListEqual(
+            self.coalescer.add('candle.1.BTCUSDT',
+                               'BTCUSDT',
+                               candle('2022-11-21 00:11', confirm=False),
+                               trigger=False), [])
+
+    def test_late_candles(self):
+        end = '2022-11-21 00:05'
+        self.coalescer.add('candle.1.BTCUSDT', 'BTCUSDT', candle(end))
+        self.now = 1000
+        self.assertListEqual(self.coalescer.expire(), ['BTCUSDT'])
+
+        # a late topic of the released boundary triggers the model once without opening a new boundary
+        self.assertListEqual(
+            self.coalescer.add('candle.5.BTCUSDT', 'BTCUSDT', candle(end)),
+            ['BTCUSDT'])
+        self.assertDictEqual(self.coalescer.pending, {})
+
+        # the same holds for boundaries that are released once all topics arrived
+        end = '2022-11-21 00:06'
+        self.assertListEqual(
+            self.coalescer.add('candle.1.BTCUSDT', 'BTCUSDT', candle(end)),
+            ['BTCUSDT'])
+        self.assertListEqual(
+            self.coalescer.add('candle.1.BTCUSDT', 'BTCUSDT', candle(end)),
+            ['BTCUSDT'])
+        self.assertDictEqual(self.coalescer.pending, {})
+        self.assertDictEqual(self.coalescer.released,
+                             {'BTCUSDT': pd.Timestamp(end).value})
@@ -0,0 +1,45 @@
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+import unittest
+from src.ModelThrottle import ModelThrottle
+
+
+class TestModelThrottle(unittest.TestCase):
+
+    def test_interval(self):
+        throttle = ModelThrottle(interval_ms=500)
+        partial = {'close': 100.0, 'confirm': False}
+
+        self.assertTrue(throttle.should_trigger('BTCUSDT', partial, now=0))
+        self.assertFalse(throttle.should_trigger('BTCUSDT', partial, now=499))
+        self.assertTrue(throttle.should_trigger('ETHUSDT', partial, now=499))
+        self.assertTrue(throttle.should_trigger('BTCUSDT', partial, now=500))
+
+        # confirmed candles always trigger the model
+        self.assertTrue(
+            throttle.should_trigger('BTCUSDT', {
+                'close': 100.0,
+                'confirm': True
+            },
+                                    now=501))
+        self.assertFalse(throttle.should_trigger('BTCUSDT', partial, now=600))
+
+    def test_price_threshold(self):
+        throttle = ModelThrottle(price_threshold=0.01)
+
+        self.assertTrue(
+            throttle.should_trigger('BTCUSDT', {
+                'close': 100.0,
+                'confirm': False
+            }))
+        self.assertFalse(
+            throttle.should_trigger('BTCUSDT', {
+                'close': 100.9,
+                'confirm': False
+            }))
+        self.assertTrue(
+            throttle.should_trigger('BTCUSDT', {
+                'close': 98.9,
+                'confirm': False
+            }))
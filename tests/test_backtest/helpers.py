@@ -0,0 +1,23 @@
+import pandas as pd
+
+
+def simulation_klines(step, n):
+    start = int(pd.Timestamp('2022-11-22 00:00:00').value / 1000000)
+    return [[
+        start + i * step,
+        str(16000.5 + i % 7),
+        str(16010.5 + i % 7), '15990.5', '16001.5', '10.5',
+        start + (i + 1) * step, '15.5', 0, 0, 0, 0
+    ] for i in range(n)]
+
+
+def trading_model(model, ticker, stop_loss=None, take_profit=None):
+    # buys every model_args['every'] calls, 20 by default
+    model.model_storage['calls'] += 1
+    if model.model_storage['calls'] % model.model_args.get('every', 20) == 0:
+        model.account.place_order(symbol=ticker,
+                                  side='Buy',
+                                  qty=0.001,
+                                  order_type='Market',
+                                  stop_loss=stop_loss,
+                                  take_profit=take_profit)
@@ -233,3 +233,33 @@ class TestBacktestAccountData(unittest.TestCase):
 
         self.assertEqual(self.account.positions['BTCUSDT']['take_profit'],
                          100000)
+
+    def test_simulation_data_index(self):
+        start = int(self.order_time.value / 1000000)
+        klines = [[
+            start + i * 60000,
+            str(19000.5 + i), '20000.5', '18000.5', '19500.5', '10.5',
+            start + (i + 1) * 60000, '192000.5', 0, 0, 0, 0
+        ] for i in range(100)]
+        topics = len(klines) * ['candle.1.BTCUSDT']
+
+        _, quotes = binance_functions.binance_to_bybit(klines, topics=topics)
+        self.account.simulation_data = quotes
+
+        # attaching simulation data precomputes the sorted arrays for trade pricing
+        window = self.account.windows['candle.1.BTCUSDT']
+        self.assertEqual(len(window), 100)
+        self.assertTrue((window['end'][1:] > window['end'][:-1]).all())
+
+        # orders are filled at the open of the next candle
+        self.account.timestamp = self.order_time + pd.Timedelta(minutes=50)
+        execution = self.account.place_order(symbol='BTCUSDT',
+                                             side='Buy',
+                                             qty=0.01,
+                                             order_type='Market')
+        self.assertEqual(execution['price'], 19050.5)
+        self.assertEqual(execution['trade_time'],
+                         self.order_time + pd.Timedelta(minutes=50))
+
+        self.account.simulation_data = None
+        self.assertIsNone(self.account.windows)
@@ -171,9 +171,15 @@ class TestBacktestMarketData(unittest.TestCase):
                                 response_3]).set_index('end', drop=False)
         history.index.name = None
 
-        self.assertDictEqual(msg_1, response_1)
-        self.assertDictEqual(msg_2, response_2)
-        self.assertDictEqual(msg_3, response_3)
+        # decoded candles carry int64 epoch nanosecond timestamps
+        for msg, response in zip([msg_1, msg_2, msg_3],
+                                 [response_1, response_2, response_3]):
+            self.assertDictEqual(
+                msg._asdict(), {
+                    **response, 'start': response['start'].value,
+                    'end': response['end'].value
+                })
+        self.assertEqual(self.account.timestamp, self.order_time_3)
 
         pd.testing.assert_frame_equal(
             self.market_data.history[PUBLIC_TOPICS[0]], history)
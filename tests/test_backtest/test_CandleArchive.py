@@ -0,0 +1,209 @@
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+import pandas as pd
+import numpy as np
+import unittest
+import unittest.mock
+import tempfile
+import os
+from src.backtest.CandleArchive import CandleArchive, load_windows
+from src.endpoints.kline_cache import KlineCache
+from src.backtest.BacktestAccountData import BacktestAccountData
+from src.backtest.BacktestMarketData import BacktestMarketData
+from src.Message import Message
+
+MINUTE = 60000
+START = int(pd.Timestamp('2022-11-21 00:00:00').value / 1000000)
+
+SYMBOLS = {'BTCUSDT.1m': 'candle.1.BTCUSDT', 'BTCUSDT.5m': 'candle.5.BTCUSDT'}
+
+
+class TestCandleArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        self.requests = []
+
+    def tearDown(self):
+        self.root.cleanup()
+
+    def fetch(self, ranges):
+        self.requests.append(ranges)
+        klines = {}
+        for key, (_, interval, start_ts, end_ts) in ranges.items():
+            step = int(pd.Timedelta(interval).value / 1000000)
+            first = start_ts + (-start_ts) % step
+            klines[key] = [[
+                str(ts),
+                str((ts - START) / MINUTE), '2', '0.5', '1.5', '10',
+                str(ts + step), '15', 0, 0, 0, 0
+            ] for ts in range(first, end_ts + 1, step)]
+        return klines
+
+    def load(self,
+             start_str='2022-11-21 00:00:00',
+             end_str='2022-11-21 01:00:00'):
+        return load_windows(symbols=SYMBOLS,
+                            start_str=start_str,
+                            end_str=end_str,
+                            fetch=self.fetch,
+                            root=self.root.name,
+                            cache_dir=self.root.name)
+
+    def archive(self):
+        return CandleArchive(symbol='BTCUSDT',
+                             interval='1m',
+                             root=os.path.join(self.root.name, 'bybit'))
+
+    def test_slice(self):
+        archive = CandleArchive(symbol='BTCUSDT',
+                                interval='1m',
+                                root=self.root.name)
+        self.assertEqual(len(archive), 0)
+
+        starts = np.arange(100, dtype=np.int64) * MINUTE * 1000000
+        archive.write({
+            'start': starts,
+            'end': starts + MINUTE * 1000000,
+            'open': np.arange(100.0),
+            'high': np.arange(100.0),
+            'low': np.arange(100.0),
+            'close': np.arange(100.0),
+            'volume': np.ones(100),
+            'turnover': np.ones(100)
+        })
+
+        archive = CandleArchive(symbol='BTCUSDT',
+                                interval='1m',
+                                root=self.root.name)
+        self.assertIsInstance(archive.columns['open'], np.memmap)
+
+        window = archive.slice(starts[10], starts[19])
+        self.assertEqual(len(window), 10)
+        np.testing.assert_array_equal(window['open'], np.arange(10.0, 20.0))
+
+        # windows are views into the memory map
+        self.assertTrue(
+            np.shares_memory(window['open'], archive.columns['open']))
+
+        self.assertEqual(window.index_after(starts[10]), 0)
+        self.assertEqual(window.index_after(starts[11]), 1)
+        self.assertEqual(window.index_after(starts[99]), 10)
+
+    def test_load_windows(self):
+        windows = self.load()
+        self.assertSetEqual(set(windows), set(SYMBOLS.values()))
+
+        # data is extended by one interval like create_simulation_data
+        window = windows['candle.1.BTCUSDT']
+        self.assertEqual(len(window), 62)
+        self.assertEqual(window['start'][0],
+                         pd.Timestamp('2022-11-21 00:00:00').value)
+        self.assertEqual(len(windows['candle.5.BTCUSDT']), 14)
+
+        # archived klines are neither downloaded nor exported again
+        windows = self.load()
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(len(windows['candle.1.BTCUSDT']), 62)
+
+    def test_append(self):
+        self.load()
+        before = self.archive()
+        self.assertEqual(len(before), 62)
+
+        # bytes of an interrupted append are not published and are dropped by the next append
+        with open(os.path.join(before.path, before.version, 'open.bin'),
+                  'ab') as f:
+            f.write(b'\0' * 24)
+        self.assertEqual(len(self.archive()), 62)
+
+        # a later range is appended to the current version without reading the whole kline cache
+        with unittest.mock.patch.object(CandleArchive,
+                                        'export',
+                                        return_value=False):
+            self.load(start_str='2022-11-21 01:00:00',
+                      end_str='2022-11-21 02:00:00')
+        with unittest.mock.patch.object(KlineCache,
+                                        'load',
+                                        side_effect=AssertionError):
+            window = self.load(
+                start_str='2022-11-21 01:00:00',
+                end_str='2022-11-21 02:00:00')['candle.1.BTCUSDT']
+        after = self.archive()
+        self.assertEqual(after.version, before.version)
+        self.assertEqual(len(after), 122)
+        np.testing.assert_array_equal(after.columns['open'], np.arange(122.0))
+        self.assertListEqual(after.ranges.tolist(),
+                             [[START, START + 121 * MINUTE]])
+        self.assertEqual(window['start'][0],
+                         pd.Timestamp('2022-11-21 01:00:00').value)
+
+        # archives that were opened before keep reading their candles
+        self.assertEqual(len(before), 62)
+        np.testing.assert_array_equal(before.columns['open'], np.arange(62.0))
+
+    def test_rebuild(self):
+        self.load()
+        before = self.archive()
+
+        # an earlier range is rebuilt into a new version that is published at once
+        self.load(start_str='2022-11-20 23:00:00',
+                  end_str='2022-11-20 23:30:00')
+        after = self.archive()
+        self.assertNotEqual(after.version, before.version)
+        self.assertEqual(len(after), 62 + 32)
+        self.assertTrue((np.diff(after.columns['start']) > 0).all())
+        self.assertListEqual(after.ranges.tolist(),
+                             [[START - 60 * MINUTE, START - 29 * MINUTE],
+                              [START, START + 61 * MINUTE]])
+        np.testing.assert_array_equal(before.columns['open'], np.arange(62.0))
+
+        # versions before the previous one are removed
+        self.load(start_str='2022-11-20 22:00:00',
+                  end_str='2022-11-20 22:10:00')
+        self.assertListEqual(
+            sorted(name for name in os.listdir(after.path)
+                   if name.startswith('v')),
+            [after.version, self.archive().version])
+
+    def test_candle_messages(self):
+        windows = self.load()
+        market_data = BacktestMarketData(account=None,
+                                         client=None,
+                                         topics=list(SYMBOLS.values()),
+                                         toppic_mapping={})
+        market_data.windows = windows
+
+        messages = [Message.parse(msg) for msg in market_data.candle_messages()]
+        self.assertEqual(len(messages), 76)
+
+        ends = [msg.data[0]['end'] for msg in messages]
+        self.assertListEqual(ends, sorted(ends))
+
+        # the one minute candle closing with a five minute candle comes first
+        self.assertEqual(messages[4].topic, 'candle.1.BTCUSDT')
+        self.assertEqual(messages[5].topic, 'candle.5.BTCUSDT')
+        self.assertEqual(messages[4].data[0]['end'], messages[5].data[0]['end'])
+
+    def test_place_order(self):
+        account = BacktestAccountData(symbols=['BTC', 'USDT'],
+                                      budget={
+                                          'USDT': 1000,
+                                          'BTC': 0
+                                      })
+        account.windows = self.load()
+        account.timestamp = pd.Timestamp('2022-11-21 00:10:00')
+        account.place_order(symbol='BTCUSDT',
+                            side='Buy',
+                            qty=0.01,
+                            order_type='Market')
+
+        execution = account.executions['BTCUSDT'][1]
+        self.assertEqual(execution['price'], 10.0)
+        self.assertEqual(execution['trade_time'],
+                         pd.Timestamp('2022-11-21 00:10:00'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+import pandas as pd
+import numpy as np
+import pickle
+import unittest
+from src.backtest.EquityCurve import EquityCurve
+
+END = pd.Timestamp('2022-11-22 00:00:00').value + 60000000000 * np.arange(8)
+EQUITY = np.array([1000., 1010., 990., 1005., 1020., 970., 980., 1030.])
+EXPOSURE = np.array([0., 16., 16., 16., 0., 32., 32., 0.])
+
+
+class TestEquityCurve(unittest.TestCase):
+
+    def setUp(self):
+        self.curve = EquityCurve(capacity=2)
+        for end, equity, exposure in zip(END, EQUITY, EXPOSURE):
+            self.curve.record(int(end), float(equity), float(exposure))
+
+    def test_record(self):
+        # risk metrics are updated with every point
+        self.assertEqual(len(self.curve), 8)
+        self.assertDictEqual(
+            self.curve.summary(), {
+                'final_equity': 1030.,
+                'peak_equity': 1030.,
+                'max_drawdown': 50.,
+                'max_drawdown_percent': 50. / 1020.,
+                'max_exposure': 32.
+            })
+        self.assertIsNone(EquityCurve().summary()['final_equity'])
+
+        frame = self.curve.to_frame()
+        self.assertListEqual(list(frame.index), list(pd.to_datetime(END)))
+        self.assertListEqual(list(frame['drawdown']),
+                             [0., 0., 20., 5., 0., 50., 40., 0.])
+        self.assertListEqual(list(frame['max_drawdown']),
+                             [0., 0., 20., 20., 20., 50., 50., 50.])
+        self.assertAlmostEqual(frame['drawdown_percent'].max(),
+                               self.curve.max_drawdown_percent)
+
+    def test_extend(self):
+        # blocks of points give the same curve as single points
+        curve = EquityCurve(capacity=1)
+        curve.record(int(END[0]), EQUITY[0], EXPOSURE[0])
+        curve.extend(END[1:3], EQUITY[1:3], EXPOSURE[1:3])
+        curve.extend(END[3:3], EQUITY[3:3], EXPOSURE[3:3])
+        curve.extend(END[3:], EQUITY[3:], EXPOSURE[3:])
+        pd.testing.assert_frame_equal(curve.to_frame(), self.curve.to_frame())
+        self.assertDictEqual(curve.summary(), self.curve.summary())
+
+    def test_pickle(self):
+        curve = pickle.loads(pickle.dumps(self.curve))
+        self.assertEqual(len(curve._end), 8)
+        pd.testing.assert_frame_equal(curve.to_frame(), self.curve.to_frame())
+        curve.record(int(END[-1]) + 60000000000, 1000., 0.)
+        self.assertEqual(curve.max_drawdown, 50.)
+        self.assertEqual(len(curve), 9)
@@ -0,0 +1,98 @@
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+import pandas as pd
+import json
+import pickle
+import unittest
+from src.backtest.BacktestAccountData import BacktestAccountData
+from src.backtest.ExecutionLog import ExecutionLog
+
+
+def execution(order_id, side='BUY', open=True):
+    return {
+        "symbol":
+            "BTCUSDT",
+        "side":
+            side,
+        "open":
+            open,
+        "order_id":
+            order_id,
+        "exec_id":
+            order_id,
+        "price":
+            16000.5 + order_id,
+        "order_qty":
+            0.001,
+        "exec_type":
+            "Trade",
+        "exec_qty":
+            0.001,
+        "exec_fee":
+            1.37,
+        "trade_time":
+            pd.Timestamp('2022-11-22 00:00:00') + pd.Timedelta(minutes=order_id)
+    }
+
+
+class TestExecutionLog(unittest.TestCase):
+
+    def setUp(self):
+        self.log = ExecutionLog(symbol='BTCUSDT', capacity=2)
+        self.executions = {
+            i: execution(i, side='BUY' if i % 2 else 'SELL', open=bool(i % 2))
+            for i in range(1, 6)
+        }
+        for order_id, exe in self.executions.items():
+            self.log[order_id] = exe
+
+    def test_view(self):
+        # the log reads like a dictionary of executions indexed by order id
+        self.assertEqual(len(self.log), 5)
+        self.assertListEqual(list(self.log.keys()), [1, 2, 3, 4, 5])
+        self.assertDictEqual(self.log[3], self.executions[3])
+        self.assertEqual(self.log, self.executions)
+        self.assertNotIn(6, self.log)
+        self.assertIsNone(self.log.get(6))
+        self.assertEqual(self.log.records['price'].tolist(),
+                         [exe['price'] for exe in self.executions.values()])
+
+        # executions are append-only
+        with self.assertRaises(KeyError):
+            self.log[3] = execution(3)
+        self.log[6] = execution(6)
+        self.assertEqual(self.log[6]['trade_time'],
+                         pd.Timestamp('2022-11-22 00:06:00'))
+
+    def test_to_frame(self):
+        expected = pd.DataFrame(self.executions).transpose()
+        frame = self.log.to_frame()
+        self.assertListEqual(list(frame.columns), list(expected.columns))
+        pd.testing.assert_frame_equal(frame,
+                                      expected,
+                                      check_dtype=False,
+                                      check_index_type=False)
+
+    def test_pickle(self):
+        log = pickle.loads(pickle.dumps(self.log))
+        self.assertEqual(log, self.log)
+        log[6] = execution(6)
+        self.assertEqual(len(log), 6)
+
+    def test_account(self):
+        account = BacktestAccountData(symbols=['BTC', 'USDT'],
+                                      budget={
+                                          'USDT': 1000,
+                                          'BTC': 0
+                                      })
+        account.update_executions(list(self.executions.values()))
+
+        # models read plain dictionaries of executions like in live trading, the log mirrors them
+        executions = account.executions['BTCUSDT']
+        self.assertIs(type(executions), dict)
+        self.assertDictEqual(executions, self.executions)
+        self.assertEqual(account.execution_log['BTCUSDT'], self.log)
+        self.assertEqual(
+            pd.DataFrame(executions).transpose().shape, (5, len(execution(1))))
+        json.dumps(executions, default=str)
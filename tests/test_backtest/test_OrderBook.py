@@ -0,0 +1,208 @@
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+import pandas as pd
+import numpy as np
+import pickle
+import unittest
+from src.backtest.BacktestAccountData import BacktestAccountData
+from src.backtest.CandleArchive import CandleWindow
+from src.backtest.OrderBook import OrderBook
+from src.endpoints.bybit_decoders import Candle
+
+MINUTE = 60 * 1000000000
+START = pd.Timestamp('2022-11-21 00:00:00').value
+
+# open, high, low, close of consecutive one minute candles
+PRICES = [(100, 101, 99, 100), (100, 102, 98, 101), (101, 106, 100, 105),
+          (103, 104, 95, 96), (96, 97, 90, 91), (91, 92, 89, 90)]
+
+
+def candle(i):
+    open_, high, low, close = PRICES[i]
+    return Candle(start=START + i * MINUTE,
+                  end=START + (i + 1) * MINUTE,
+                  period='1',
+                  open=open_,
+                  close=close,
+                  high=high,
+                  low=low,
+                  volume=1.0,
+                  turnover=1.0,
+                  confirm=True,
+                  cross_seq=0,
+                  timestamp=START + (i + 1) * MINUTE)
+
+
+class TestOrderBook(unittest.TestCase):
+
+    def test_trigger(self):
+        book = OrderBook()
+        book.add(order_id='sell_limit', price=105, rising=True)
+        book.add(order_id='buy_stop', price=102, rising=True)
+        book.add(order_id='buy_limit', price=95, rising=False)
+        book.add(order_id='sell_stop', price=99, rising=False)
+        self.assertEqual(len(book), 4)
+
+        # only orders inside the range of the candle are triggered, in the order of placement
+        self.assertListEqual(book.trigger(high=103, low=99),
+                             [('buy_stop', True), ('sell_stop', False)])
+        self.assertListEqual(book.trigger(high=103, low=99), [])
+        self.assertTrue(book.remove('buy_limit'))
+        self.assertFalse(book.remove('buy_limit'))
+        self.assertListEqual(book.trigger(high=110, low=90),
+                             [('sell_limit', True)])
+        self.assertFalse(book)
+
+    def test_pickle(self):
+        book = OrderBook()
+        book.add(order_id='buy_stop', price=102, rising=True)
+        book.add(order_id='sell_limit', price=102, rising=True)
+
+        # a restored book keeps the order of placement of equal prices
+        book = pickle.loads(pickle.dumps(book))
+        book.add(order_id='buy_limit', price=102, rising=True)
+        self.assertListEqual(book.trigger(high=103, low=101),
+                             [('buy_stop', True), ('sell_limit', True),
+                              ('buy_limit', True)])
+
+
+class TestOrderMatching(unittest.TestCase):
+
+    def setUp(self):
+        self.account = BacktestAccountData(symbols=['BTC', 'USDT'],
+                                           budget={
+                                               'USDT': 1000,
+                                               'BTC': 0
+                                           })
+        columns = {
+            col: np.array([p[i] for p in PRICES], dtype=np.float64)
+            for i, col in enumerate(['open', 'high', 'low', 'close'])
+        }
+        columns['start'] = START + np.arange(len(PRICES),
+                                             dtype=np.int64) * MINUTE
+        columns['end'] = columns['start'] + MINUTE
+        columns['volume'] = np.ones(len(PRICES))
+        columns['turnover'] = np.ones(len(PRICES))
+        self.account.windows = {
+            'candle.1.BTCUSDT': CandleWindow('candle.1.BTCUSDT', columns)
+        }
+        self.account.timestamp = pd.Timestamp(START + MINUTE)
+
+    def simulate(self, first, last):
+        for i in range(first, last):
+            self.account.timestamp = pd.Timestamp(START + (i + 1) * MINUTE)
+            self.account.new_market_data(topic='BTCUSDT', data=candle(i))
+
+    def test_limit_order(self):
+        order = self.account.place_order(symbol='BTCUSDT',
+                                         order_type='Limit',
+                                         side='Buy',
+                                         qty=1,
+                                         price=97,
+                                         time_in_force='GoodTillCancel',
+                                         stop_distance=10)
+        self.assertEqual(order['order_status'], 'New')
+        self.assertFalse(self.account.executions['BTCUSDT'])
+
+        # the limit price is reached in the fourth candle
+        self.simulate(1, 4)
+        order = self.account.orders['BTCUSDT'][order['order_id']]
+        execution = self.account.executions['BTCUSDT'][1]
+        self.assertEqual(order['order_status'], 'Filled')
+        self.assertEqual(order['cum_exec_qty'], 1)
+        self.assertEqual(execution['price'], 97)
+        self.assertEqual(execution['trade_time'],
+                         pd.Timestamp(START + 4 * MINUTE))
+        self.assertEqual(self.account.positions['BTCUSDT']['size'], 1)
+        self.assertEqual(self.account.positions['BTCUSDT']['stop_loss'], 87)
+        self.assertFalse(self.account.order_books['BTCUSDT'])
+
+    def test_marketable_and_cancelled_limit_orders(self):
+        # marketable limit orders are executed at the next open
+        self.account.place_order(symbol='BTCUSDT',
+                                 order_type='Limit',
+                                 side='Buy',
+                                 qty=1,
+                                 price=105)
+        self.assertEqual(self.account.executions['BTCUSDT'][1]['price'], 100)
+
+        # fill or kill orders that are not marketable are cancelled
+        order = self.account.place_order(symbol='BTCUSDT',
+                                         order_type='Limit',
+                                         side='Sell',
+                                         qty=1,
+                                         price=105)
+        self.assertEqual(order['order_status'], 'Cancelled')
+
+        order = self.account.place_order(symbol='BTCUSDT',
+                                         order_type='Limit',
+                                         side='Sell',
+                                         qty=1,
+                                         price=105,
+                                         time_in_force='GoodTillCancel')
+        self.assertEqual(
+            self.account.cancel_order(
+                symbol='BTCUSDT', order_id=order['order_id'])['order_status'],
+            'Cancelled')
+        self.simulate(1, 6)
+        self.assertEqual(len(self.account.executions['BTCUSDT']), 1)
+
+    def test_conditional_order(self):
+        self.account.place_order(symbol='BTCUSDT',
+                                 order_type='Market',
+                                 side='Buy',
+                                 qty=1)
+
+        # a reduce only sell stop below the market
+        stop_order = self.account.place_conditional_order(symbol='BTCUSDT',
+                                                          order_type='Market',
+                                                          side='Sell',
+                                                          qty=1,
+                                                          stop_px=97,
+                                                          reduce_only=True)
+        # a buy stop limit that triggers in the same candle and rests afterwards
+        stop_limit = self.account.place_conditional_order(
+            symbol='BTCUSDT',
+            order_type='Limit',
+            side='Buy',
+            qty=1,
+            price=101,
+            stop_px=103,
+            time_in_force='GoodTillCancel')
+
+        self.simulate(1, 3)
+        self.assertEqual(
+            self.account.stop_orders['BTCUSDT'][stop_limit['stop_order_id']]
+            ['order_status'], 'Triggered')
+        self.assertEqual(
+            self.account.stop_orders['BTCUSDT'][stop_order['stop_order_id']]
+            ['order_status'], 'Untriggered')
+        self.assertEqual(self.account.orders['BTCUSDT'][1]['order_status'],
+                         'New')
+
+        # the sell stop closes the position, the resting buy limit opens a new one
+        self.simulate(3, 4)
+        executions = self.account.executions['BTCUSDT']
+        self.assertEqual(executions[2]['side'], 'SELL')
+        self.assertEqual(executions[2]['price'], 97)
+        self.assertEqual(executions[3]['side'], 'BUY')
+        self.assertEqual(executions[3]['price'], 101)
+        self.assertEqual(self.account.orders['BTCUSDT'][2]['order_status'],
+                         'Filled')
+        self.assertEqual(self.account.positions['BTCUSDT']['size'], 1)
+
+        # conditional orders that are cancelled never trigger
+        stop_order = self.account.place_conditional_order(symbol='BTCUSDT',
+                                                          order_type='Market',
+                                                          side='Sell',
+                                                          qty=1,
+                                                          stop_px=91,
+                                                          base_price=96)
+        self.assertEqual(
+            self.account.cancel_conditional_order(
+                symbol='BTCUSDT',
+                stop_order_id=stop_order['stop_order_id'])['order_status'],
+            'Deactivated')
+        self.simulate(4, 6)
+        self.assertEqual(len(self.account.executions['BTCUSDT']), 3)
@@ -0,0 +1,54 @@
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+import numpy as np
+import unittest
+import unittest.mock
+from src.backtest.PhaseTimer import PhaseTimer
+
+
+class TestPhaseTimer(unittest.TestCase):
+
+    def test_laps(self):
+        clock = iter([0, 1000, 1500, 3500, 4000, 104000])
+        with unittest.mock.patch('src.backtest.PhaseTimer.perf_counter_ns',
+                                 lambda: next(clock)):
+            timer = PhaseTimer()
+            self.assertEqual(timer.lap('market_data'), 1000)
+            self.assertEqual(timer.latency('model'), 500)
+            timer.lap('market_data')
+            timer.latency('model')
+            timer.latency('model')
+
+        # laps are exclusive and summed per phase
+        report = timer.report()
+        self.assertListEqual(list(report.index), ['market_data', 'model'])
+        self.assertListEqual(list(report['calls']), [2, 3])
+        self.assertAlmostEqual(report.loc['market_data', 'wall_s'], 3e-6)
+        self.assertAlmostEqual(report.loc['model', 'wall_per_call_us'], 101 / 3)
+        self.assertTrue(report['cpu_s'].isna().all())
+
+        # calls are counted in power of two buckets
+        histogram = timer.histogram('model')
+        self.assertListEqual(list(histogram.index),
+                             list(2.0**np.arange(9, 18) / 1e3))
+        self.assertEqual(histogram[0.512], 2)
+        self.assertEqual(histogram[131.072], 1)
+        self.assertEqual(histogram.sum(), 3)
+        self.assertTrue(timer.histogram('market_data').empty)
+
+    def test_phase(self):
+        timer = PhaseTimer()
+        for _ in range(2):
+            with timer.phase('format'):
+                sum(range(10000))
+        with self.assertRaises(ValueError):
+            with timer.phase('report'):
+                raise ValueError
+
+        # coarse phases are timed with wall and cpu time, also if they fail
+        report = timer.report()
+        self.assertListEqual(list(report['calls']), [2, 1])
+        self.assertGreater(report.loc['format', 'wall_s'], 0)
+        self.assertGreaterEqual(report.loc['format', 'cpu_s'], 0)
+        self.assertFalse(report['cpu_s'].isna().any())
@@ -0,0 +1,87 @@
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+import pandas as pd
+import numpy as np
+import unittest
+from src.backtest.CandleArchive import ARCHIVE_DTYPES, CandleWindow
+from src.backtest.SimulationClock import SimulationClock, drop_last, topic_order
+
+MINUTE = 60 * 1000000000
+START = pd.Timestamp('2022-11-21 00:00:00').value
+
+
+def window(topic, interval, n):
+    starts = START + np.arange(n, dtype=np.int64) * interval * MINUTE
+    columns = {
+        col: np.arange(n, dtype=dtype) for col, dtype in ARCHIVE_DTYPES.items()
+    }
+    columns['start'] = starts
+    columns['end'] = starts + interval * MINUTE
+    return CandleWindow(topic, columns)
+
+
+class TestSimulationClock(unittest.TestCase):
+
+    def setUp(self):
+        self.windows = {
+            'candle.15.BTCUSDT': window('candle.15.BTCUSDT', 15, 4),
+            'candle.5.ETHUSDT': window('candle.5.ETHUSDT', 5, 12),
+            'candle.1.BTCUSDT': window('candle.1.BTCUSDT', 1, 60),
+            'candle.5.BTCUSDT': window('candle.5.BTCUSDT', 5, 12)
+        }
+
+    def test_topic_order(self):
+        self.assertListEqual(
+            topic_order(['candle.D.BTCUSDT'] + list(self.windows)), [
+                'candle.1.BTCUSDT', 'candle.5.BTCUSDT', 'candle.5.ETHUSDT',
+                'candle.15.BTCUSDT', 'candle.D.BTCUSDT'
+            ])
+
+    def test_merge(self):
+        clock = SimulationClock(self.windows, chunk_size=7)
+        records = list(clock)
+        self.assertEqual(len(records), len(clock))
+        self.assertEqual(clock.time, START + 60 * MINUTE)
+
+        ends = [candle.end for _, candle in records]
+        self.assertListEqual(ends, sorted(ends))
+
+        # candles closing at a quarter hour arrive with the finest interval first
+        quarter = [
+            topic for topic, candle in records
+            if candle.end == START + 15 * MINUTE
+        ]
+        self.assertListEqual(quarter, [
+            'candle.1.BTCUSDT', 'candle.5.BTCUSDT', 'candle.5.ETHUSDT',
+            'candle.15.BTCUSDT'
+        ])
+
+        # every window is streamed completely and in order
+        for topic, values in self.windows.items():
+            self.assertListEqual(
+                [candle.end for name, candle in records if name == topic],
+                values['end'].tolist())
+
+    def test_after(self):
+        clock = SimulationClock(self.windows, after=START + 15 * MINUTE)
+        records = list(clock)
+        self.assertEqual(len(records), 45 + 9 + 9 + 3)
+        self.assertEqual(records[0][1].end, START + 16 * MINUTE)
+
+    def test_drop_last(self):
+        dropped = drop_last(self.windows, n=5)
+
+        # the last candles of the clock are removed, coarse topics close last
+        self.assertEqual(len(dropped['candle.15.BTCUSDT']), 3)
+        self.assertEqual(len(dropped['candle.5.ETHUSDT']), 11)
+        self.assertEqual(len(dropped['candle.5.BTCUSDT']), 11)
+        self.assertEqual(len(dropped['candle.1.BTCUSDT']), 58)
+        self.assertTrue(
+            np.shares_memory(dropped['candle.1.BTCUSDT']['close'],
+                             self.windows['candle.1.BTCUSDT']['close']))
+
+        records = list(SimulationClock(self.windows))
+        self.assertListEqual(list(SimulationClock(dropped)), records[:-5])
+        self.assertEqual(len(drop_last(self.windows, n=0)['candle.1.BTCUSDT']),
+                         60)
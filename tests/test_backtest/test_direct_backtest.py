@@ -0,0 +1,312 @@
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+import pandas as pd
+import unittest
+import unittest.mock
+import json
+import os
+import tempfile
+import numpy as np
+import functools
+from src.backtest.BacktestTradingModel import BacktestTradingModel
+from src.backtest.warmup import load_warmup
+from src.backtest.CandleArchive import frame_windows
+from src.endpoints.binance_functions import binance_to_bybit, format_simulation_data
+from tests.test_backtest.helpers import simulation_klines, trading_model
+
+PUBLIC_TOPICS = ["candle.1.BTCUSDT", "candle.15.BTCUSDT"]
+BINANCE_BYBIT_MAPPING = {
+    'candle.1.BTCUSDT': 'BTCUSDT',
+    'candle.15.BTCUSDT': 'BTCUSDT'
+}
+
+# buys every 20 candles with a stop loss and take profit around the candles
+exit_model = functools.partial(trading_model,
+                               stop_loss=15995,
+                               take_profit=16009)
+
+
+def trending_klines(step, n):
+    start = int(pd.Timestamp('2022-11-22 00:00:00').value / 1000000)
+    prices = 16000 + 50 * np.sin(np.arange(n) / 40)
+    return [[
+        start + i * step,
+        str(price),
+        str(price + 3),
+        str(price - 3),
+        str(price), '10.5', start + (i + 1) * step, '15.5', 0, 0, 0, 0
+    ] for i, price in enumerate(prices)]
+
+
+def waiting_model(model, ticker):
+    model.model_storage['calls'] += 1
+    if model.account.positions[ticker]['size'] == 0:
+        price = model.market_data.history['candle.1.BTCUSDT']['close'].iloc[-1]
+        model.account.place_order(symbol=ticker,
+                                  side='Buy',
+                                  qty=0.001,
+                                  order_type='Market',
+                                  stop_loss=price - 20,
+                                  take_profit=price + 20)
+        model.wait_for_exit(ticker)
+
+
+class TestDirectBacktest(unittest.TestCase):
+
+    def run_backtest(self, direct, model_args={}, **kwargs):
+        model = BacktestTradingModel(model=exit_model,
+                                     http_session=None,
+                                     symbols=['BTC', 'USDT'],
+                                     budget={
+                                         'USDT': 1000,
+                                         'BTC': 0
+                                     },
+                                     topics=PUBLIC_TOPICS,
+                                     topic_mapping=BINANCE_BYBIT_MAPPING,
+                                     model_storage={'calls': 0},
+                                     model_args=model_args)
+
+        klines_1 = simulation_klines(60000, 301)
+        klines_15 = simulation_klines(900000, 21)
+        simulation_data = (klines_1 + klines_15,
+                           ['candle.1.BTCUSDT'] * len(klines_1) +
+                           ['candle.15.BTCUSDT'] * len(klines_15))
+
+        with unittest.mock.patch(
+                'src.backtest.BacktestTradingModel.create_simulation_data',
+                return_value=simulation_data), unittest.mock.patch.object(
+                    BacktestTradingModel,
+                    'create_performance_report',
+                    return_value={}):
+            model.run_backtest(symbols={'BTCUSDT.1m': 'candle.1.BTCUSDT'},
+                               start_history='2022-11-21 23:59:00',
+                               start_str='2022-11-22 00:00:00',
+                               end_str='2022-11-22 05:00:00',
+                               direct=direct,
+                               **kwargs)
+        return model
+
+    def test_direct(self):
+        messages = self.run_backtest(direct=False)
+        direct = self.run_backtest(direct=True)
+
+        self.assertIsNone(direct.bybit_messages)
+        self.assertGreater(len(direct.account.executions['BTCUSDT']), 10)
+        self.assertEqual(direct.model_storage['calls'],
+                         messages.model_storage['calls'])
+        self.assertDictEqual(direct.account.executions,
+                             messages.account.executions)
+        self.assertDictEqual(direct.account.wallet, messages.account.wallet)
+        for topic in PUBLIC_TOPICS:
+            pd.testing.assert_frame_equal(direct.market_data.history[topic],
+                                          messages.market_data.history[topic])
+
+        # the account is marked to market with every candle of the first topic
+        equity = direct.account.equity.to_frame()
+        self.assertEqual(len(equity),
+                         len(direct.market_data.history['candle.1.BTCUSDT']))
+        self.assertListEqual(
+            list(equity.index),
+            list(direct.market_data.history['candle.1.BTCUSDT'].index))
+        self.assertEqual(equity['equity'].iloc[0], 1000)
+        self.assertLess(equity['equity'].iloc[-1], 1000)
+        pd.testing.assert_frame_equal(equity,
+                                      messages.account.equity.to_frame())
+
+    def test_slice_length(self):
+        # slice_length is still accepted, the backtest is simulated as one series
+        with self.assertWarns(DeprecationWarning):
+            sliced = self.run_backtest(direct=True, slice_length=50)
+        single = self.run_backtest(direct=True)
+        self.assertEqual(sliced.model_storage['calls'],
+                         single.model_storage['calls'])
+        self.assertDictEqual(sliced.account.executions,
+                             single.account.executions)
+
+    def test_checkpoint(self):
+        with tempfile.TemporaryDirectory() as directory:
+            full = self.run_backtest(direct=True,
+                                     checkpoint_dir=directory,
+                                     checkpoint_freq='1h')
+            paths = sorted(os.listdir(directory))
+            self.assertListEqual(paths, [
+                'checkpoint_20221122_010100.pkl',
+                'checkpoint_20221122_020100.pkl',
+                'checkpoint_20221122_030100.pkl',
+                'checkpoint_20221122_040100.pkl'
+            ])
+
+            # resuming from a checkpoint in either mode continues the same backtest
+            for direct in [True, False]:
+                resumed = self.run_backtest(direct=direct,
+                                            model_args={'fork': 1},
+                                            resume=os.path.join(
+                                                directory, paths[1]))
+                self.assertDictEqual(resumed.model_args, {'fork': 1})
+                self.assertEqual(resumed.model_storage['calls'],
+                                 full.model_storage['calls'])
+                self.assertDictEqual(resumed.account.executions,
+                                     full.account.executions)
+                self.assertDictEqual(resumed.account.wallet,
+                                     full.account.wallet)
+                pd.testing.assert_frame_equal(resumed.account.equity.to_frame(),
+                                              full.account.equity.to_frame())
+                for topic in PUBLIC_TOPICS:
+                    pd.testing.assert_frame_equal(
+                        resumed.market_data.history[topic],
+                        full.market_data.history[topic])
+
+    def test_timings(self):
+        with tempfile.TemporaryDirectory() as directory:
+            name = os.path.join(directory, 'timings')
+            with unittest.mock.patch.object(BacktestTradingModel,
+                                            'timing_name',
+                                            return_value=name):
+                model = self.run_backtest(direct=True, profile=True)
+            self.assertTrue(os.path.exists('{}.prof'.format(name)))
+
+        # every candle is timed in the phases of the simulation, the model calls in a latency histogram
+        report = model.timer.report()
+        self.assertListEqual(list(report.index), [
+            'download', 'format', 'clock', 'market_data', 'account', 'model',
+            'simulation', 'report'
+        ])
+        self.assertEqual(report.loc['market_data', 'calls'],
+                         report.loc['clock', 'calls'])
+        self.assertEqual(report.loc['model', 'calls'],
+                         model.model_storage['calls'])
+        self.assertTrue(np.isnan(report.loc['model', 'cpu_s']))
+        self.assertGreater(report.loc['simulation', 'cpu_s'], 0)
+        self.assertGreaterEqual(
+            report.loc['simulation', 'wall_s'],
+            report.loc[['clock', 'market_data', 'account', 'model'],
+                       'wall_s'].sum())
+        self.assertEqual(
+            model.timer.histogram('model').sum(), model.model_storage['calls'])
+
+    def test_warmup(self):
+        # one candle before the simulation
+        fetch = lambda ranges: {
+            key: [[
+                start, '16000.5', '16010.5', '15990.5', '16001.5', '10.5', start
+                + 60000, '15.5', 0, 0, 0, 0
+            ]] for key, (_, _, start, _) in ranges.items()
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            with unittest.mock.patch(
+                    'src.backtest.BacktestTradingModel.fetch_kline_ranges',
+                    fetch), unittest.mock.patch(
+                        'src.backtest.BacktestTradingModel.load_warmup',
+                        functools.partial(load_warmup,
+                                          root=directory,
+                                          cache_dir=directory)):
+                warm = self.run_backtest(direct=True, warmup=True)
+        cold = self.run_backtest(direct=True)
+
+        # the candle before the simulation is added to the history before the first simulated candle
+        history = warm.market_data.history['candle.1.BTCUSDT']
+        self.assertEqual(history.index[0], pd.Timestamp('2022-11-22 00:00:00'))
+        pd.testing.assert_frame_equal(
+            history.iloc[1:],
+            cold.market_data.history['candle.1.BTCUSDT'],
+            check_freq=False)
+        self.assertIn('warmup', warm.timer.report().index)
+
+    def test_streamed_messages(self):
+        klines_1 = simulation_klines(60000, 301)
+        klines_15 = simulation_klines(900000, 21)
+        klines = klines_1 + klines_15
+        topics = ['candle.1.BTCUSDT'] * len(klines_1) + ['candle.15.BTCUSDT'
+                                                        ] * len(klines_15)
+        expected, _ = binance_to_bybit(klines, topics=topics)
+
+        model = BacktestTradingModel(model=exit_model,
+                                     http_session=None,
+                                     symbols=['BTC', 'USDT'],
+                                     budget={
+                                         'USDT': 1000,
+                                         'BTC': 0
+                                     },
+                                     topics=PUBLIC_TOPICS,
+                                     topic_mapping=BINANCE_BYBIT_MAPPING)
+        model.market_data.windows = frame_windows(
+            format_simulation_data(klines, topics=topics))
+
+        # small chunks are merged across windows in the same order as the full dataframe
+        records = list(model.market_data.candle_records(chunk_size=7))
+        self.assertEqual(len(records), len(expected))
+        for (topic, candle), msg in zip(records, expected):
+            msg = json.loads(msg)
+            self.assertEqual(topic, msg['topic'])
+            self.assertEqual(candle.end, msg['timestamp_e6'])
+            self.assertEqual(candle.open, msg['data'][0]['open'])
+
+        # trailing candles are dropped by limiting the stream
+        messages = list(
+            model.market_data.candle_messages(limit=len(expected) - 2))
+        self.assertListEqual(
+            [msg.data[0]['end'] for msg in messages],
+            [json.loads(msg)['data'][0]['end'] for msg in expected[:-2]])
+
+    def test_fast_forward(self):
+        klines_1 = trending_klines(60000, 1005)
+        klines_15 = trending_klines(900000, 67)
+        simulation_data = (klines_1 + klines_15,
+                           ['candle.1.BTCUSDT'] * len(klines_1) +
+                           ['candle.15.BTCUSDT'] * len(klines_15))
+
+        models = []
+        for direct, fast_forward in [(False, False), (True, True)]:
+            model = BacktestTradingModel(model=waiting_model,
+                                         http_session=None,
+                                         symbols=['BTC', 'USDT'],
+                                         budget={
+                                             'USDT': 1000,
+                                             'BTC': 0
+                                         },
+                                         topics=PUBLIC_TOPICS,
+                                         topic_mapping=BINANCE_BYBIT_MAPPING,
+                                         model_storage={'calls': 0})
+            model.market_data.register_indicator(
+                'sma(candle.15.BTCUSDT.close, 4)')
+
+            with unittest.mock.patch(
+                    'src.backtest.BacktestTradingModel.create_simulation_data',
+                    return_value=simulation_data), unittest.mock.patch.object(
+                        BacktestTradingModel,
+                        'create_performance_report',
+                        return_value={}):
+                model.run_backtest(symbols={'BTCUSDT.1m': 'candle.1.BTCUSDT'},
+                                   start_history='2022-11-21 23:59:00',
+                                   start_str='2022-11-22 00:00:00',
+                                   end_str='2022-11-22 16:40:00',
+                                   direct=direct,
+                                   fast_forward=fast_forward)
+            models.append(model)
+        messages, skipped = models
+
+        # the model is only called while it has no open position
+        self.assertGreater(len(skipped.account.executions['BTCUSDT']), 10)
+        self.assertLess(skipped.model_storage['calls'], 100)
+        self.assertEqual(skipped.model_storage['calls'],
+                         messages.model_storage['calls'])
+        self.assertDictEqual(skipped.account.executions,
+                             messages.account.executions)
+        self.assertDictEqual(skipped.account.wallet, messages.account.wallet)
+
+        # skipped candles are marked to market like candles that are simulated one by one
+        pd.testing.assert_frame_equal(skipped.account.equity.to_frame(),
+                                      messages.account.equity.to_frame())
+        self.assertDictEqual(skipped.account.equity.summary(),
+                             messages.account.equity.summary())
+        self.assertGreater(skipped.account.equity.max_exposure, 0)
+
+        # skipped candles are stored in market data and indicators
+        for topic in PUBLIC_TOPICS:
+            pd.testing.assert_frame_equal(skipped.market_data.history[topic],
+                                          messages.market_data.history[topic])
+        np.testing.assert_array_equal(
+            skipped.market_data.indicators['sma(candle.15.BTCUSDT.close, 4)'].
+            values(), messages.market_data.
+            indicators['sma(candle.15.BTCUSDT.close, 4)'].values())
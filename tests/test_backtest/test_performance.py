@@ -0,0 +1,71 @@
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+import pandas as pd
+import unittest
+from src.backtest.performance import attach_model_stats, count_round_trips, execution_columns, scan_round_trips
+
+
+def executions(rows):
+    return {
+        i + 1: {
+            'side':
+                side,
+            'open':
+                open,
+            'price':
+                price,
+            'exec_qty':
+                qty,
+            'trade_time':
+                pd.Timestamp('2022-11-22 00:00:00') + pd.Timedelta(minutes=i)
+        } for i, (side, open, price, qty) in enumerate(rows)
+    }
+
+
+class TestPerformance(unittest.TestCase):
+
+    def test_count_round_trips(self):
+        # long round trip with an increase, short round trip and an open long position
+        rows = [('Buy', True, 100.0, 0.1), ('BUY', True, 103.0, 0.2),
+                ('SELL', False, 102.5, 0.30000000000000004),
+                ('SELL', True, 101.0, 0.1), ('BUY', False, 102.0, 0.1),
+                ('BUY', True, 100.0, 0.1)]
+        columns = execution_columns(executions(rows))
+        self.assertTupleEqual(count_round_trips(columns), (2, 1))
+        self.assertTupleEqual(scan_round_trips(columns), (2, 1))
+
+        # partial closes and reversals are counted sequentially
+        rows = [('BUY', True, 100.0, 0.2), ('SELL', True, 101.0, 0.1),
+                ('SELL', False, 102.0, 0.1), ('SELL', True, 99.0, 0.3),
+                ('BUY', True, 98.0, 0.5)]
+        columns = execution_columns(executions(rows))
+        self.assertTupleEqual(count_round_trips(columns),
+                              scan_round_trips(columns))
+        self.assertTupleEqual(count_round_trips(execution_columns({})), (0, 0))
+
+    def test_attach_model_stats(self):
+        rows = [('BUY', True, 100.0, 0.1), ('SELL', False, 101.0, 0.1),
+                ('SELL', True, 101.0, 0.1), ('BUY', False, 99.0, 0.1)]
+        trades = pd.DataFrame(executions(rows)).transpose()
+        model_stats = {
+            'signal': {
+                '2022-11-22 00:00:00': {
+                    'long': 1.5
+                },
+                '2022-11-22 00:02:00': {
+                    'short': [1, 2]
+                }
+            }
+        }
+        trades = attach_model_stats(trades=trades, model_stats=model_stats)
+
+        # closing trades get the statistics of the preceding opening trade
+        self.assertListEqual(list(trades['signal']),
+                             [1.5, 1.5, '[1, 2]', '[1, 2]'])
+        self.assertEqual(trades['signal'].dtype, object)
+        self.assertDictEqual(model_stats['signal']['2022-11-22 00:00:00'], {
+            'long': 1.5,
+            'short': ""
+        })
+        self.assertDictEqual(model_stats['signal']['2022-11-22 00:03:00'], {})
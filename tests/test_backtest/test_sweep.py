@@ -0,0 +1,398 @@
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+import pandas as pd
+import numpy as np
+import unittest
+import unittest.mock
+from src.backtest.BacktestTradingModel import BacktestTradingModel
+from src.backtest.CandleArchive import CandleWindow
+from tests.test_backtest.helpers import simulation_klines, trading_model
+from src.backtest.sweep import _close_worker, _init_worker, _stitch, _worker, attach_windows, independent_tickers, parameter_grid, run_per_symbol, run_sweep, run_walk_forward, share_windows
+
+PUBLIC_TOPICS = ["candle.1.BTCUSDT", "candle.5.BTCUSDT"]
+BINANCE_BYBIT_MAPPING = {
+    'candle.1.BTCUSDT': 'BTCUSDT',
+    'candle.5.BTCUSDT': 'BTCUSDT'
+}
+
+
+def counting_model(model, ticker):
+    model.model_stats.setdefault('calls', {})[str(model.account.timestamp)] = {
+        'long': 1.0
+    }
+
+
+def ticker_model(model, ticker):
+    model.model_storage[ticker] = model.model_storage.get(ticker, 0) + 1
+    if model.model_storage[ticker] % model.model_args['every'] == 0:
+        model.account.place_order(symbol=ticker,
+                                  side='Buy',
+                                  qty=0.001,
+                                  order_type='Market')
+
+
+def budget_model(model, ticker):
+    model.model_stats.setdefault('budget', {})[ticker] = {
+        'long': model.account.wallet['USDT']['available_balance']
+    }
+
+
+def budget_report(self, initial_budget, **kwargs):
+    return {'initial_budget': initial_budget, 'model_stats': self.model_stats}
+
+
+def account_report(self, **kwargs):
+    return {
+        'executions': {
+            symbol: dict(executions)
+            for symbol, executions in self.account.executions.items()
+            if executions
+        },
+        'wallet': self.account.wallet
+    }
+
+
+def performance_report(self, **kwargs):
+    return {
+        symbol: {
+            'trades': len(executions)
+        }
+        for symbol, executions in self.account.executions.items()
+        if executions
+    }
+
+
+def calls_report(self, **kwargs):
+    return {'calls': len(self.model_stats.get('calls', {}))}
+
+
+class TestSweep(unittest.TestCase):
+
+    def test_parameter_grid(self):
+        self.assertListEqual(parameter_grid({
+            'sl': [1, 2],
+            'tp': [3]
+        }), [{
+            'sl': 1,
+            'tp': 3
+        }, {
+            'sl': 2,
+            'tp': 3
+        }])
+
+    def test_share_windows(self):
+        columns = {
+            col:
+            np.arange(10,
+                      dtype=np.int64 if col in ['start', 'end'] else np.float64)
+            for col in [
+                'start', 'end', 'open', 'high', 'low', 'close', 'volume',
+                'turnover'
+            ]
+        }
+        windows = {
+            'candle.1.BTCUSDT': CandleWindow('candle.1.BTCUSDT', columns)
+        }
+
+        shm, spec = share_windows(windows)
+        try:
+            shared = attach_windows(shm, spec)['candle.1.BTCUSDT']
+            np.testing.assert_array_equal(shared['open'], columns['open'])
+            self.assertEqual(shared['end'].dtype, np.int64)
+
+            # attached windows are views into the shared block
+            self.assertFalse(shared['close'].flags.owndata)
+            other = attach_windows(shm, spec)['candle.1.BTCUSDT']
+            self.assertTrue(np.shares_memory(shared['close'], other['close']))
+            del shared, other
+
+            # workers detach the block on exit without unlinking it
+            _init_worker(shm.name, spec, settings={})
+            worker_shm = _worker['shm']
+            _close_worker()
+            self.assertDictEqual(_worker, {})
+            self.assertIsNone(worker_shm.buf)
+            np.testing.assert_array_equal(
+                attach_windows(shm, spec)['candle.1.BTCUSDT']['open'],
+                columns['open'])
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def test_run_sweep(self):
+        klines_1 = simulation_klines(60000, 101)
+        klines_5 = simulation_klines(300000, 21)
+        simulation_data = (klines_1 + klines_5,
+                           ['candle.1.BTCUSDT'] * len(klines_1) +
+                           ['candle.5.BTCUSDT'] * len(klines_5))
+
+        with unittest.mock.patch('src.backtest.sweep.create_simulation_data',
+                                 return_value=simulation_data
+                                ) as create, unittest.mock.patch.object(
+                                    BacktestTradingModel,
+                                    'create_performance_report',
+                                    performance_report):
+            results = run_sweep(model=trading_model,
+                                model_args=parameter_grid({'every': [10, 20]}),
+                                symbols={'BTCUSDT.1m': 'candle.1.BTCUSDT'},
+                                account_symbols=['BTC', 'USDT'],
+                                budget={
+                                    'USDT': 1000,
+                                    'BTC': 0
+                                },
+                                topics=PUBLIC_TOPICS,
+                                topic_mapping=BINANCE_BYBIT_MAPPING,
+                                start_history='2022-11-21 23:59:00',
+                                start_str='2022-11-22 00:00:00',
+                                end_str='2022-11-22 01:40:00',
+                                model_storage={'calls': 0},
+                                processes=2)
+
+        # simulation data is loaded once for all runs
+        self.assertEqual(create.call_count, 1)
+        self.assertListEqual(results['every'].tolist(), [10, 20])
+        self.assertListEqual(results['symbol'].tolist(), ['BTCUSDT', 'BTCUSDT'])
+
+        # 120 candles trigger the model, the last two are trimmed, and the open position is closed at the end
+        self.assertListEqual(results['trades'].tolist(), [13, 7])
+
+    def test_run_walk_forward(self):
+        # one day of warm-up history before the backtest
+        klines = simulation_klines(60000, 1440 + 101)
+        simulation_data = (klines, ['candle.1.BTCUSDT'] * len(klines))
+
+        with unittest.mock.patch('src.backtest.sweep.create_simulation_data',
+                                 return_value=simulation_data
+                                ) as create, unittest.mock.patch.object(
+                                    BacktestTradingModel,
+                                    'create_performance_report',
+                                    performance_report):
+            report = run_walk_forward(
+                model=trading_model,
+                symbols={'BTCUSDT.1m': 'candle.1.BTCUSDT'},
+                account_symbols=['BTC', 'USDT'],
+                budget={
+                    'USDT': 1000,
+                    'BTC': 0
+                },
+                topics=['candle.1.BTCUSDT'],
+                topic_mapping=BINANCE_BYBIT_MAPPING,
+                start_str='2022-11-23 00:00:00',
+                end_str='2022-11-23 01:39:00',
+                slice_length=50,
+                warmup='1D',
+                model_args={'every': 10},
+                model_storage={'calls': 0},
+                processes=2)
+
+        # simulation data is loaded once including the warm-up period
+        self.assertEqual(create.call_count, 1)
+        self.assertEqual(create.call_args.kwargs['start_str'],
+                         '2022-11-22 00:00:00')
+
+        # the first slice triggers the model 50 times and buys 5 times, the second slice 49 times and buys 4 times,
+        # both close their position at the end. Executions of both slices are renumbered, so that they do not overwrite each other
+        self.assertDictEqual(report, {'BTCUSDT': {'trades': 11}})
+
+    def test_walk_forward_boundaries(self):
+        klines = simulation_klines(60000, 101)
+        simulation_data = (klines, ['candle.1.BTCUSDT'] * len(klines))
+
+        reports = []
+        for slice_length in [100, 50, 30]:
+            with unittest.mock.patch(
+                    'src.backtest.sweep.create_simulation_data',
+                    return_value=simulation_data), unittest.mock.patch.object(
+                        BacktestTradingModel, 'create_performance_report',
+                        calls_report):
+                reports.append(
+                    run_walk_forward(model=counting_model,
+                                     symbols={'BTCUSDT.1m': 'candle.1.BTCUSDT'},
+                                     account_symbols=['BTC', 'USDT'],
+                                     budget={
+                                         'USDT': 1000,
+                                         'BTC': 0
+                                     },
+                                     topics=['candle.1.BTCUSDT'],
+                                     topic_mapping=BINANCE_BYBIT_MAPPING,
+                                     start_str='2022-11-22 00:00:00',
+                                     end_str='2022-11-22 01:39:00',
+                                     slice_length=slice_length,
+                                     warmup='0min',
+                                     processes=2))
+
+        # slices call the model once for every candle of a single backtest, also for the candles closing at a boundary
+        self.assertListEqual(reports, [{'calls': 99}] * 3)
+
+    def test_stitch(self):
+        settings = {
+            'model': ticker_model,
+            'account_symbols': ['BTC', 'ETH', 'USDT'],
+            'budget': {
+                'USDT': 1000,
+                'BTC': 0,
+                'ETH': 0
+            },
+            'topics': PUBLIC_TOPICS,
+            'topic_mapping': BINANCE_BYBIT_MAPPING,
+            'symbols': {
+                'BTCUSDT.1m': 'candle.1.BTCUSDT'
+            },
+            'model_args': {},
+            'model_storage': {}
+        }
+        wallet = {
+            coin: {
+                'coin': coin,
+                'available_balance': budget,
+                'wallet_balance': budget
+            } for coin, budget in settings['budget'].items()
+        }
+        ts = '2022-11-22 00:05:00'
+        results = [({}, wallet, {
+            'rsi': {
+                ts: {
+                    'long': 1.0
+                }
+            }
+        }),
+                   ({}, wallet, {
+                       'rsi': {
+                           ts: {
+                               'short': 2.0
+                           },
+                           '2022-11-22 00:10:00': {
+                               'long': 3.0
+                           }
+                       }
+                   })]
+
+        # stats of the same timestamp are merged per trade direction
+        stitched, initial_budget = _stitch(results=results, settings=settings)
+        self.assertEqual(initial_budget, 1000)
+        self.assertDictEqual(
+            stitched.model_stats, {
+                'rsi': {
+                    ts: {
+                        'long': 1.0,
+                        'short': 2.0
+                    },
+                    '2022-11-22 00:10:00': {
+                        'long': 3.0
+                    }
+                }
+            })
+
+    def test_independent_tickers(self):
+        topic_mapping = {
+            'candle.1.ETHUSDT': 'ETHUSDT',
+            'candle.5.ETHUSDT': 'ETHUSDT',
+            **BINANCE_BYBIT_MAPPING
+        }
+        self.assertListEqual(
+            independent_tickers(topics=list(topic_mapping),
+                                topic_mapping=topic_mapping),
+            [['BTCUSDT'], ['ETHUSDT']])
+
+    def test_run_per_symbol(self):
+        klines = simulation_klines(60000, 101)
+        simulation_data = (klines + klines, ['candle.1.BTCUSDT'] * len(klines) +
+                           ['candle.1.ETHUSDT'] * len(klines))
+        settings = dict(symbols={
+            'BTCUSDT.1m': 'candle.1.BTCUSDT',
+            'ETHUSDT.1m': 'candle.1.ETHUSDT'
+        },
+                        topics=['candle.1.BTCUSDT', 'candle.1.ETHUSDT'],
+                        topic_mapping={
+                            'candle.1.BTCUSDT': 'BTCUSDT',
+                            'candle.1.ETHUSDT': 'ETHUSDT'
+                        },
+                        start_history='2022-11-21 23:59:00',
+                        start_str='2022-11-22 00:00:00',
+                        end_str='2022-11-22 01:40:00')
+        budget = {'USDT': 1000, 'BTC': 0, 'ETH': 0}
+
+        with unittest.mock.patch(
+                'src.backtest.sweep.create_simulation_data',
+                return_value=simulation_data), unittest.mock.patch(
+                    'src.backtest.BacktestTradingModel.create_simulation_data',
+                    return_value=simulation_data), unittest.mock.patch.object(
+                        BacktestTradingModel, 'create_performance_report',
+                        account_report):
+            report = run_per_symbol(model=ticker_model,
+                                    account_symbols=['BTC', 'ETH', 'USDT'],
+                                    budget=budget,
+                                    model_args={'every': 10},
+                                    processes=2,
+                                    **settings)
+
+            single = BacktestTradingModel(
+                model=ticker_model,
+                http_session=None,
+                symbols=['BTC', 'ETH', 'USDT'],
+                budget=dict(budget),
+                topics=settings['topics'],
+                topic_mapping=settings['topic_mapping'],
+                model_args={
+                    'every': 10
+                },
+                model_storage={}).run_backtest(
+                    symbols=settings['symbols'],
+                    start_history=settings['start_history'],
+                    start_str=settings['start_str'],
+                    end_str=settings['end_str'],
+                    direct=True)
+
+        # every ticker runs in its own process, the merged account matches a single backtest of both tickers
+        self.assertListEqual(list(report['executions']), ['BTCUSDT', 'ETHUSDT'])
+        self.assertEqual(len(report['executions']['ETHUSDT']), 10)
+        self.assertDictEqual(report['executions'], single['executions'])
+        for coin, balance in single['wallet'].items():
+            self.assertAlmostEqual(report['wallet'][coin]['available_balance'],
+                                   balance['available_balance'])
+
+    def test_per_symbol_budget(self):
+        klines = simulation_klines(60000, 101)
+        simulation_data = (klines + klines, ['candle.1.BTCUSDT'] * len(klines) +
+                           ['candle.1.ETHUSDT'] * len(klines))
+
+        with unittest.mock.patch(
+                'src.backtest.sweep.create_simulation_data',
+                return_value=simulation_data), unittest.mock.patch.object(
+                    BacktestTradingModel, 'create_performance_report',
+                    budget_report):
+            report = run_per_symbol(
+                model=budget_model,
+                symbols={
+                    'BTCUSDT.1m': 'candle.1.BTCUSDT',
+                    'ETHUSDT.1m': 'candle.1.ETHUSDT'
+                },
+                account_symbols=['BTC', 'ETH', 'USDT'],
+                budget={
+                    'USDT': 1000,
+                    'BTC': 0,
+                    'ETH': 0
+                },
+                topics=['candle.1.BTCUSDT', 'candle.1.ETHUSDT'],
+                topic_mapping={
+                    'candle.1.BTCUSDT': 'BTCUSDT',
+                    'candle.1.ETHUSDT': 'ETHUSDT'
+                },
+                start_history='2022-11-21 23:59:00',
+                start_str='2022-11-22 00:00:00',
+                end_str='2022-11-22 01:40:00',
+                processes=2)
+
+        # every group trades with its share of the base currency, returns are reported against the entire budget
+        self.assertEqual(report['initial_budget'], 1000)
+        self.assertDictEqual(
+            report['model_stats'],
+            {'budget': {
+                'BTCUSDT': {
+                    'long': 500
+                },
+                'ETHUSDT': {
+                    'long': 500
+                }
+            }})
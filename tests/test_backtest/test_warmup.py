@@ -0,0 +1,111 @@
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+import pandas as pd
+import unittest
+import tempfile
+import os
+from src.backtest.warmup import load_warmup, snapshot_path, warmup_ranges
+from src.backtest.BacktestMarketData import BacktestMarketData
+from src.backtest.BacktestAccountData import BacktestAccountData
+from src.endpoints.binance_functions import format_historical_klines
+
+SYMBOLS = {'BTCUSDT.1m': 'candle.1.BTCUSDT', 'BTCUSDT.5m': 'candle.5.BTCUSDT'}
+
+
+class TestWarmup(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.requests = []
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def fetch(self, ranges):
+        self.requests.append(ranges)
+        klines = {}
+        for key, (_, interval, start_ts, end_ts) in ranges.items():
+            step = int(pd.Timedelta(interval).value / 1000000)
+            first = start_ts + (-start_ts) % step
+            klines[key] = [[
+                str(ts),
+                str(16000.5 + ts % 7), '16010.5', '15990.5', '16001.5', '10.5',
+                str(ts + step), '15.5', 0, 0, 0, 0
+            ] for ts in range(first, end_ts + 1, step)]
+        return klines
+
+    def load(self):
+        return load_warmup(symbols=SYMBOLS,
+                           start_history='2022-11-21 22:00:00',
+                           start_str='2022-11-22 00:00:00',
+                           fetch=self.fetch,
+                           root=os.path.join(self.directory.name, 'warmup'),
+                           cache_dir=os.path.join(self.directory.name, 'cache'))
+
+    def test_load_warmup(self):
+        history = self.load()
+        self.assertEqual(len(self.requests), 1)
+
+        # the history ends with the last candle that closes at the start of the simulation
+        self.assertListEqual(list(history), list(SYMBOLS.values()))
+        self.assertEqual(len(history['candle.1.BTCUSDT']), 120)
+        self.assertEqual(len(history['candle.5.BTCUSDT']), 24)
+        self.assertEqual(history['candle.5.BTCUSDT']['start'].iloc[0],
+                         pd.Timestamp('2022-11-21 22:00:00'))
+        self.assertEqual(history['candle.5.BTCUSDT']['end'].iloc[-1],
+                         pd.Timestamp('2022-11-22 00:00:00'))
+
+        ranges = warmup_ranges(symbols=SYMBOLS,
+                               start_history='2022-11-21 22:00:00',
+                               start_str='2022-11-22 00:00:00')
+        pd.testing.assert_frame_equal(
+            history['candle.5.BTCUSDT'],
+            format_historical_klines(
+                self.fetch({'5m': ranges['BTCUSDT.5m']})['5m']))
+
+        # the snapshot is read without downloading, it is identical to the downloaded history
+        path = snapshot_path(ranges=ranges,
+                             root=os.path.join(self.directory.name, 'warmup'))
+        self.assertTrue(os.path.exists(path))
+        snapshot = self.load()
+        self.assertEqual(len(self.requests), 2)
+        for topic in SYMBOLS.values():
+            pd.testing.assert_frame_equal(snapshot[topic], history[topic])
+
+        # without the snapshot the history is read from the kline cache
+        os.remove(path)
+        for topic, data in self.load().items():
+            pd.testing.assert_frame_equal(data, history[topic])
+        self.assertEqual(len(self.requests), 2)
+
+    def test_missing_start(self):
+        # a missing start would download the entire history of every ticker
+        for start_history in [None, 'NaT']:
+            with self.assertRaises(ValueError):
+                warmup_ranges(symbols=SYMBOLS,
+                              start_history=start_history,
+                              start_str='2022-11-22 00:00:00')
+        self.assertListEqual(self.requests, [])
+
+    def test_load_history(self):
+        history = self.load()
+        market_data = BacktestMarketData(
+            account=BacktestAccountData(symbols=['BTC', 'USDT'],
+                                        budget={
+                                            'USDT': 1000,
+                                            'BTC': 0
+                                        }),
+            client=None,
+            topics=['candle.1.BTCUSDT'],
+            toppic_mapping={'candle.1.BTCUSDT': 'BTCUSDT'})
+        market_data.register_indicator('sma(candle.1.BTCUSDT.close, 10)')
+
+        # topics that are not stored are ignored, indicators are warmed up
+        market_data.load_history(history)
+        self.assertListEqual(
+            list(market_data.history['candle.1.BTCUSDT'].index),
+            list(history['candle.1.BTCUSDT'].index))
+        self.assertAlmostEqual(
+            market_data.indicators['sma(candle.1.BTCUSDT.close, 10)'].value,
+            16001.5)
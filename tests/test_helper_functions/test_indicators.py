@@ -0,0 +1,112 @@
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+import pandas as pd
+import numpy as np
+import unittest
+from src.MarketData import MarketData
+from src.helper_functions import indicators, statistics
+
+PUBLIC_TOPICS = ["candle.5.BTCUSDT"]
+
+
+class TestIndicators(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        close = 20000 + rng.normal(0, 10, 200).cumsum()
+        end = pd.date_range('2022-11-03 07:05:00', periods=200, freq='5min')
+        self.candles = pd.DataFrame(
+            {
+                'start': end - pd.Timedelta('5min'),
+                'end': end,
+                'open': close + rng.normal(0, 2, 200),
+                'close': close,
+                'high': close + rng.uniform(5, 10, 200),
+                'low': close - rng.uniform(5, 10, 200),
+                'volume': rng.uniform(1, 2, 200),
+                'turnover': rng.uniform(1, 2, 200),
+                'confirm': True
+            },
+            index=end)
+
+    def run_indicator(self, indicator: indicators.Indicator) -> pd.Series:
+        for candle in self.candles.to_dict('records'):
+            indicator.update(candle)
+        return indicator.to_series()
+
+    def test_sma(self):
+        sma = self.run_indicator(
+            indicators.SMA(topic=PUBLIC_TOPICS[0], column='close', window=24))
+        np.testing.assert_allclose(
+            sma.values,
+            self.candles['close'].rolling(24).mean().values,
+            equal_nan=True)
+
+    def test_ema(self):
+        ema = self.run_indicator(
+            indicators.EMA(topic=PUBLIC_TOPICS[0], column='close', window=12))
+        np.testing.assert_allclose(
+            ema.values, self.candles['close'].ewm(span=12,
+                                                  adjust=False).mean().values)
+
+    def test_avg_true_range(self):
+        atr = self.run_indicator(
+            indicators.AvgTrueRange(topic=PUBLIC_TOPICS[0], window=14))
+        tr = statistics.true_range(self.candles)
+        np.testing.assert_allclose(atr.values,
+                                   statistics.avg_true_range(tr, 14).values,
+                                   equal_nan=True)
+
+    def test_wilder_atr(self):
+        atr = self.run_indicator(
+            indicators.WilderATR(topic=PUBLIC_TOPICS[0], window=14))
+        tr = statistics.true_range(self.candles)
+        wilder = tr.copy() * np.nan
+        wilder.iloc[13] = tr.iloc[:14].mean()
+        for i in range(14, len(tr)):
+            wilder.iloc[i] = (wilder.iloc[i - 1] * 13 + tr.iloc[i]) / 14
+        np.testing.assert_allclose(atr.values, wilder.values, equal_nan=True)
+
+    def test_abstract_step(self):
+        # indicators without a step fail when they are created, not while streaming
+        with self.assertRaises(TypeError):
+            indicators.Indicator(topic=PUBLIC_TOPICS[0])
+
+    def test_parse_indicator(self):
+        self.assertTupleEqual(
+            indicators.parse_indicator('sma(candle.5.BTCUSDT.close, 24)',
+                                       topics=PUBLIC_TOPICS),
+            ('sma', 'candle.5.BTCUSDT', 'close', [24]))
+        self.assertTupleEqual(
+            indicators.parse_indicator('atr(candle.5.BTCUSDT, 14)',
+                                       topics=PUBLIC_TOPICS),
+            ('atr', 'candle.5.BTCUSDT', None, [14]))
+        with self.assertRaises(ValueError):
+            indicators.parse_indicator('sma(candle.1.BTCUSDT.close, 24)',
+                                       topics=PUBLIC_TOPICS)
+
+    def test_register_indicator(self):
+        market_data = MarketData(client=None, topics=PUBLIC_TOPICS)
+        market_data.add_history(topic=PUBLIC_TOPICS[0],
+                                data=self.candles.iloc[:100])
+
+        sma = market_data.register_indicator('sma(candle.5.BTCUSDT.close, 24)')
+        self.assertIs(
+            market_data.register_indicator('sma(candle.5.BTCUSDT.close, 24)'),
+            sma)
+
+        for candle in self.candles.iloc[100:].to_dict('records'):
+            market_data.candles[PUBLIC_TOPICS[0]].append(candle)
+            market_data.update_indicators(topic=PUBLIC_TOPICS[0], data=candle)
+
+        # unconfirmed candles do not update indicators
+        market_data.update_indicators(topic=PUBLIC_TOPICS[0],
+                                      data={
+                                          **candle, 'confirm': False,
+                                          'close': 0.0
+                                      })
+
+        self.assertAlmostEqual(sma.value,
+                               self.candles['close'].iloc[-24:].mean())
+        self.assertEqual(len(sma.values()), 200)
@@ -0,0 +1,61 @@
+# !/usr/bin/env python
+# coding: utf-8
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+import json
+import unittest
+import pandas as pd
+from src.endpoints import bybit_decoders
+
+
+class TestBybitDecoders(unittest.TestCase):
+
+    def setUp(self):
+        self.kline_message = '{"topic":"candle.1.BTCUSDT","data":[{"start":1667461800,"end":1667461860,"period":"1","open":20282,"close":20280.5,"high":20282.5,"low":20280,"volume":"20.753","turnover":"420912.939","confirm":false,"cross_seq":19909786084,"timestamp":1667461837466318}],"timestamp_e6":1667461837466318}'
+        self.wallet_message = {
+            "topic":
+                "wallet",
+            "data": [{
+                "wallet_balance": 429.80713,
+                "available_balance": "429.67322"
+            }]
+        }
+
+    def test_decode_candle(self):
+        candle = bybit_decoders.decode_candle(
+            json.loads(self.kline_message)['data'][0])
+
+        self.assertEqual(candle.start,
+                         pd.Timestamp('2022-11-03 07:50:00').value)
+        self.assertEqual(candle['end'],
+                         pd.Timestamp('2022-11-03 07:51:00').value)
+        self.assertEqual(candle['volume'], 20.753)
+        self.assertFalse(candle.confirm)
+        self.assertListEqual(list(candle.keys()), [
+            "start", "end", "period", "open", "close", "high", "low", "volume",
+            "turnover", "confirm", "cross_seq", "timestamp"
+        ])
+
+    def test_decode_message(self):
+        for backend in bybit_decoders.JSON_BACKENDS:
+            topic, records = bybit_decoders.decode_message(self.kline_message,
+                                                           backend=backend)
+            self.assertEqual(topic, 'candle.1.BTCUSDT')
+            self.assertEqual(records[0].turnover, 420912.939)
+
+        topic, records = bybit_decoders.decode_message(self.wallet_message)
+        self.assertEqual(topic, 'wallet')
+        self.assertListEqual(records, [
+            bybit_decoders.Wallet(coin=None,
+                                  wallet_balance=429.80713,
+                                  available_balance=429.67322)
+        ])
+        self.assertTupleEqual(bybit_decoders.decode_message({"success": True}),
+                              (None, []))
+
+    def test_iso_to_ns(self):
+        self.assertEqual(
+            bybit_decoders.iso_to_ns('2020-08-12T21:16:18.142746Z'),
+            pd.Timestamp('2020-08-12 21:16:18.142746').value)
+        self.assertEqual(bybit_decoders.iso_to_ns(None), 0)
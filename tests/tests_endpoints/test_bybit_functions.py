@@ -4,6 +4,7 @@ warnings.simplefilter(action='ignore', category=FutureWarning)
 import pandas as pd
 import numpy as np
 import unittest
+import unittest.mock
 import json
 from src.endpoints.bybit_functions import *
 from pybit import usdt_perpetual
@@ -208,3 +209,53 @@ class TestBybitFunctions(unittest.TestCase):
 
         self.assertEqual(response['ret_msg'], "OK")
         self.assertAlmostEqual(take_profit, new_take_profit)
+
+
+class FakeBybit:
+    '''
+    Serves 1 minute klines of a fixed range in the format of the bybit kline endpoint, newest first.
+    '''
+
+    first = int(pd.Timestamp('2022-11-21 00:00:00').value / 1000000)
+    last = int(pd.Timestamp('2022-11-21 20:00:00').value / 1000000)
+    gap = (int(pd.Timestamp('2022-11-21 05:00:00').value / 1000000),
+           int(pd.Timestamp('2022-11-21 05:30:00').value / 1000000))
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def kline(self, symbol, interval, _start, _end, limit):
+        step = int(interval) * 60000
+        first = max(_start, self.first)
+        starts = range(first + (-first) % step, min(_end, self.last) + 1, step)
+        klines = [[str(ts), '1', '2', '0.5', '1.5', '10', '15']
+                  for ts in reversed(starts)
+                  if not self.gap[0] <= ts < self.gap[1]]
+        return {'result': {'list': klines[:limit]}}
+
+
+class TestHistoricalKlines(unittest.TestCase):
+
+    def test_get_historical_klines_concurrent(self):
+        with unittest.mock.patch('src.endpoints.bybit_functions.bb.Bybit',
+                                 FakeBybit):
+            for start_str in ['2022-11-21 00:00:00', '2022-11-21 06:00:00']:
+                sequential = {
+                    interval:
+                    get_historical_klines(symbol='BTCUSDT',
+                                          interval=interval,
+                                          start_str=start_str,
+                                          end_str='2022-11-21 23:00:00')
+                    for interval in ['1m', '3m', '5m']
+                }
+                concurrent = get_historical_klines_concurrent(
+                    symbols={
+                        interval: ('BTCUSDT', interval)
+                        for interval in ['1m', '3m', '5m']
+                    },
+                    start_str=start_str,
+                    end_str='2022-11-21 23:00:00',
+                    calls_per_second=1000,
+                    progress=False)
+
+                self.assertDictEqual(concurrent, sequential)
@@ -0,0 +1,82 @@
+import warnings
+
+warnings.simplefilter(action='ignore', category=FutureWarning)
+import pandas as pd
+import numpy as np
+import unittest
+import tempfile
+import time
+from src.endpoints.kline_cache import KlineCache, load_klines, merge_ranges
+
+MINUTE = 60000
+START = int(pd.Timestamp('2022-11-21 00:00:00').value / 1000000)
+
+
+class TestKlineCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.requests = []
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    def fetch(self, ranges):
+        self.requests.append(ranges)
+        klines = {}
+        for key, (_, interval, start_ts, end_ts) in ranges.items():
+            step = int(pd.Timedelta(interval).value / 1000000)
+            first = start_ts + (-start_ts) % step
+            klines[key] = [[
+                str(ts), '1', '2', '0.5', '1.5', '10',
+                str(ts + step), '15', 0, 0, 0, 0
+            ] for ts in range(first, end_ts + 1, step)]
+        return klines
+
+    def load(self, start_ts, end_ts):
+        return load_klines(
+            ranges={'BTCUSDT.1m': ('BTCUSDT', '1m', start_ts, end_ts)},
+            fetch=self.fetch,
+            cache_dir=self.cache_dir.name)['BTCUSDT.1m']
+
+    def test_merge_ranges(self):
+        np.testing.assert_array_equal(
+            merge_ranges(np.array([[10, 20], [0, 5], [21, 30], [40, 50]])),
+            np.array([[0, 5], [10, 30], [40, 50]]))
+
+    def test_load_klines(self):
+        klines = self.load(START + 100 * MINUTE, START + 199 * MINUTE)
+        self.assertEqual(len(klines), 100)
+        self.assertEqual(klines[0][0], START + 100 * MINUTE)
+        self.assertEqual(len(self.requests), 1)
+
+        # cached range is not downloaded again
+        self.assertListEqual(
+            self.load(START + 120 * MINUTE, START + 150 * MINUTE),
+            klines[20:51])
+        self.assertEqual(len(self.requests), 1)
+
+        # only the missing gaps are downloaded
+        klines = self.load(START, START + 299 * MINUTE)
+        self.assertListEqual(
+            sorted(self.requests[-1].values()),
+            [('BTCUSDT', '1m', START, START + 99 * MINUTE),
+             ('BTCUSDT', '1m', START + 200 * MINUTE, START + 299 * MINUTE)])
+        self.assertListEqual([kline[0] for kline in klines],
+                             list(range(START, START + 300 * MINUTE, MINUTE)))
+        self.assertListEqual(klines, [[
+            ts, 1.0, 2.0, 0.5, 1.5, 10.0, ts + MINUTE, 15.0, 0.0, 0.0, 0.0, 0.0
+        ] for ts in range(START, START + 300 * MINUTE, MINUTE)])
+
+    def test_open_klines_are_not_cached(self):
+        now = int(time.time() * 1000)
+        now -= now % MINUTE
+        klines = self.load(now - 10 * MINUTE, now)
+        self.assertEqual(klines[-1][0], now)
+
+        cache = KlineCache(exchange='bybit',
+                           symbol='BTCUSDT',
+                           interval='1m',
+                           cache_dir=self.cache_dir.name)
+        self.assertListEqual(cache.missing(now - 10 * MINUTE, now),
+                             [(now, now)])